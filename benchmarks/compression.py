@@ -0,0 +1,102 @@
+"""
+Response compression benchmark: bytes saved against CPU spent.
+
+Renders `/get_new_complaints`-like payloads from the synthetic dataset
+generator and compresses them with every available encoding and level.
+Reports the compression ratio, the time per payload and the cost of a
+cache hit in CompressionMiddleware (body digest only).
+
+Usage:
+    poetry run python -m benchmarks.compression --rows 100,1000,10000
+"""
+import argparse
+import hashlib
+import json
+import timeit
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable
+
+from benchmarks.dataset import generate_rows
+from src.core.compression import (
+    GzipStream, BrotliStream, ZstdStream, brotli, zstandard
+)
+from src.core.responses import FastJSONResponse
+
+
+def make_payload(count: int) -> bytes:
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    return FastJSONResponse([
+        {
+            "id": row[0],
+            "text": row[1],
+            "status": row[2].lower(),
+            "sentiment": row[4].lower(),
+            "category": row[5].lower(),
+        }
+        for row in generate_rows(count, 1, now)
+    ]).body
+
+
+def codecs() -> dict[str, Callable[[], Any]]:
+    result = {}
+    for level in (1, 6, 9):
+        result[f"gzip:{level}"] = lambda level=level: GzipStream(level)
+    if brotli is not None:
+        for quality in (1, 4, 11):
+            result[f"br:{quality}"] = (
+                lambda quality=quality: BrotliStream(quality)
+            )
+    if zstandard is not None:
+        for level in (1, 3, 9):
+            result[f"zstd:{level}"] = lambda level=level: ZstdStream(level)
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", default="100,1000,10000")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", type=Path)
+    args = parser.parse_args()
+
+    report = []
+    for count in (int(rows) for rows in args.rows.split(",")):
+        payload = make_payload(count)
+        digest_ms = min(timeit.repeat(
+            lambda: hashlib.blake2b(payload, digest_size=16).digest(),
+            number=1, repeat=args.repeat
+        )) * 1000
+        print(
+            f"{count} rows, {len(payload):,} bytes, "
+            f"cache hit {digest_ms:.3f} ms"
+        )
+        for name, factory in codecs().items():
+            compressed = factory().compress(payload, final=True)
+            seconds = min(timeit.repeat(
+                lambda: factory().compress(payload, final=True),
+                number=1, repeat=args.repeat
+            ))
+            result = {
+                "rows": count,
+                "codec": name,
+                "bytes_in": len(payload),
+                "bytes_out": len(compressed),
+                "ratio": round(len(payload) / len(compressed), 2),
+                "ms": round(seconds * 1000, 3),
+                "mb_per_s": round(len(payload) / seconds / 2 ** 20, 1),
+                "cache_hit_ms": round(digest_ms, 3),
+            }
+            report.append(result)
+            print(
+                f"{name:>10}: {result['bytes_out']:>10,} bytes "
+                f"{result['ratio']:>6.2f}x {result['ms']:>9.3f} ms "
+                f"{result['mb_per_s']:>8.1f} MB/s"
+            )
+
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
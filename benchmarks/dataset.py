@@ -0,0 +1,160 @@
+"""
+Synthetic complaint dataset generator.
+
+Fills a SQLite database with N complaints with realistic distributions:
+timestamps follow a daily cycle and grow towards now, most old
+complaints are closed and most fresh ones are open, text lengths are
+long-tailed and capped by the String(500) column.
+
+Usage:
+    poetry run python -m benchmarks.dataset --rows 1000000 \\
+        --database ./instance/benchmark.sqlite
+"""
+import argparse
+import math
+import random
+import sqlite3
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Iterator
+
+from sqlalchemy import create_engine
+
+from src.core.database import Base
+from src.models import models  # noqa: F401
+from src.models.enums import (
+    ComplaintStatus, ComplaintSentiment, ComplaintCategory
+)
+
+
+SENTIMENTS = {
+    ComplaintSentiment.NEGATIVE: 55,
+    ComplaintSentiment.NEUTRAL: 25,
+    ComplaintSentiment.POSITIVE: 10,
+    ComplaintSentiment.UNKNOWN: 10,
+}
+CATEGORIES = {
+    ComplaintCategory.TECHNICAL: 45,
+    ComplaintCategory.PAYMENT: 35,
+    ComplaintCategory.OTHER: 20,
+}
+# Share of complaints per hour of day, peaks in the afternoon.
+HOURS = [
+    1 + math.sin(math.pi * (hour - 6) / 12) if 6 <= hour <= 23 else 0.3
+    for hour in range(24)
+]
+WORDS = (
+    "payment card button error app login crash refund money charged twice "
+    "screen freeze slow support order delivery account password update "
+    "failed broken again cannot please fix help why still waiting"
+).split()
+
+
+def weighted(choices: dict, count: int) -> list:
+    return random.choices(list(choices), weights=choices.values(), k=count)
+
+
+def generate_rows(
+        count: int,
+        days: int,
+        now: datetime
+) -> Iterator[tuple]:
+    """
+    Generates complaint rows in the column order of the complaint table.
+    :param count: Number of rows.
+    :param days: Time span of the dataset.
+    :param now: Newest timestamp.
+    :return: Iterator of (id, text, status, timestamp, sentiment, category).
+    """
+    sentiments = weighted(SENTIMENTS, count)
+    categories = weighted(CATEGORIES, count)
+    hours = random.choices(range(24), weights=HOURS, k=count)
+    for index in range(count):
+        # sqrt skews the distribution towards recent days (growth).
+        age_days = days * (1 - math.sqrt(random.random()))
+        day = (now - timedelta(days=age_days)).replace(
+            hour=hours[index],
+            minute=random.randrange(60),
+            second=random.randrange(60)
+        )
+        timestamp = day if day <= now else day - timedelta(days=1)
+
+        age_hours = (now - timestamp).total_seconds() / 3600
+        open_share = 0.9 * math.exp(-age_hours / 72) + 0.02
+        status = (
+            ComplaintStatus.OPEN if random.random() < open_share
+            else ComplaintStatus.CLOSED
+        )
+
+        words = min(80, max(1, int(random.lognormvariate(2.3, 0.8))))
+        text = " ".join(random.choices(WORDS, k=words))[:500]
+
+        yield (
+            index + 1,
+            text,
+            status.name,
+            timestamp.strftime("%Y-%m-%d %H:%M:%S.%f"),
+            sentiments[index].name,
+            categories[index].name,
+        )
+
+
+def generate_dataset(
+        database: Path,
+        rows: int,
+        days: int = 365,
+        batch_size: int = 50_000
+) -> float:
+    """
+    Creates the schema and bulk inserts the rows.
+    :param database: SQLite file path, recreated if exists.
+    :param rows: Number of complaints.
+    :param days: Time span of the dataset.
+    :param batch_size: Rows per executemany call.
+    :return: Insertion time in seconds.
+    """
+    database.unlink(missing_ok=True)
+    database.parent.mkdir(parents=True, exist_ok=True)
+    Base.metadata.create_all(create_engine(f"sqlite:///{database}"))
+
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    started = time.perf_counter()
+    connection = sqlite3.connect(database)
+    try:
+        connection.execute("PRAGMA journal_mode = OFF")
+        connection.execute("PRAGMA synchronous = OFF")
+        generator = generate_rows(rows, days, now)
+        with connection:
+            while batch := [
+                row for _, row in zip(range(batch_size), generator)
+            ]:
+                connection.executemany(
+                    "INSERT INTO complaint "
+                    "(id, text, status, timestamp, sentiment, category) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    batch
+                )
+    finally:
+        connection.close()
+    return time.perf_counter() - started
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument(
+        "--database", type=Path, default=Path("instance/benchmark.sqlite")
+    )
+    args = parser.parse_args()
+
+    seconds = generate_dataset(args.database, args.rows, args.days)
+    print(
+        f"{args.rows} complaints written to {args.database} "
+        f"in {seconds:.1f} s ({args.rows / seconds:,.0f} rows/s)"
+    )
+
+
+if __name__ == "__main__":
+    main()
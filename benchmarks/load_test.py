@@ -0,0 +1,237 @@
+"""
+End-to-end load test against local stub upstreams.
+
+Starts three stub upstreams (apilayer, ip-api, OpenRouter), runs the
+real app with uvicorn against a temporary SQLite file, drives it with
+an async load generator and reports RPS and p50/p95/p99 per route.
+
+Usage:
+    poetry run python -m benchmarks.load_test --duration 30 \\
+        --concurrency 50 --mix add=1,get_new_complaints=4 \\
+        --sentiment-latency lognormal:120:0.5 --output run.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from contextlib import ExitStack
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any
+
+import httpx
+from sqlalchemy import create_engine
+
+from src.core.database import Base
+from src.models import models  # noqa: F401
+
+# Admin token of the app under test, to read its metrics.
+ADMIN_TOKEN = "load-test"
+
+ROUTES = {
+    "add": (
+        "POST", "/api/v1/complaints/add",
+        lambda: {"text": f"Payment button is broken #{random.random()}"}
+    ),
+    "get_new_complaints": (
+        "GET", "/api/v1/complaints/get_new_complaints", None
+    ),
+}
+
+
+def percentile(values: list[float], share: float) -> float:
+    """Nearest-rank percentile of sorted values."""
+    if not values:
+        return 0.0
+    index = max(0, min(len(values) - 1, round(share * len(values)) - 1))
+    return values[index]
+
+
+def start_process(stack: ExitStack, args: list[str], env: dict[str, str]):
+    process = subprocess.Popen(
+        [sys.executable, *args],
+        env={**os.environ, **env},
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    stack.callback(process.wait)
+    stack.callback(process.terminate)
+    return process
+
+
+def wait_ready(url: str, timeout: float = 30) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(url).status_code < 500:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.1)
+    raise RuntimeError(f"{url} is not ready after {timeout} s")
+
+
+async def run_load(
+        base_url: str,
+        duration: float,
+        concurrency: int,
+        mix: dict[str, int]
+) -> dict[str, dict[str, Any]]:
+    """
+    Sends requests from `concurrency` workers for `duration` seconds.
+    :return: Latencies and status codes by route.
+    """
+    latencies: defaultdict[str, list[float]] = defaultdict(list)
+    statuses: defaultdict[str, defaultdict[int, int]] = defaultdict(
+        lambda: defaultdict(int)
+    )
+    names = [name for name, weight in mix.items() for _ in range(weight)]
+    deadline = time.monotonic() + duration
+
+    async def worker(client: httpx.AsyncClient) -> None:
+        while time.monotonic() < deadline:
+            name = random.choice(names)
+            method, path, body = ROUTES[name]
+            headers = {
+                # Every request looks like a new client to the spam check.
+                "X-Forwarded-For": ".".join(
+                    str(random.randint(1, 254)) for _ in range(4)
+                )
+            }
+            started = time.perf_counter()
+            try:
+                response = await client.request(
+                    method, path, headers=headers,
+                    json=body() if body else None
+                )
+                status = response.status_code
+            except httpx.HTTPError:
+                status = 0
+            latencies[name].append(time.perf_counter() - started)
+            statuses[name][status] += 1
+
+    limits = httpx.Limits(max_connections=concurrency)
+    async with httpx.AsyncClient(
+            base_url=base_url, limits=limits, timeout=120
+    ) as client:
+        await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+
+    report = {}
+    for name, values in latencies.items():
+        values.sort()
+        report[name] = {
+            "requests": len(values),
+            "rps": round(len(values) / duration, 2),
+            "p50_ms": round(percentile(values, 0.50) * 1000, 2),
+            "p95_ms": round(percentile(values, 0.95) * 1000, 2),
+            "p99_ms": round(percentile(values, 0.99) * 1000, 2),
+            "statuses": dict(statuses[name]),
+        }
+    return report
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "HEAD"], text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--mix", default="add=1,get_new_complaints=4")
+    parser.add_argument("--app-port", type=int, default=8800)
+    parser.add_argument("--stub-port", type=int, default=8801)
+    parser.add_argument("--sentiment-latency", default="lognormal:100:0.5")
+    parser.add_argument("--ip-latency", default="lognormal:50:0.5")
+    parser.add_argument("--openrouter-latency", default="lognormal:300:0.7")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--burst-every", type=float, default=0.0)
+    parser.add_argument("--burst-length", type=float, default=0.0)
+    parser.add_argument("--output", type=Path)
+    args = parser.parse_args()
+
+    mix = {
+        name: int(weight)
+        for name, weight in (item.split("=") for item in args.mix.split(","))
+    }
+    stubs = {
+        "SENTIMENT_ANALYSIS_BASE_URL": args.sentiment_latency,
+        "IP_API_BASE_URL": args.ip_latency,
+        "OPEN_ROUTER_BASE_URL": args.openrouter_latency,
+    }
+
+    with tempfile.TemporaryDirectory() as tmp, ExitStack() as stack:
+        database = Path(tmp) / "database.sqlite"
+        Base.metadata.create_all(create_engine(f"sqlite:///{database}"))
+
+        env = {
+            "DB_URL": f"sqlite+aiosqlite:///{database}",
+            "DB_URL_SYNC": f"sqlite:///{database}",
+            "SENTIMENT_ANALYSIS_API_KEY": "stub",
+            "OPEN_ROUTER_API_KEY": "stub",
+            "LOG_LOG_FILE": str(Path(tmp) / "app.log"),
+            "ADMIN_TOKEN": ADMIN_TOKEN,
+        }
+        for offset, (setting, latency) in enumerate(stubs.items()):
+            port = args.stub_port + offset
+            env[setting] = f"http://127.0.0.1:{port}/"
+            start_process(stack, [
+                "-m", "benchmarks.stubs", "--port", str(port),
+                "--latency", latency,
+                "--error-rate", str(args.error_rate),
+                "--burst-every", str(args.burst_every),
+                "--burst-length", str(args.burst_length),
+            ], {})
+            wait_ready(f"http://127.0.0.1:{port}/docs")
+
+        start_process(stack, [
+            "-m", "uvicorn", "src.main:app",
+            "--port", str(args.app_port),
+            "--proxy-headers", "--forwarded-allow-ips", "127.0.0.1",
+            "--log-level", "warning",
+        ], env)
+        base_url = f"http://127.0.0.1:{args.app_port}"
+        wait_ready(f"{base_url}/api/v1/admin/metrics")
+
+        report = asyncio.run(
+            run_load(base_url, args.duration, args.concurrency, mix)
+        )
+        app_metrics = httpx.get(
+            f"{base_url}/api/v1/admin/metrics",
+            headers={"X-Admin-Token": ADMIN_TOKEN}
+        ).json()
+
+    for name, stats in report.items():
+        print(
+            f"{name:>20}: {stats['rps']:8.2f} rps  "
+            f"p50 {stats['p50_ms']:8.2f} ms  "
+            f"p95 {stats['p95_ms']:8.2f} ms  "
+            f"p99 {stats['p99_ms']:8.2f} ms  "
+            f"statuses {stats['statuses']}"
+        )
+
+    if args.output:
+        args.output.write_text(json.dumps({
+            "commit": git_commit(),
+            "finished_at": datetime.now(timezone.utc).isoformat(),
+            "args": {
+                key: str(value) for key, value in vars(args).items()
+            },
+            "routes": report,
+            "app_metrics": app_metrics,
+        }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
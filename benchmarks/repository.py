@@ -0,0 +1,153 @@
+"""
+ComplaintRepository micro-benchmarks across dataset sizes.
+
+For every size a synthetic dataset is generated (see benchmarks.dataset),
+then every repository method is timed on it. The report shows the median
+time per call and how it scales relative to the smallest dataset.
+
+Usage:
+    poetry run python -m benchmarks.repository --sizes 10000,100000,1000000
+"""
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Awaitable, Callable
+
+from benchmarks.dataset import generate_dataset
+from src.core.config import DbSettings
+from src.core.database import create_engine, create_session_maker
+from src.models.enums import ComplaintStatus, ComplaintCategory
+from src.models.schemas import (
+    ComplaintCreate, ComplaintUpdate, ComplaintFilters, ComplaintBulkUpdate
+)
+from src.repositories import ComplaintRepository
+
+
+def benchmarks(
+        size: int
+) -> dict[str, Callable[[ComplaintRepository], Awaitable]]:
+    """
+    Repository calls to time, archiving goes last as it moves rows.
+    :param size: Dataset size, used to pick existing ids.
+    :return: Benchmark name to repository call.
+    """
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    last_hour = ComplaintFilters(
+        status=ComplaintStatus.OPEN,
+        timestamp={"start_date": now - timedelta(hours=1), "end_date": now}
+    )
+    last_week_payment = ComplaintFilters(
+        category=ComplaintCategory.PAYMENT,
+        timestamp={"start_date": now - timedelta(days=7), "end_date": now}
+    )
+
+    return {
+        "get_complaints_list[last_hour_open]":
+            lambda repo: repo.get_complaints_list(last_hour),
+        "get_complaints_rows[last_hour_open]":
+            lambda repo: repo.get_complaints_rows(last_hour),
+        "get_complaints_rows[last_week_payment]":
+            lambda repo: repo.get_complaints_rows(last_week_payment),
+        "create_complaint":
+            lambda repo: repo.create_complaint(
+                ComplaintCreate(text="Benchmark complaint")
+            ),
+        "update_complaint":
+            lambda repo: repo.update_complaint(
+                ComplaintUpdate(
+                    id=random.randint(1, size),
+                    category=ComplaintCategory.PAYMENT
+                )
+            ),
+        "bulk_update_complaints[100_ids]":
+            lambda repo: repo.bulk_update_complaints(
+                ComplaintBulkUpdate(
+                    ids=random.sample(range(1, size + 1), min(100, size)),
+                    values={"category": ComplaintCategory.TECHNICAL}
+                )
+            ),
+        "archive_closed_complaints":
+            lambda repo: repo.archive_closed_complaints(
+                now - timedelta(days=30), batch_size=500
+            ),
+    }
+
+
+async def time_call(
+        session_maker: Any,
+        call: Callable[[ComplaintRepository], Awaitable],
+        repeat: int
+) -> float:
+    """Median seconds per call, every call gets a fresh session."""
+    timings = []
+    for _ in range(repeat):
+        async with session_maker() as session:
+            repository = ComplaintRepository(session)
+            started = time.perf_counter()
+            await call(repository)
+            timings.append(time.perf_counter() - started)
+    return statistics.median(timings)
+
+
+async def run_size(
+        database: Path,
+        size: int,
+        repeat: int
+) -> dict[str, float]:
+    engine = create_engine(DbSettings(
+        DB_URL=f"sqlite+aiosqlite:///{database}",
+        DB_URL_SYNC=f"sqlite:///{database}"
+    ))
+    session_maker = create_session_maker(engine)
+    try:
+        results = {}
+        for name, call in benchmarks(size).items():
+            calls = 1 if name == "archive_closed_complaints" else repeat
+            results[name] = await time_call(session_maker, call, calls)
+        return results
+    finally:
+        await engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", default="10000,100000,1000000")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", type=Path)
+    args = parser.parse_args()
+    sizes = [int(size) for size in args.sizes.split(",")]
+
+    report: dict[int, dict[str, float]] = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in sizes:
+            database = Path(tmp) / f"complaints_{size}.sqlite"
+            generate_dataset(database, size)
+            report[size] = asyncio.run(run_size(database, size, args.repeat))
+            database.unlink()
+
+    base = sizes[0]
+    print(f"{'method':<42}" + "".join(f"{size:>16}" for size in sizes))
+    for name in report[base]:
+        cells = "".join(
+            f"{report[size][name] * 1000:>9.2f} ms"
+            f"{report[size][name] / report[base][name]:>5.0f}x"
+            for size in sizes
+        )
+        print(f"{name:<42}{cells}")
+
+    if args.output:
+        args.output.write_text(json.dumps({
+            "sizes": sizes,
+            "repeat": args.repeat,
+            "median_seconds": report,
+        }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Serialization microbenchmark for list responses.
+
+Compares the default FastAPI path (ORM entities validated into
+list[ComplaintListResponse], then encoded by the stdlib JSON encoder)
+with the fast path (column rows as dicts rendered by FastJSONResponse).
+
+Usage:
+    poetry run python -m benchmarks.serialization --rows 10000
+"""
+import argparse
+import random
+import timeit
+from collections import namedtuple
+from types import SimpleNamespace
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pydantic import TypeAdapter
+
+from src.core.responses import FastJSONResponse
+from src.models.enums import (
+    ComplaintStatus, ComplaintSentiment, ComplaintCategory
+)
+from src.models.schemas import ComplaintListResponse
+
+
+ComplaintRow = namedtuple(
+    "ComplaintRow", list(ComplaintListResponse.model_fields)
+)
+list_adapter = TypeAdapter(list[ComplaintListResponse])
+
+
+def make_rows(count: int) -> list[ComplaintRow]:
+    return [
+        ComplaintRow(
+            id=i,
+            text="Complaint text " * random.randint(1, 30),
+            status=random.choice(list(ComplaintStatus)),
+            sentiment=random.choice(list(ComplaintSentiment)),
+            category=random.choice(list(ComplaintCategory)),
+        )
+        for i in range(count)
+    ]
+
+
+def default_path(entities: list[SimpleNamespace]) -> bytes:
+    validated = list_adapter.validate_python(entities, from_attributes=True)
+    content = jsonable_encoder(list_adapter.dump_python(validated))
+    return JSONResponse(content).body
+
+
+def fast_path(rows: list[ComplaintRow]) -> bytes:
+    return FastJSONResponse([row._asdict() for row in rows]).body
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    rows = make_rows(args.rows)
+    entities = [SimpleNamespace(**row._asdict()) for row in rows]
+
+    results = {
+        "default": min(timeit.repeat(
+            lambda: default_path(entities), number=1, repeat=args.repeat
+        )),
+        "fast": min(timeit.repeat(
+            lambda: fast_path(rows), number=1, repeat=args.repeat
+        )),
+    }
+    for name, seconds in results.items():
+        print(f"{name:>8}: {seconds * 1000:8.2f} ms per {args.rows} rows")
+    print(f" speedup: {results['default'] / results['fast']:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
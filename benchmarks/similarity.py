@@ -0,0 +1,91 @@
+"""
+Similar complaints index benchmark: build, save, load and query latency.
+
+Indexes texts from the synthetic dataset generator, saves and reloads
+the index file, then times `search` for stored complaints (GET
+/{id}/similar) and for new texts (POST /similar).
+
+Usage:
+    poetry run python -m benchmarks.similarity --rows 1000000
+"""
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+from benchmarks.dataset import generate_rows
+from src.core.similarity import SimilarityIndex
+
+
+def percentiles(samples: list[float]) -> dict[str, float]:
+    samples = sorted(samples)
+    return {
+        "p50_ms": round(statistics.median(samples) * 1000, 3),
+        "p99_ms": round(samples[int(len(samples) * 0.99)] * 1000, 3),
+        "max_ms": round(samples[-1] * 1000, 3),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--queries", type=int, default=1000)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--max-candidates", type=int, default=5000)
+    parser.add_argument("--output", type=Path)
+    args = parser.parse_args()
+
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    texts = [row[1] for row in generate_rows(args.rows, 365, now)]
+    report: dict = {"rows": args.rows}
+
+    index = SimilarityIndex(max_candidates=args.max_candidates)
+    started = time.perf_counter()
+    for complaint_id, text in enumerate(texts, 1):
+        index.add(complaint_id, text)
+    report["build_s"] = round(time.perf_counter() - started, 2)
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = Path(directory) / "similarity.idx"
+        started = time.perf_counter()
+        asyncio.run(index.save(path))
+        report["save_s"] = round(time.perf_counter() - started, 3)
+        report["file_mb"] = round(path.stat().st_size / 2 ** 20, 1)
+
+        started = time.perf_counter()
+        index = SimilarityIndex.load(
+            path, max_candidates=args.max_candidates
+        )
+        report["load_s"] = round(time.perf_counter() - started, 3)
+
+    by_id = []
+    for complaint_id in random.sample(
+            range(1, args.rows + 1), min(args.queries, args.rows)
+    ):
+        started = time.perf_counter()
+        index.search(
+            index.signature_of(complaint_id), args.k, exclude=complaint_id
+        )
+        by_id.append(time.perf_counter() - started)
+    report["by_id"] = percentiles(by_id)
+
+    by_text = []
+    for text in random.sample(texts, min(args.queries, args.rows)):
+        started = time.perf_counter()
+        index.search(index.text_signature(text + " again"), args.k)
+        by_text.append(time.perf_counter() - started)
+    report["by_text"] = percentiles(by_text)
+    report["index"] = index.stats()
+
+    print(json.dumps(report, indent=2))
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
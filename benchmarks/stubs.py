@@ -0,0 +1,131 @@
+"""
+Local stub of the upstream APIs (apilayer, ip-api, OpenRouter).
+
+One stub app serves the routes of all three APIs, run one process
+per upstream to give each its own latency and error profile.
+
+Latency specs:
+    none                    no delay
+    fixed:MS                constant delay
+    uniform:LOW_MS:HIGH_MS  uniformly distributed delay
+    lognormal:MEDIAN_MS:SIGMA  long-tailed delay
+
+Usage:
+    poetry run python -m benchmarks.stubs --port 9001 \\
+        --latency lognormal:80:0.6 --error-rate 0.01 \\
+        --burst-every 30 --burst-length 2
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+from typing import Any, AsyncIterator, Callable
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+
+def parse_latency(spec: str) -> Callable[[], float]:
+    """
+    Parses a latency spec into a sampler.
+    :param spec: Latency spec, see module docstring.
+    :return: Callable returning a delay in seconds.
+    """
+    kind, *params = spec.split(":")
+    values = [float(param) / 1000 for param in params]
+    if kind == "none":
+        return lambda: 0.0
+    if kind == "fixed":
+        return lambda: values[0]
+    if kind == "uniform":
+        return lambda: random.uniform(values[0], values[1])
+    if kind == "lognormal":
+        median, sigma = values[0], float(params[1])
+        return lambda: median * random.lognormvariate(0, sigma)
+    raise ValueError(f"Unknown latency spec: {spec}")
+
+
+def create_stub_app(
+        latency: Callable[[], float],
+        error_rate: float = 0.0,
+        burst_every: float = 0.0,
+        burst_length: float = 0.0
+) -> FastAPI:
+    """
+    Creates the stub app.
+    :param latency: Delay sampler.
+    :param error_rate: Share of requests answered with 500.
+    :param burst_every: Period of 429 bursts in seconds, 0 disables them.
+    :param burst_length: Duration of every 429 burst in seconds.
+    :return: FastAPI application.
+    """
+    app = FastAPI()
+    started = time.monotonic()
+
+    @app.middleware("http")
+    async def upstream_behaviour(request: Request, call_next):
+        await asyncio.sleep(latency())
+        elapsed = time.monotonic() - started
+        if burst_every and elapsed % burst_every < burst_length:
+            return JSONResponse({"message": "rate limited"}, status_code=429)
+        if random.random() < error_rate:
+            return JSONResponse({"message": "stub error"}, status_code=500)
+        return await call_next(request)
+
+    @app.post("/sentiment/analysis")
+    async def sentiment() -> dict[str, Any]:
+        return {
+            "sentiment": random.choice(["positive", "negative", "neutral"])
+        }
+
+    @app.post("/api/v1/completions")
+    async def completions(request: Request) -> Any:
+        category = random.choice(["technical", "payment", "other"])
+        if not (await request.json()).get("stream"):
+            return {"choices": [{"text": f"{category}\n"}]}
+
+        async def events() -> AsyncIterator[str]:
+            for token in (" " + category[:3], category[3:], "\n", " ok"):
+                await asyncio.sleep(latency() / 10)
+                chunk = json.dumps({"choices": [{"text": token}]})
+                yield f"data: {chunk}\n\n"
+            yield "data: [DONE]\n\n"
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    @app.get("/json/{ip}")
+    async def ip_info(ip: str) -> dict[str, Any]:
+        return {"query": ip, "status": "success", "country": "Stubland"}
+
+    @app.post("/batch")
+    async def ip_info_batch(request: Request) -> list[dict[str, Any]]:
+        return [
+            {"query": ip, "status": "success", "country": "Stubland"}
+            for ip in await request.json()
+        ]
+
+    return app
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, required=True)
+    parser.add_argument("--latency", default="none")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--burst-every", type=float, default=0.0)
+    parser.add_argument("--burst-length", type=float, default=0.0)
+    args = parser.parse_args()
+
+    app = create_stub_app(
+        parse_latency(args.latency),
+        error_rate=args.error_rate,
+        burst_every=args.burst_every,
+        burst_length=args.burst_length
+    )
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
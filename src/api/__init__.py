@@ -1,4 +1,6 @@
+from .routers.admin import router as admin_router
+from .routers.analytics import router as analytics_router
 from .routers.complaints import router as complaints_router
 
 
-__all__ = ["complaints_router", ]
+__all__ = ["admin_router", "analytics_router", "complaints_router", ]
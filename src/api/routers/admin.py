@@ -0,0 +1,212 @@
+from typing import Any, Literal, Optional
+
+from fastapi import APIRouter, Query
+from fastapi.responses import FileResponse
+from starlette import status
+
+from src.core.dependencies import (
+    ComplaintServiceDep, OutboxRepositoryDep, AdminTokenDep, ShardSetDep,
+    AbuseDetectorDep
+)
+from src.core.exceptions import NotFoundException, ServiceUnavailable
+from src.core.metrics import metrics
+from src.core.profiler import list_profiles, get_profile_path
+from src.core.slow_queries import slow_query_log
+from src.core.tracing import tracer
+
+router = APIRouter()
+
+
+@router.get(
+    "/metrics",
+    dependencies=[AdminTokenDep],
+    status_code=status.HTTP_200_OK
+)
+async def get_metrics() -> dict[str, Any]:
+    """
+    Get in-process metrics.
+    :return: Metrics snapshot.
+    """
+    return metrics.snapshot()
+
+
+@router.post(
+    "/archive",
+    dependencies=[AdminTokenDep],
+    status_code=status.HTTP_200_OK
+)
+async def archive_complaints(
+        service: ComplaintServiceDep
+) -> dict[str, int]:
+    """
+    Move old closed complaints to the archive table.
+    Meant to be triggered periodically (cron, n8n schedule).
+    :param service: ComplaintService object.
+    :return: Number of archived complaints.
+    """
+    archived = await service.archive_closed_complaints()
+    return {"archived": archived}
+
+
+@router.get(
+    "/outbox",
+    dependencies=[AdminTokenDep],
+    status_code=status.HTTP_200_OK
+)
+async def get_outbox_state(
+        repository: OutboxRepositoryDep
+) -> dict[str, int]:
+    """
+    Count outbox events by delivery status.
+    :param repository: OutboxRepository object.
+    :return: Status to number of events.
+    """
+    return await repository.count_by_status()
+
+
+@router.get(
+    "/shards",
+    dependencies=[AdminTokenDep],
+    status_code=status.HTTP_200_OK
+)
+async def get_shards(shards: ShardSetDep) -> list[dict[str, Any]]:
+    """
+    List complaint shards, oldest first.
+    :param shards: ShardSet object.
+    :return: Shard keys, files, sizes and read-only flags.
+    """
+    return shards.stats()
+
+
+@router.post(
+    "/shards/{key}/seal",
+    dependencies=[AdminTokenDep],
+    status_code=status.HTTP_200_OK
+)
+async def seal_shard(key: int, shards: ShardSetDep) -> dict[str, Any]:
+    """
+    Vacuum a shard of a past period and make it read-only.
+    :param key: Shard key, e.g. 202510.
+    :param shards: ShardSet object.
+    :return: Sealed shard.
+    """
+    shard = await shards.seal(key)
+    return shard.stats()
+
+
+@router.get(
+    "/abuse",
+    dependencies=[AdminTokenDep],
+    status_code=status.HTTP_200_OK
+)
+async def get_top_offenders(
+        abuse_detector: AbuseDetectorDep,
+        limit: int = Query(default=20, ge=1, le=100)
+) -> dict[str, Any]:
+    """
+    List the heaviest complaint sources by IP, subnet and text.
+    :param abuse_detector: AbuseDetector object.
+    :param limit: Max number of sources.
+    :return: Detector counters and top offenders.
+    """
+    if abuse_detector is None:
+        raise ServiceUnavailable(details="Abuse detection is disabled")
+    return {
+        **abuse_detector.stats(),
+        "top": abuse_detector.top_offenders(limit),
+    }
+
+
+@router.get(
+    "/slow-queries",
+    dependencies=[AdminTokenDep],
+    status_code=status.HTTP_200_OK
+)
+async def get_slow_queries(
+        limit: int = Query(default=20, ge=1, le=100),
+        sort: Literal[
+            "total_ms", "max_ms", "calls", "slow_calls"
+        ] = "total_ms"
+) -> dict[str, Any]:
+    """
+    List SQL statements aggregated by fingerprint, heaviest first.
+    Slow ones have their parameter shapes and query plan.
+    :param limit: Max number of statements.
+    :param sort: Field to sort by.
+    :return: Slow query log counters and statements.
+    """
+    return {
+        **slow_query_log.stats(),
+        "threshold_ms": slow_query_log.threshold_ms,
+        "queries": slow_query_log.top(limit, sort),
+    }
+
+
+@router.get(
+    "/traces",
+    dependencies=[AdminTokenDep],
+    status_code=status.HTTP_200_OK
+)
+async def get_traces(
+        limit: int = Query(default=20, ge=1, le=100),
+        name: Optional[str] = Query(default=None, max_length=255),
+        min_duration_ms: float = Query(default=0.0, ge=0),
+        errors: bool = False
+) -> list[dict[str, Any]]:
+    """
+    List sampled request traces, newest first.
+    :param limit: Max number of traces.
+    :param name: Root span name substring, e.g. `/add`.
+    :param min_duration_ms: Min request duration.
+    :param errors: Only traces with a failed span.
+    :return: Traces with their number of spans.
+    """
+    return tracer.buffer.query(limit, name, min_duration_ms, errors)
+
+
+@router.get(
+    "/traces/{trace_id}",
+    dependencies=[AdminTokenDep],
+    status_code=status.HTTP_200_OK
+)
+async def get_trace(trace_id: str) -> dict[str, Any]:
+    """
+    Get a sampled request trace with all its spans.
+    :param trace_id: Trace id, also sent in the X-Trace-Id header.
+    :return: Trace.
+    """
+    trace = tracer.buffer.get(trace_id)
+    if trace is None:
+        raise NotFoundException(details=f"Trace {trace_id} not found")
+    return trace
+
+
+@router.get(
+    "/profiles",
+    dependencies=[AdminTokenDep],
+    status_code=status.HTTP_200_OK
+)
+async def get_profiles() -> list[dict[str, Any]]:
+    """
+    List stored request profiles, newest first.
+    :return: Profile names, sizes and creation times.
+    """
+    return list_profiles()
+
+
+@router.get(
+    "/profiles/{name}",
+    dependencies=[AdminTokenDep],
+    response_class=FileResponse,
+    status_code=status.HTTP_200_OK
+)
+async def download_profile(name: str) -> FileResponse:
+    """
+    Download a request profile in folded stack format.
+    :param name: Profile file name.
+    :return: Profile file.
+    """
+    path = get_profile_path(name)
+    if path is None:
+        raise NotFoundException(details=f"Profile {name} not found")
+    return FileResponse(path, media_type="text/plain", filename=name)
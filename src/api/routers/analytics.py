@@ -0,0 +1,57 @@
+from datetime import datetime
+from typing import Literal, Optional
+
+from fastapi import APIRouter, Query
+from starlette import status
+
+from src.core.analytics import GROUP_BY
+from src.core.dependencies import AnalyticsSnapshotDep
+from src.models.enums import (
+    ComplaintStatus, ComplaintSentiment, ComplaintCategory
+)
+from src.models.schemas import AnalyticsCountResponse
+
+router = APIRouter()
+
+
+@router.get(
+    "/count",
+    response_model=AnalyticsCountResponse,
+    status_code=status.HTTP_200_OK
+)
+async def count_complaints(
+        snapshot: AnalyticsSnapshotDep,
+        complaint_status: Optional[list[ComplaintStatus]] = Query(
+            default=None, alias="status"
+        ),
+        category: Optional[list[ComplaintCategory]] = Query(default=None),
+        sentiment: Optional[list[ComplaintSentiment]] = Query(default=None),
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+        group_by: Optional[Literal[GROUP_BY]] = None,
+):
+    """
+    Count complaints on the columnar snapshot, hot and archived.
+    Repeat a filter to accept several values, e.g.
+    `?category=payment&sentiment=negative&group_by=weekday`.
+    The snapshot is refreshed every ANALYTICS_REFRESH_INTERVAL seconds.
+    :param snapshot: AnalyticsSnapshot object.
+    :param complaint_status: Accepted statuses.
+    :param category: Accepted categories.
+    :param sentiment: Accepted sentiments.
+    :param start_date: Inclusive range start.
+    :param end_date: Inclusive range end.
+    :param group_by: status, sentiment, category, weekday, hour,
+        day or month (UTC).
+    :return: AnalyticsCountResponse.
+    """
+    return snapshot.count(
+        {
+            "status": complaint_status or [],
+            "category": category or [],
+            "sentiment": sentiment or [],
+        },
+        start_date,
+        end_date,
+        group_by
+    )
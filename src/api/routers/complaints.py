@@ -1,24 +1,37 @@
+import json
+import re
+from contextlib import aclosing
 from datetime import datetime, timedelta, timezone
-from typing import Any
+from typing import Optional
 
 from fastapi import (
-    APIRouter, Request
+    APIRouter, Request, Response, Header, Query
 )
 from starlette import status
 
-from src.core.config import logger
+from src.core.config import (
+    logger, get_classifier_settings, get_abuse_settings
+)
 from src.core.dependencies import (
-    ComplaintServiceDep,
-    ApiLayerClientDep, ApiIPClientDep, ApiHuggingFaceClientDep
+    ComplaintServiceDep, IPInfoResolverDep, IdempotencyStoreDep,
+    ApiLayerClientDep, ApiHuggingFaceClientDep, AbuseDetectorDep,
+    PreFilterDep
+)
+from src.core.exceptions import (
+    APIError, TooManyRequests, ValidationException
 )
-from src.core.exceptions import APIError, TooManyRequests
+from src.core.idempotency import IdempotencyStore
+from src.core.metrics import metrics
+from src.core.responses import FastJSONResponse
 from src.models.enums import (
     ComplaintSentiment, ComplaintCategory,
     ComplaintStatus
 )
 from src.models.schemas import (
     ComplaintResponse, ComplaintCreate, ComplaintFilters,
-    ComplaintListResponse, ComplaintUpdate
+    ComplaintListResponse, ComplaintUpdate,
+    ComplaintBulkUpdate, ComplaintBulkUpdateResponse,
+    ComplaintSimilarRequest, ComplaintSimilarResponse
 )
 
 router = APIRouter()
@@ -26,16 +39,32 @@ router = APIRouter()
 
 ip_request_cache: dict[str, datetime] = {}
 
+CATEGORY_PROMPT = (
+    "Classify the category of complaint "
+    f"({'/'.join(category.value for category in ComplaintCategory)}): "
+    "{text}. Answer me with one word."
+)
+CATEGORIES = frozenset(category.value for category in ComplaintCategory)
 
-async def get_ip_info(
-        ip: str,
-        client: ApiIPClientDep
-) -> dict[str, Any] | None:
-    try:
-        response = await client.get(f"/json/{ip}")
-    except APIError:
-        response = None
-    return response
+
+def find_category(
+        generated: str,
+        final: bool = False
+) -> ComplaintCategory | None:
+    """
+    Finds the first complete word naming a category.
+    :param generated: Text generated so far.
+    :param final: Whether the generation is over, so the last word
+        is complete too.
+    :return: Complaint category if found, None otherwise.
+    """
+    words = re.findall(r"[a-z]+", generated.lower())
+    if words and not final and generated[-1:].isalpha():
+        words.pop()
+    for word in words:
+        if word in CATEGORIES:
+            return ComplaintCategory(word)
+    return None
 
 
 async def get_complaint_category(
@@ -44,39 +73,41 @@ async def get_complaint_category(
 ) -> ComplaintCategory | None:
     """
     Request to OpenRouter (Mistral-7B-v0.3) to classify the complaint category.
+    The completion is streamed and capped by CLASSIFIER_MAX_TOKENS,
+    reading stops as soon as a category word is generated.
     :param text: Input complaint text.
     :param client: External API Client.
     :return: Complaint category if successful, None otherwise.
     """
+    settings = get_classifier_settings()
+    prompt = CATEGORY_PROMPT.format(
+        text=" ".join(text.split())[:settings.CLASSIFIER_MAX_TEXT_LENGTH]
+    )
+    generated = ""
     try:
-        try:
-            response = await client.post(
+        async with aclosing(client.stream_lines(
+                "POST",
                 "api/v1/completions",
                 json={
-                    "prompt": "Classify the category of complaint "
-                              "(technical/payment/neutral): "
-                              f"{text}."
-                              f"Answer me with one word."
+                    "prompt": prompt,
+                    "max_tokens": settings.CLASSIFIER_MAX_TOKENS,
+                    "stream": True,
                 }
-            )
-            category_raw = response["choices"][0]["text"]
-            category = ComplaintCategory(
-                category_raw.split("\n")[0].strip().lower()
-            )
-            return category
-        except APIError:
-            return None
-        except ValueError:
-            if "payment" in category_raw:
-                return ComplaintCategory("payment")
-            elif "technical" in category_raw:
-                return ComplaintCategory("technical")
-            elif "neutral" in category_raw:
-                return ComplaintCategory("neutral")
-            else:
-                return None
+        )) as lines:
+            async for line in lines:
+                if not line.startswith("data:"):
+                    continue
+                data = line.removeprefix("data:").strip()
+                if data == "[DONE]":
+                    break
+                generated += json.loads(data)["choices"][0].get("text", "")
+                if category := find_category(generated):
+                    metrics.inc("classifier_early_cutoff")
+                    return category
     except Exception:
+        # Classification is best effort, the complaint is saved anyway.
         return None
+    return find_category(generated, final=True)
 
 
 @router.post(
@@ -86,60 +117,112 @@ async def get_complaint_category(
 )
 async def add_complaint(
         request: Request,
+        response: Response,
         complaint: ComplaintCreate,
         service: ComplaintServiceDep,
         api_layer_client: ApiLayerClientDep,
-        api_ip_client: ApiIPClientDep,
-        api_hugging_face_client: ApiHuggingFaceClientDep
+        ip_info_resolver: IPInfoResolverDep,
+        api_hugging_face_client: ApiHuggingFaceClientDep,
+        idempotency_store: IdempotencyStoreDep,
+        abuse_detector: AbuseDetectorDep,
+        prefilter: PreFilterDep,
+        idempotency_key: Optional[str] = Header(default=None, max_length=255)
 ):
     """
     Save a new complaint.
+    With an Idempotency-Key header, retries of the same request
+    replay the first response (Idempotent-Replayed: true)
+    instead of creating a duplicate.
+    Floods by IP, subnet or text are rejected, or saved without
+    paid enrichment with ABUSE_ACTION=deprioritize.
+    Empty, gibberish and spam texts are rejected with 422
+    before any upstream call.
     """
+    if prefilter is not None and (rule := prefilter.check(complaint.text)):
+        metrics.inc(f"prefilter_{rule}")
+        raise ValidationException(
+            "Complaint text is rejected.", details=f"Rule: {rule}"
+        )
+
+    fingerprint = IdempotencyStore.fingerprint(
+        complaint.model_dump_json().encode()
+    )
 
-    client_ip = request.client.host
-    now = datetime.now()
-    last_request: datetime | None = ip_request_cache.get(client_ip, None)
+    async def create() -> ComplaintResponse:
+        client_ip = request.client.host
+        offense = None
+        if abuse_detector is not None:
+            offense = abuse_detector.check(client_ip, complaint.text)
+        if offense is not None:
+            metrics.inc(f"abuse_{offense}")
+            if get_abuse_settings().ABUSE_ACTION == "reject":
+                raise TooManyRequests(
+                    details=f"Too many complaints from this {offense}."
+                )
 
-    if last_request and now - last_request < timedelta(seconds=10):
-        raise TooManyRequests(
-            details=f"Try again "
-                    f"in {
-                        max(0, round((now - last_request).total_seconds()))
-                    } seconds later."
+        now = datetime.now()
+        last_request: datetime | None = ip_request_cache.get(client_ip, None)
+
+        if last_request and now - last_request < timedelta(seconds=10):
+            raise TooManyRequests(
+                details=f"Try again "
+                        f"in {
+                            max(0, round(
+                                (now - last_request).total_seconds()
+                            ))
+                        } seconds later."
+            )
+        ip_request_cache[client_ip] = now
+
+        if offense is not None:
+            # Deprioritized offenders are still throttled per IP above.
+            logger.info(f"Complaint from {client_ip} is not enriched")
+            return ComplaintResponse.model_validate(
+                await service.add_complaint(complaint)
+            )
+
+        # IP info is only logged, keep it off the critical path.
+        ip_info_resolver.submit(client_ip)
+
+        classified_category = await get_complaint_category(
+            complaint.text,
+            api_hugging_face_client
         )
-    ip_request_cache[client_ip] = now
+        logger.info(f"Classify complaint response: {classified_category}")
 
-    full_ip_info = await get_ip_info(client_ip, api_ip_client)
-    logger.info(f"Got user info for {client_ip}: {full_ip_info}")
+        try:
+            body = complaint.text.encode("utf-8")
+            sentiment_raw = await api_layer_client.post(
+                "sentiment/analysis",
+                data=body
+            )
+            sentiment = ComplaintSentiment(sentiment_raw["sentiment"])
+        except APIError:
+            sentiment = ComplaintSentiment("unknown")
 
-    classified_category = await get_complaint_category(
-        complaint.text,
-        api_hugging_face_client
-    )
-    logger.info(f"Classify complaint response: {classified_category}")
+        complaint.sentiment = sentiment
+        if classified_category:
+            complaint.category = classified_category
 
-    try:
-        body = complaint.text.encode("utf-8")
-        sentiment_raw = await api_layer_client.post(
-            "sentiment/analysis",
-            data=body
+        return ComplaintResponse.model_validate(
+            await service.add_complaint(complaint)
         )
-        sentiment = ComplaintSentiment(sentiment_raw["sentiment"])
-    except APIError:
-        sentiment = ComplaintSentiment("unknown")
 
-    complaint.sentiment = sentiment
-    if classified_category:
-        complaint.category = classified_category
+    if idempotency_key is None:
+        return await create()
 
-    return await service.add_complaint(
-        complaint
+    result, replayed = await idempotency_store.run(
+        idempotency_key, fingerprint, create
     )
+    if replayed:
+        response.headers["Idempotent-Replayed"] = "true"
+    return result
 
 
 @router.get(
     "/get_new_complaints",
     response_model=list[ComplaintListResponse] | None,
+    response_class=FastJSONResponse,
     status_code=status.HTTP_200_OK
 )
 async def get_new_complaints(
@@ -150,7 +233,7 @@ async def get_new_complaints(
     Get all new complaints by the last hour.
     :param request: Request object.
     :param service: ComplaintService object.
-    :return: list of ComplaintResponse.
+    :return: list of ComplaintListResponse.
     """
     filters = ComplaintFilters(
         status=ComplaintStatus.OPEN,
@@ -159,10 +242,56 @@ async def get_new_complaints(
             "end_date": datetime.now(timezone.utc)
         }
     )
-    complaints = await service.get_complaints_by_time_range(
+    complaints = await service.get_complaint_rows_by_time_range(
         filters
     )
-    return complaints
+    return FastJSONResponse(complaints)
+
+
+@router.post(
+    "/similar",
+    response_model=list[ComplaintSimilarResponse],
+    response_class=FastJSONResponse,
+    status_code=status.HTTP_200_OK
+)
+async def find_similar_complaints(
+        request: Request,
+        query: ComplaintSimilarRequest,
+        service: ComplaintServiceDep,
+):
+    """
+    Find past complaints similar to a text.
+    :param request: Request object.
+    :param query: Text and number of results as ComplaintSimilarRequest.
+    :param service: ComplaintService object.
+    :return: list of ComplaintSimilarResponse, most similar first.
+    """
+    complaints = await service.find_similar_complaints(query.text, query.k)
+    return FastJSONResponse(complaints)
+
+
+@router.get(
+    "/{complaint_id}/similar",
+    response_model=list[ComplaintSimilarResponse],
+    response_class=FastJSONResponse,
+    status_code=status.HTTP_200_OK
+)
+async def get_similar_complaints(
+        request: Request,
+        complaint_id: int,
+        service: ComplaintServiceDep,
+        k: int = Query(default=10, ge=1, le=100),
+):
+    """
+    Find past complaints similar to a stored one.
+    :param request: Request object.
+    :param complaint_id: Complaint id.
+    :param service: ComplaintService object.
+    :param k: Max number of results.
+    :return: list of ComplaintSimilarResponse, most similar first.
+    """
+    complaints = await service.get_similar_complaints(complaint_id, k)
+    return FastJSONResponse(complaints)
 
 
 @router.patch(
@@ -186,3 +315,26 @@ async def update_complaint(
         complaint
     )
     return updated
+
+
+@router.patch(
+    "/bulk_update",
+    response_model=ComplaintBulkUpdateResponse,
+    status_code=status.HTTP_200_OK
+)
+async def bulk_update_complaints(
+        request: Request,
+        data: ComplaintBulkUpdate,
+        service: ComplaintServiceDep,
+):
+    """
+    Update many complaints in one transaction.
+    Targets are either a list of ids or filters.
+    expected_status updates only rows still in that status,
+    strict rolls back unless every id was updated (409).
+    :param request: Request object.
+    :param data: Targets and values as ComplaintBulkUpdate schema.
+    :param service: ComplaintService object.
+    :return: ComplaintBulkUpdateResponse.
+    """
+    return await service.bulk_update_complaints(data)
@@ -0,0 +1,265 @@
+import array
+import hashlib
+import ipaddress
+import re
+import struct
+import time
+from typing import Any, Callable, Optional
+
+from src.core.config import AbuseSettings
+
+COUNTER_MAX = 2 ** 32 - 1
+NON_WORD_RE = re.compile(r"\W+")
+DIMENSIONS = ("ip", "subnet", "text")
+
+
+def _key_hash(key: str) -> tuple[int, int]:
+    return struct.unpack(
+        "<QQ", hashlib.blake2b(key.encode(), digest_size=16).digest()
+    )
+
+
+class CountMinSketch:
+    """
+    Count-Min sketch with conservative update: `depth` rows of `width`
+    counters, a key is counted in one cell per row and estimated
+    by the smallest of them, so estimates never undercount.
+    """
+    def __init__(self, width: int, depth: int) -> None:
+        self.width = width
+        self.depth = depth
+        self.table = array.array("I", bytes(4 * width * depth))
+
+    def cells(self, key: str) -> list[int]:
+        h1, h2 = _key_hash(key)
+        return [
+            row * self.width + (h1 + row * h2) % self.width
+            for row in range(self.depth)
+        ]
+
+    def estimate(self, cells: list[int]) -> int:
+        return min(self.table[cell] for cell in cells)
+
+    def add(self, cells: list[int]) -> int:
+        """
+        Counts one occurrence.
+        :param cells: Cells of the key.
+        :return: New estimate.
+        """
+        count = min(self.estimate(cells) + 1, COUNTER_MAX)
+        for cell in cells:
+            if self.table[cell] < count:
+                self.table[cell] = count
+        return count
+
+    def clear(self) -> None:
+        self.table = array.array("I", bytes(4 * self.width * self.depth))
+
+
+class DecayingSketch:
+    """
+    Sliding window count over two Count-Min sketches: the current
+    window and the previous one, weighted by how much of it
+    still overlaps the sliding window.
+    """
+    def __init__(
+            self,
+            width: int,
+            depth: int,
+            window: float,
+            clock: Callable[[], float]
+    ) -> None:
+        self.window = window
+        self.clock = clock
+        self.current = CountMinSketch(width, depth)
+        self.previous = CountMinSketch(width, depth)
+        self.started = clock()
+
+    def rotate(self) -> bool:
+        """
+        Starts a new window when the current one is over.
+        :return: Whether the window was rotated.
+        """
+        elapsed = self.clock() - self.started
+        if elapsed < self.window:
+            return False
+        self.previous, self.current = self.current, self.previous
+        self.current.clear()
+        if elapsed >= 2 * self.window:
+            self.previous.clear()
+        self.started += elapsed - elapsed % self.window
+        return True
+
+    def _previous(self, cells: list[int]) -> float:
+        weight = 1 - (self.clock() - self.started) / self.window
+        return self.previous.estimate(cells) * max(weight, 0.0)
+
+    def add(self, key: str) -> float:
+        """
+        Counts one occurrence of a key.
+        :param key: Key.
+        :return: Estimated count in the sliding window.
+        """
+        cells = self.current.cells(key)
+        return self.current.add(cells) + self._previous(cells)
+
+    def estimate(self, key: str) -> float:
+        cells = self.current.cells(key)
+        return self.current.estimate(cells) + self._previous(cells)
+
+
+class SpaceSaving:
+    """
+    Space-Saving top-k: at most `capacity` counters, a new key
+    takes over the smallest one and inherits its count.
+    """
+    def __init__(self, capacity: int) -> None:
+        self.capacity = capacity
+        self.counts: dict[str, int] = {}
+
+    def add(self, key: str) -> None:
+        if key in self.counts or len(self.counts) < self.capacity:
+            self.counts[key] = self.counts.get(key, 0) + 1
+            return
+        smallest = min(self.counts, key=self.counts.__getitem__)
+        self.counts[key] = self.counts.pop(smallest) + 1
+
+    def decay(self) -> None:
+        """
+        Halves the counts, so old heavy hitters fade out.
+        :return: None
+        """
+        self.counts = {
+            key: count // 2 for key, count in self.counts.items()
+            if count > 1
+        }
+
+    def top(self, n: int) -> list[tuple[str, int]]:
+        return sorted(
+            self.counts.items(), key=lambda item: item[1], reverse=True
+        )[:n]
+
+
+def subnet_of(ip: str) -> str:
+    """
+    :param ip: IP address.
+    :return: /24 network for IPv4, /48 for IPv6, the value as is
+        if it is not an IP address.
+    """
+    try:
+        address = ipaddress.ip_address(ip)
+    except ValueError:
+        return ip
+    prefix = 24 if address.version == 4 else 48
+    return str(ipaddress.ip_network(f"{address}/{prefix}", strict=False))
+
+
+def text_fingerprint(text: str) -> str:
+    """
+    :param text: Complaint text.
+    :return: Hash of the text with case, punctuation
+        and spacing normalized.
+    """
+    normalized = NON_WORD_RE.sub(" ", text.lower()).strip()
+    return hashlib.blake2b(normalized.encode(), digest_size=8).hexdigest()
+
+
+class AbuseDetector:
+    """
+    Streaming flood detector in fixed memory.
+    Every complaint is counted by IP, subnet and text fingerprint
+    in sliding windows of ABUSE_WINDOW seconds; a source over its
+    limit is an offender. The heaviest sources of all dimensions
+    are tracked with Space-Saving for the admin endpoint.
+    """
+    def __init__(
+            self,
+            settings: AbuseSettings,
+            clock: Callable[[], float] = time.monotonic
+    ) -> None:
+        self.settings = settings
+        self.sketches = {
+            dimension: DecayingSketch(
+                settings.ABUSE_SKETCH_WIDTH, settings.ABUSE_SKETCH_DEPTH,
+                settings.ABUSE_WINDOW, clock
+            )
+            for dimension in DIMENSIONS
+        }
+        self.limits = {
+            "ip": settings.ABUSE_IP_LIMIT,
+            "subnet": settings.ABUSE_SUBNET_LIMIT,
+            "text": settings.ABUSE_TEXT_LIMIT,
+        }
+        self.heavy_hitters = SpaceSaving(settings.ABUSE_TOP_K)
+        # Text of fingerprints while they are heavy hitters.
+        self.samples: dict[str, str] = {}
+        self.checks = 0
+        self.offenses = {dimension: 0 for dimension in DIMENSIONS}
+
+    def check(self, ip: str, text: str) -> Optional[str]:
+        """
+        Counts a complaint and checks its sources against the limits.
+        :param ip: Client IP address.
+        :param text: Complaint text.
+        :return: Offending dimension (`ip`, `subnet`, `text`)
+            if any is over its limit, None otherwise.
+        """
+        self.checks += 1
+        if self.sketches["ip"].rotate():
+            self.sketches["subnet"].rotate()
+            self.sketches["text"].rotate()
+            self.heavy_hitters.decay()
+            self.samples = {
+                key: sample for key, sample in self.samples.items()
+                if key in self.heavy_hitters.counts
+            }
+
+        fingerprint = text_fingerprint(text)
+        keys = {
+            "ip": f"ip:{ip}",
+            "subnet": f"subnet:{subnet_of(ip)}",
+            "text": f"text:{fingerprint}",
+        }
+        offense = None
+        for dimension, key in keys.items():
+            self.heavy_hitters.add(key)
+            count = self.sketches[dimension].add(key)
+            if offense is None and count > self.limits[dimension]:
+                offense = dimension
+        if keys["text"] in self.heavy_hitters.counts:
+            self.samples.setdefault(keys["text"], text[:100])
+
+        if offense is not None:
+            self.offenses[offense] += 1
+        return offense
+
+    def top_offenders(self, n: int = 20) -> list[dict[str, Any]]:
+        """
+        Returns the heaviest sources, heaviest first.
+        :param n: Max number of sources.
+        :return: Sources with their dimension, key and decayed count.
+        """
+        offenders = []
+        for key, count in self.heavy_hitters.top(n):
+            dimension, _, value = key.partition(":")
+            offenders.append({
+                "dimension": dimension,
+                "key": value,
+                "count": count,
+                "window_count": round(
+                    self.sketches[dimension].estimate(key), 1
+                ),
+                "limit": self.limits[dimension],
+                "sample": self.samples.get(key),
+            })
+        return offenders
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "checks": self.checks,
+            "offenses": dict(self.offenses),
+            "memory_bytes": sum(
+                sketch.current.table.buffer_info()[1] * 4 * 2
+                for sketch in self.sketches.values()
+            ),
+        }
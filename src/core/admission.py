@@ -0,0 +1,251 @@
+import asyncio
+import time
+from collections import defaultdict, deque
+from typing import Any
+
+from starlette.requests import Request
+from starlette.routing import Match
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from src.core.config import AdmissionSettings, get_admission_settings
+from src.core.exception_handler import app_exception_handler
+from src.core.exceptions import ServiceUnavailable
+from src.core.metrics import metrics
+
+# Name of requests that match no route, so random paths
+# can't grow the per-route stats.
+UNMATCHED = "unmatched"
+# Scope key the matched route is kept under for inner middlewares.
+ROUTE_SCOPE_KEY = "matched_route"
+
+
+def matched_route(scope: Scope) -> str:
+    """
+    Names a request after its route, as admission stats, deadline
+    defaults and trace names label it. Found once per request.
+    :param scope: ASGI scope of the request.
+    :return: Template of the app route the request matches,
+        `GET /api/v1/complaints/{complaint_id}/similar`, or UNMATCHED.
+    """
+    name = scope.get(ROUTE_SCOPE_KEY)
+    if name is not None:
+        return name
+    name = UNMATCHED
+    router = getattr(scope.get("app"), "router", None)
+    for route in getattr(router, "routes", ()):
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            name = f"{scope['method']} {route.path}"
+            break
+    scope[ROUTE_SCOPE_KEY] = name
+    return name
+
+
+class Shed(Exception):
+    pass
+
+
+class AdmissionController:
+    """
+    Caps in-flight requests and sheds load CoDel-style.
+    Requests over ADMISSION_MAX_IN_FLIGHT wait in a queue for up to
+    ADMISSION_QUEUE_TIMEOUT. When the queue has not drained for
+    ADMISSION_INTERVAL, the server is overloaded: queued requests wait
+    only ADMISSION_TARGET_DELAY, so clients get a fast 503 instead of
+    a slow timeout. Low priority routes (`/add`) may only use
+    ADMISSION_LOW_PRIORITY_SHARE of the slots, are woken up after other
+    requests and are rejected without queueing under overload,
+    so cheap reads keep being served.
+    """
+    def __init__(self, settings: AdmissionSettings) -> None:
+        self.settings = settings
+        self.max_in_flight = settings.ADMISSION_MAX_IN_FLIGHT
+        self.low_limit = max(
+            1, int(self.max_in_flight * settings.ADMISSION_LOW_PRIORITY_SHARE)
+        )
+        self.low_priority = {
+            path.strip()
+            for path in settings.ADMISSION_LOW_PRIORITY_PATHS.split(",")
+            if path.strip()
+        }
+        self.exempt = tuple(
+            prefix.strip()
+            for prefix in settings.ADMISSION_EXEMPT_PREFIXES.split(",")
+            if prefix.strip()
+        )
+
+        self.in_flight = 0
+        self._waiters: dict[bool, deque[asyncio.Future]] = {
+            False: deque(), True: deque()
+        }
+        self._last_empty = time.monotonic()
+        self.overloads = 0
+        self._overloaded = False
+        self.routes: defaultdict[str, dict[str, float]] = defaultdict(
+            lambda: {
+                "in_flight": 0, "admitted": 0, "shed": 0,
+                "queue_ms_total": 0.0, "queue_ms_max": 0.0,
+            }
+        )
+
+    def is_exempt(self, path: str) -> bool:
+        return path.startswith(self.exempt)
+
+    def is_low_priority(self, path: str) -> bool:
+        return path in self.low_priority
+
+    def overloaded(self) -> bool:
+        """
+        :return: Whether the queue has stayed non-empty
+            for longer than ADMISSION_INTERVAL.
+        """
+        waiting = self._waiters[False] or self._waiters[True]
+        overloaded = bool(waiting) and (
+            time.monotonic() - self._last_empty
+            > self.settings.ADMISSION_INTERVAL
+        )
+        if overloaded and not self._overloaded:
+            self.overloads += 1
+        self._overloaded = overloaded
+        return overloaded
+
+    def _limit(self, low: bool) -> int:
+        return self.low_limit if low else self.max_in_flight
+
+    async def acquire(self, low: bool) -> float:
+        """
+        Takes an in-flight slot.
+        :param low: Request is low priority.
+        :raises Shed: No slot in time, the request must be rejected.
+        :return: Seconds spent in the queue.
+        """
+        if (
+                not self._waiters[False]
+                and not (low and self._waiters[True])
+                and self.in_flight < self._limit(low)
+        ):
+            self.in_flight += 1
+            self._last_empty = time.monotonic()
+            return 0.0
+
+        overloaded = self.overloaded()
+        waiting = len(self._waiters[False]) + len(self._waiters[True])
+        if (low and overloaded) or waiting >= self.max_in_flight:
+            raise Shed()
+
+        timeout = (
+            self.settings.ADMISSION_TARGET_DELAY if overloaded
+            else self.settings.ADMISSION_QUEUE_TIMEOUT
+        )
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters[low].append(waiter)
+        queued = time.monotonic()
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), timeout)
+        except (TimeoutError, asyncio.CancelledError) as e:
+            if waiter.done() and not waiter.cancelled():
+                # The slot was handed over at the same time, give it back.
+                self.release()
+            else:
+                waiter.cancel()
+                self._waiters[low].remove(waiter)
+            if isinstance(e, TimeoutError):
+                raise Shed()
+            raise
+
+        sojourn = time.monotonic() - queued
+        if sojourn < self.settings.ADMISSION_TARGET_DELAY:
+            self._last_empty = time.monotonic()
+        return sojourn
+
+    def release(self) -> None:
+        self.in_flight -= 1
+        for low in (False, True):
+            waiters = self._waiters[low]
+            while waiters and self.in_flight < self._limit(low):
+                waiter = waiters.popleft()
+                if waiter.done():
+                    continue
+                self.in_flight += 1
+                waiter.set_result(None)
+        if not self._waiters[False] and not self._waiters[True]:
+            self._last_empty = time.monotonic()
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "in_flight": self.in_flight,
+            "waiting": len(self._waiters[False]) + len(self._waiters[True]),
+            "overloaded": self.overloaded(),
+            "overloads": self.overloads,
+            "routes": {
+                route: {
+                    "in_flight": int(route_stats["in_flight"]),
+                    "admitted": int(route_stats["admitted"]),
+                    "shed": int(route_stats["shed"]),
+                    "queue_ms_avg": round(
+                        route_stats["queue_ms_total"]
+                        / max(route_stats["admitted"], 1), 3
+                    ),
+                    "queue_ms_max": round(route_stats["queue_ms_max"], 3),
+                }
+                for route, route_stats in self.routes.items()
+            },
+        }
+
+
+class AdmissionMiddleware:
+    """
+    Admission control in front of the app, see AdmissionController.
+    Rejected requests get 503 with Retry-After before any work is done.
+    Admin routes are never shed, so metrics stay available.
+    """
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+        self.settings = get_admission_settings()
+        self.controller = AdmissionController(self.settings)
+        metrics.register("admission", self.controller.stats)
+
+    async def __call__(
+            self, scope: Scope, receive: Receive, send: Send
+    ) -> None:
+        if (
+                scope["type"] != "http"
+                or not self.settings.ADMISSION_ENABLED
+                or self.controller.is_exempt(scope["path"])
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        route = self.controller.routes[matched_route(scope)]
+        try:
+            sojourn = await self.controller.acquire(
+                self.controller.is_low_priority(scope["path"])
+            )
+        except Shed:
+            route["shed"] += 1
+            await self._reject(scope, receive, send)
+            return
+
+        route["admitted"] += 1
+        route["in_flight"] += 1
+        route["queue_ms_total"] += sojourn * 1000
+        route["queue_ms_max"] = max(route["queue_ms_max"], sojourn * 1000)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            route["in_flight"] -= 1
+            self.controller.release()
+
+    async def _reject(
+            self, scope: Scope, receive: Receive, send: Send
+    ) -> None:
+        response = await app_exception_handler(
+            Request(scope),
+            ServiceUnavailable(
+                "Server is overloaded.", details="Retry later"
+            )
+        )
+        response.headers["Retry-After"] = str(
+            self.settings.ADMISSION_RETRY_AFTER
+        )
+        await response(scope, receive, send)
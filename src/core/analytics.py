@@ -0,0 +1,420 @@
+import array
+import asyncio
+import mmap
+import os
+import struct
+import time
+from bisect import bisect_left
+from datetime import datetime, timezone
+from enum import Enum
+from pathlib import Path
+from typing import Any, Optional, Sequence
+
+from src.core.config import logger
+from src.core.exceptions import ServiceUnavailable, ValidationException
+from src.models.enums import (
+    ComplaintStatus, ComplaintSentiment, ComplaintCategory
+)
+from src.repositories.sharded_complaint_repository import RepositoryScope
+
+# Enum columns store 1-based member indexes, 0 is NULL.
+ENUM_COLUMNS: dict[str, type[Enum]] = {
+    "status": ComplaintStatus,
+    "sentiment": ComplaintSentiment,
+    "category": ComplaintCategory,
+}
+WEEKDAYS = (
+    "monday", "tuesday", "wednesday", "thursday",
+    "friday", "saturday", "sunday"
+)
+COLUMNS = (*ENUM_COLUMNS, "weekday", "hour")
+TIME_BUCKETS = ("day", "month")
+GROUP_BY = (*COLUMNS, *TIME_BUCKETS)
+MAX_TIME_BUCKETS = 1000
+
+FILE_MAGIC = b"DVCOL001"
+# magic, rows, built at (epoch seconds)
+FILE_HEADER = struct.Struct("<8sQq")
+
+
+CODES: dict[str, dict[Optional[Enum], int]] = {
+    column: {None: 0, **{
+        member: index for index, member in enumerate(enum, 1)
+    }}
+    for column, enum in ENUM_COLUMNS.items()
+}
+
+
+def encode(value: Optional[Enum], column: str) -> int:
+    return CODES[column][value]
+
+
+def to_epoch(value: datetime) -> int:
+    """
+    :param value: Datetime, naive values are UTC.
+    :return: Epoch seconds.
+    """
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return int(value.timestamp())
+
+
+def _membership(codes: Sequence[int], value: int = 1) -> bytes:
+    """Translate table mapping `codes` to `value` and the rest to 0."""
+    table = bytearray(256)
+    for code in codes:
+        table[code] = value
+    return bytes(table)
+
+
+def _and(left: bytes, right: bytes) -> bytes:
+    """Bytewise AND of equal-length byte strings."""
+    return (
+        int.from_bytes(left, "little") & int.from_bytes(right, "little")
+    ).to_bytes(len(left), "little")
+
+
+class ColumnTable:
+    """
+    Immutable columnar snapshot of complaints, sorted by timestamp.
+    Time ranges are binary searches, filters and group-bys work on
+    whole byte columns with `bytes.translate`, big-int AND
+    and `bytes.count`, so no Python code runs per row.
+    """
+    def __init__(
+            self,
+            timestamps: array.array,
+            columns: dict[str, bytes],
+            built_at: int
+    ) -> None:
+        self.timestamps = timestamps
+        self.columns = columns
+        self.built_at = built_at
+
+    def __len__(self) -> int:
+        return len(self.timestamps)
+
+    @classmethod
+    def build(
+            cls,
+            timestamps: array.array,
+            codes: dict[str, bytearray],
+            built_at: int
+    ) -> "ColumnTable":
+        """
+        Sorts rows by timestamp and derives weekday and hour columns.
+        CPU bound, run it in a thread.
+        :param timestamps: Epoch seconds in row order.
+        :param codes: Enum column codes in row order.
+        :param built_at: Snapshot time, epoch seconds.
+        :return: ColumnTable object.
+        """
+        order = sorted(range(len(timestamps)), key=timestamps.__getitem__)
+        timestamps = array.array("q", map(timestamps.__getitem__, order))
+        columns = {
+            name: bytes(map(column.__getitem__, order))
+            for name, column in codes.items()
+        }
+        # 1970-01-01 was a Thursday.
+        columns["weekday"] = bytes(
+            (timestamp // 86400 + 3) % 7 for timestamp in timestamps
+        )
+        columns["hour"] = bytes(
+            timestamp // 3600 % 24 for timestamp in timestamps
+        )
+        return cls(timestamps, columns, built_at)
+
+    def _labels(self, column: str) -> dict[int, str]:
+        if column == "weekday":
+            return dict(enumerate(WEEKDAYS))
+        if column == "hour":
+            return {hour: f"{hour:02d}" for hour in range(24)}
+        labels = {
+            index: member.value
+            for index, member in enumerate(ENUM_COLUMNS[column], 1)
+        }
+        labels[0] = "none"
+        return labels
+
+    def _time_buckets(
+            self,
+            group_by: str,
+            lo: int,
+            hi: int
+    ) -> list[tuple[str, int, int]]:
+        if lo == hi:
+            return []
+        first = datetime.fromtimestamp(self.timestamps[lo], timezone.utc)
+        last = datetime.fromtimestamp(self.timestamps[hi - 1], timezone.utc)
+        if group_by == "day":
+            start = first.replace(hour=0, minute=0, second=0, microsecond=0)
+            count = (last - start).days + 1
+        else:
+            start = first.replace(
+                day=1, hour=0, minute=0, second=0, microsecond=0
+            )
+            count = (
+                (last.year - start.year) * 12 + last.month - start.month + 1
+            )
+        if count > MAX_TIME_BUCKETS:
+            raise ValidationException(
+                details=f"Over {MAX_TIME_BUCKETS} {group_by} groups, "
+                        f"narrow the time range"
+            )
+
+        buckets = []
+        begin = lo
+        for _ in range(count):
+            if group_by == "day":
+                label = start.strftime("%Y-%m-%d")
+                start = datetime.fromtimestamp(
+                    start.timestamp() + 86400, timezone.utc
+                )
+            else:
+                label = start.strftime("%Y-%m")
+                start = start.replace(
+                    year=start.year + start.month // 12,
+                    month=start.month % 12 + 1
+                )
+            end = bisect_left(
+                self.timestamps, int(start.timestamp()), begin, hi
+            )
+            buckets.append((label, begin, end))
+            begin = end
+        return buckets
+
+    def count(
+            self,
+            filters: dict[str, Sequence[Enum]],
+            start: Optional[datetime] = None,
+            end: Optional[datetime] = None,
+            group_by: Optional[str] = None
+    ) -> tuple[int, Optional[dict[str, int]]]:
+        """
+        Counts complaints matching filters, optionally grouped.
+        :param filters: Enum column name to accepted values.
+        :param start: Inclusive range start.
+        :param end: Inclusive range end.
+        :param group_by: One of GROUP_BY.
+        :raises ValidationException: Too many time groups.
+        :return: Total count and counts by group label if grouped.
+        """
+        lo = 0 if start is None else bisect_left(
+            self.timestamps, to_epoch(start)
+        )
+        hi = len(self) if end is None else bisect_left(
+            self.timestamps, to_epoch(end) + 1
+        )
+        hi = max(lo, hi)
+
+        # 0/1 byte per row in [lo, hi), None if nothing is filtered.
+        mask: Optional[bytes] = None
+        for column, values in filters.items():
+            if not values:
+                continue
+            matches = self.columns[column][lo:hi].translate(_membership(
+                [encode(value, column) for value in values]
+            ))
+            mask = matches if mask is None else _and(mask, matches)
+
+        total = hi - lo if mask is None else mask.count(1)
+        if group_by is None:
+            return total, None
+
+        if group_by in TIME_BUCKETS:
+            return total, {
+                label: (
+                    end - begin if mask is None
+                    else mask.count(1, begin - lo, end - lo)
+                )
+                for label, begin, end in self._time_buckets(group_by, lo, hi)
+            }
+
+        labels = self._labels(group_by)
+        column = self.columns[group_by][lo:hi]
+        if mask is not None:
+            # Code + 1 where the row matches, 0 elsewhere.
+            column = _and(
+                column.translate(bytes(
+                    (code + 1) % 256 for code in range(256)
+                )),
+                mask.translate(_membership([1], 0xFF))
+            )
+        groups = {}
+        for code, label in labels.items():
+            found = column.count(code if mask is None else code + 1)
+            if found:
+                groups[label] = found
+        return total, groups
+
+    def dump(self) -> bytes:
+        return b"".join((
+            FILE_HEADER.pack(FILE_MAGIC, len(self), self.built_at),
+            self.timestamps.tobytes(),
+            *(self.columns[name] for name in COLUMNS),
+        ))
+
+    @classmethod
+    def load(cls, path: Path) -> Optional["ColumnTable"]:
+        """
+        Reads a snapshot file through a memory map.
+        :param path: Snapshot file path.
+        :return: ColumnTable object, None if the file is missing or corrupt.
+        """
+        if not path.exists() or path.stat().st_size < FILE_HEADER.size:
+            return None
+
+        with open(path, "rb") as file, mmap.mmap(
+                file.fileno(), 0, access=mmap.ACCESS_READ
+        ) as data:
+            magic, rows, built_at = FILE_HEADER.unpack_from(data)
+            size = FILE_HEADER.size + rows * (8 + len(COLUMNS))
+            if magic != FILE_MAGIC or len(data) != size:
+                logger.warning(f"Analytics snapshot {path} is ignored")
+                return None
+
+            offset = FILE_HEADER.size
+            timestamps = array.array("q")
+            timestamps.frombytes(data[offset:offset + 8 * rows])
+            offset += 8 * rows
+            columns = {}
+            for name in COLUMNS:
+                columns[name] = data[offset:offset + rows]
+                offset += rows
+        return cls(timestamps, columns, built_at)
+
+
+class AnalyticsSnapshot:
+    """
+    Periodically refreshed ColumnTable of hot and archived complaints.
+    Queries only read the in-memory table, the database is read once
+    per refresh in id batches, one short transaction per batch.
+    The last table is saved to a file and loaded on startup.
+    """
+    def __init__(self, path: Path, batch_size: int = 10_000) -> None:
+        self.path = path
+        self.batch_size = batch_size
+        self.table: Optional[ColumnTable] = None
+        self._task: Optional[asyncio.Task] = None
+
+        self.refreshes: int = 0
+        self.refresh_ms: Optional[float] = None
+        self.queries: int = 0
+
+    def load(self) -> None:
+        self.table = ColumnTable.load(self.path)
+
+    async def refresh(
+            self,
+            repository_scope: RepositoryScope
+    ) -> ColumnTable:
+        """
+        Reads the complaint tables and swaps in a new snapshot.
+        :param repository_scope: Factory of short-lived repositories.
+        :return: New ColumnTable object.
+        """
+        started = time.perf_counter()
+        built_at = int(time.time())
+        timestamps = array.array("q")
+        codes = {name: bytearray() for name in ENUM_COLUMNS}
+        for archived in (False, True):
+            after_id = 0
+            while True:
+                async with repository_scope() as repository:
+                    rows = await repository.get_complaint_columns(
+                        after_id, self.batch_size, archived
+                    )
+                for row in rows:
+                    timestamps.append(row.epoch or 0)
+                    for name, column in codes.items():
+                        column.append(CODES[name][getattr(row, name)])
+                if len(rows) < self.batch_size:
+                    break
+                after_id = rows[-1].id
+
+        table = await asyncio.to_thread(
+            ColumnTable.build, timestamps, codes, built_at
+        )
+        self.table = table
+        self.refreshes += 1
+        self.refresh_ms = round((time.perf_counter() - started) * 1000, 1)
+        await asyncio.to_thread(self._save, table.dump())
+        return table
+
+    def _save(self, data: bytes) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        temporary = self.path.with_name(self.path.name + ".tmp")
+        temporary.write_bytes(data)
+        os.replace(temporary, self.path)
+
+    def start(
+            self,
+            repository_scope: RepositoryScope,
+            interval: float
+    ) -> None:
+        self._task = asyncio.create_task(self._run(repository_scope, interval))
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+
+    async def _run(
+            self,
+            repository_scope: RepositoryScope,
+            interval: float
+    ) -> None:
+        while True:
+            try:
+                table = await self.refresh(repository_scope)
+                logger.info(
+                    f"Analytics snapshot refreshed: {len(table)} rows "
+                    f"in {self.refresh_ms} ms"
+                )
+            except Exception as e:
+                logger.warning(f"Analytics snapshot refresh failed: {e!r}")
+            await asyncio.sleep(interval)
+
+    def count(
+            self,
+            filters: dict[str, Sequence[Enum]],
+            start: Optional[datetime] = None,
+            end: Optional[datetime] = None,
+            group_by: Optional[str] = None
+    ) -> dict[str, Any]:
+        """
+        Counts complaints in the current snapshot, see ColumnTable.count.
+        :raises ServiceUnavailable: No snapshot was built yet.
+        :raises ValidationException: Too many time groups.
+        :return: Count response as a dict.
+        """
+        table = self.table
+        if table is None:
+            raise ServiceUnavailable(
+                details="Analytics snapshot is not built yet"
+            )
+        self.queries += 1
+        total, groups = table.count(filters, start, end, group_by)
+        return {
+            "count": total,
+            "groups": groups,
+            "snapshot_at": datetime.fromtimestamp(
+                table.built_at, timezone.utc
+            ),
+            "snapshot_rows": len(table),
+        }
+
+    def stats(self) -> dict[str, Any]:
+        """
+        Returns snapshot size and refresh counters.
+        :return: Snapshot stats as a dict.
+        """
+        return {
+            "rows": len(self.table) if self.table is not None else None,
+            "built_at": (
+                self.table.built_at if self.table is not None else None
+            ),
+            "refreshes": self.refreshes,
+            "refresh_ms": self.refresh_ms,
+            "queries": self.queries,
+        }
@@ -0,0 +1,118 @@
+import asyncio
+from collections import OrderedDict
+from typing import (
+    Any, Awaitable, Callable, Hashable
+)
+
+
+class QueryCache:
+    """
+    Read-through LRU cache for query results.
+    Every entry is stored with the generation it was loaded in,
+    writes bump the generation, so older entries are never served again.
+    Concurrent loads of the same key are coalesced into one.
+    """
+    def __init__(self, max_size: int = 256) -> None:
+        self.max_size = max_size
+        self.generation: int = 0
+        self._entries: OrderedDict[Hashable, tuple[int, Any]] = OrderedDict()
+        self._in_flight: dict[tuple[int, Hashable], asyncio.Future] = {}
+
+        self.hits: int = 0
+        self.misses: int = 0
+        self.coalesced: int = 0
+        self.evictions: int = 0
+
+    def invalidate(self) -> None:
+        """
+        Bumps the generation, all cached entries become stale.
+        :return: None
+        """
+        self.generation += 1
+        self._entries.clear()
+
+    def _get(self, key: Hashable) -> tuple[bool, Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return False, None
+        generation, value = entry
+        if generation != self.generation:
+            del self._entries[key]
+            return False, None
+        self._entries.move_to_end(key)
+        return True, value
+
+    def _set(self, key: Hashable, generation: int, value: Any) -> None:
+        if generation != self.generation:
+            return
+        self._entries[key] = (generation, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    async def get_or_load(
+            self,
+            key: Hashable,
+            loader: Callable[[], Awaitable[Any]]
+    ) -> Any:
+        """
+        Returns a cached value or loads it.
+        :param key: Hashable cache key.
+        :param loader: Coroutine function which loads the value on miss.
+        :raises: Any exception raised by the loader.
+        :return: Cached or loaded value.
+        """
+        while True:
+            found, value = self._get(key)
+            if found:
+                self.hits += 1
+                return value
+
+            flight_key = (self.generation, key)
+            flight = self._in_flight.get(flight_key)
+            if flight is None:
+                break
+
+            self.coalesced += 1
+            try:
+                return await asyncio.shield(flight)
+            except asyncio.CancelledError:
+                if not flight.cancelled():
+                    raise
+                # The loading request was cancelled, load it again.
+
+        self.misses += 1
+        generation = self.generation
+        flight = asyncio.get_running_loop().create_future()
+        self._in_flight[flight_key] = flight
+        try:
+            value = await loader()
+        except asyncio.CancelledError:
+            flight.cancel()
+            raise
+        except BaseException as e:
+            flight.set_exception(e)
+            # Mark as retrieved when nobody waits for it.
+            flight.exception()
+            raise
+        else:
+            flight.set_result(value)
+            self._set(key, generation, value)
+            return value
+        finally:
+            self._in_flight.pop(flight_key, None)
+
+    def stats(self) -> dict[str, int]:
+        """
+        Returns cache counters.
+        :return: Cache stats as a dict.
+        """
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "evictions": self.evictions,
+            "size": len(self._entries),
+            "generation": self.generation,
+        }
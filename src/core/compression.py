@@ -0,0 +1,302 @@
+import asyncio
+import hashlib
+import time
+import zlib
+from collections import OrderedDict
+from typing import Any, Callable, Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from src.core.config import CompressionSettings, get_compression_settings
+from src.core.metrics import metrics
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+COMPRESSIBLE_TYPES = (
+    "text/", "application/json", "application/javascript",
+    "application/xml", "+json", "+xml",
+)
+# zlib, brotli and zstandard release the GIL, bigger bodies
+# are compressed in a worker thread to keep the event loop free.
+OFFLOAD_SIZE = 256 * 1024
+
+
+class GzipStream:
+    def __init__(self, level: int) -> None:
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes, final: bool = False) -> bytes:
+        mode = zlib.Z_FINISH if final else zlib.Z_SYNC_FLUSH
+        return self._compressor.compress(data) + self._compressor.flush(mode)
+
+
+class BrotliStream:
+    def __init__(self, quality: int) -> None:
+        self._compressor = brotli.Compressor(quality=quality)
+
+    def compress(self, data: bytes, final: bool = False) -> bytes:
+        flush = self._compressor.finish if final else self._compressor.flush
+        return self._compressor.process(data) + flush()
+
+
+class ZstdStream:
+    def __init__(self, level: int) -> None:
+        self._compressor = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def compress(self, data: bytes, final: bool = False) -> bytes:
+        mode = (
+            zstandard.COMPRESSOBJ_FLUSH_FINISH if final
+            else zstandard.COMPRESSOBJ_FLUSH_BLOCK
+        )
+        return self._compressor.compress(data) + self._compressor.flush(mode)
+
+
+def available_encodings(
+        settings: CompressionSettings
+) -> dict[str, Callable[[], Any]]:
+    """
+    Stream factories of the supported encodings, in server preference.
+    brotli and zstd are used only if their packages are installed.
+    :param settings: Compression settings.
+    :return: Encoding name to stream factory.
+    """
+    encodings = {}
+    if zstandard is not None:
+        encodings["zstd"] = lambda: ZstdStream(settings.COMPRESSION_ZSTD_LEVEL)
+    if brotli is not None:
+        encodings["br"] = lambda: BrotliStream(
+            settings.COMPRESSION_BROTLI_QUALITY
+        )
+    encodings["gzip"] = lambda: GzipStream(settings.COMPRESSION_GZIP_LEVEL)
+    return encodings
+
+
+def negotiate(accept_encoding: str, encodings: list[str]) -> Optional[str]:
+    """
+    Picks the encoding with the highest q-value in Accept-Encoding,
+    ties are broken by the server preference.
+    :param accept_encoding: Accept-Encoding header value.
+    :param encodings: Supported encodings, most preferred first.
+    :return: Encoding name or None if none is acceptable.
+    """
+    weights = {}
+    for item in accept_encoding.lower().split(","):
+        name, _, params = item.partition(";")
+        weight = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                weight = float(params[2:])
+            except ValueError:
+                weight = 0.0
+        weights[name.strip()] = weight
+
+    weight, _, encoding = max(
+        (weights.get(name, weights.get("*", 0.0)), -index, name)
+        for index, name in enumerate(encodings)
+    )
+    return encoding if weight > 0 else None
+
+
+class CompressionMiddleware:
+    """
+    Compresses responses with gzip, brotli or zstd negotiated by
+    Accept-Encoding.
+    Responses with Content-Length are compressed at once if they are
+    at least COMPRESSION_MIN_SIZE bytes and the result is smaller,
+    compressed bytes are cached by body digest, so a hot payload
+    (cached list responses) is compressed once.
+    Streaming responses without Content-Length are compressed
+    chunk by chunk, every chunk is flushed to the client.
+    """
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+        self.settings = get_compression_settings()
+        self.encodings = available_encodings(self.settings)
+        self._cache: OrderedDict[tuple[str, bytes], bytes] = OrderedDict()
+        self._stats = {
+            "responses": 0,
+            "streamed": 0,
+            "cache_hits": 0,
+            "bytes_in": 0,
+            "bytes_out": 0,
+            "compress_seconds": 0.0,
+        }
+        metrics.register("compression", self.stats)
+
+    async def __call__(
+            self, scope: Scope, receive: Receive, send: Send
+    ) -> None:
+        if scope["type"] != "http" or not self.settings.COMPRESSION_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        encoding = negotiate(
+            Headers(scope=scope).get("accept-encoding", ""),
+            list(self.encodings)
+        )
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        responder = CompressionResponder(self, encoding, send)
+        await self.app(scope, receive, responder.send)
+
+    def is_compressible(self, headers: Headers) -> bool:
+        if "content-encoding" in headers:
+            return False
+        content_type = headers.get("content-type", "")
+        if not any(kind in content_type for kind in COMPRESSIBLE_TYPES):
+            return False
+        length = headers.get("content-length")
+        return (
+            length is None
+            or int(length) >= self.settings.COMPRESSION_MIN_SIZE
+        )
+
+    def stream(self, encoding: str) -> Any:
+        self._stats["streamed"] += 1
+        return self.encodings[encoding]()
+
+    async def compress(
+            self,
+            encoding: str,
+            body: bytes,
+            cacheable: bool
+    ) -> bytes:
+        """
+        Compresses a whole body, uses the cache for cacheable responses.
+        :param encoding: Negotiated encoding.
+        :param body: Response body.
+        :param cacheable: Whether the compressed body may be cached.
+        :return: Compressed body.
+        """
+        self._stats["responses"] += 1
+        self._stats["bytes_in"] += len(body)
+        key = (encoding, hashlib.blake2b(body, digest_size=16).digest())
+        if cacheable and (compressed := self._cache.get(key)) is not None:
+            self._cache.move_to_end(key)
+            self._stats["cache_hits"] += 1
+            self._stats["bytes_out"] += len(compressed)
+            return compressed
+
+        started = time.perf_counter()
+        stream = self.encodings[encoding]()
+        if len(body) >= OFFLOAD_SIZE:
+            compressed = await asyncio.to_thread(stream.compress, body, True)
+        else:
+            compressed = stream.compress(body, True)
+        self._stats["compress_seconds"] += time.perf_counter() - started
+        self._stats["bytes_out"] += len(compressed)
+
+        if cacheable and self.settings.COMPRESSION_CACHE_MAX_SIZE:
+            self._cache[key] = compressed
+            if len(self._cache) > self.settings.COMPRESSION_CACHE_MAX_SIZE:
+                self._cache.popitem(last=False)
+        return compressed
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            **self._stats,
+            "compress_seconds": round(self._stats["compress_seconds"], 4),
+            "encodings": list(self.encodings),
+            "cache_size": len(self._cache),
+        }
+
+
+class CompressionResponder:
+    """
+    Wraps ASGI `send` of one response.
+    Depending on the response start it passes the response through,
+    buffers the body to compress it at once or compresses a stream.
+    """
+    def __init__(
+            self,
+            middleware: CompressionMiddleware,
+            encoding: str,
+            send: Send
+    ) -> None:
+        self.middleware = middleware
+        self.encoding = encoding
+        self._send = send
+        self.start: Optional[Message] = None
+        self.mode = "passthrough"
+        self.chunks: list[bytes] = []
+        self.stream: Any = None
+
+    async def send(self, message: Message) -> None:
+        if message["type"] == "http.response.start":
+            await self._on_start(message)
+        elif message["type"] == "http.response.body":
+            await self._on_body(message)
+        else:
+            await self._send(message)
+
+    async def _on_start(self, message: Message) -> None:
+        headers = Headers(raw=message["headers"])
+        if (
+                message["status"] in (204, 304)
+                or not self.middleware.is_compressible(headers)
+        ):
+            await self._send(message)
+            return
+
+        self.start = message
+        if "content-length" in headers:
+            self.mode = "buffer"
+            return
+
+        self.mode = "stream"
+        self.stream = self.middleware.stream(self.encoding)
+        self._set_encoding_headers()
+        await self._send(message)
+
+    async def _on_body(self, message: Message) -> None:
+        more_body = message.get("more_body", False)
+        if self.mode == "passthrough":
+            await self._send(message)
+        elif self.mode == "stream":
+            await self._send({
+                "type": "http.response.body",
+                "body": self.stream.compress(
+                    message.get("body", b""), final=not more_body
+                ),
+                "more_body": more_body,
+            })
+        else:
+            self.chunks.append(message.get("body", b""))
+            if not more_body:
+                await self._send_buffered(b"".join(self.chunks))
+
+    async def _send_buffered(self, body: bytes) -> None:
+        cache_control = Headers(raw=self.start["headers"]).get(
+            "cache-control", ""
+        )
+        compressed = await self.middleware.compress(
+            self.encoding, body, cacheable="no-store" not in cache_control
+        )
+        if len(compressed) < len(body):
+            body = compressed
+            self._set_encoding_headers()
+            MutableHeaders(raw=self.start["headers"])[
+                "content-length"
+            ] = str(len(body))
+        await self._send(self.start)
+        await self._send({"type": "http.response.body", "body": body})
+
+    def _set_encoding_headers(self) -> None:
+        headers = MutableHeaders(raw=self.start["headers"])
+        headers["content-encoding"] = self.encoding
+        headers.add_vary_header("Accept-Encoding")
+        if "content-length" in headers:
+            del headers["content-length"]
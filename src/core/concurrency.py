@@ -0,0 +1,196 @@
+import asyncio
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Optional
+
+from src.core.config import ConcurrencySettings
+from src.core.exceptions import UpstreamOverloaded
+
+
+class Slot:
+    """
+    One in-flight request. Record the upstream status code,
+    429 and 5xx mean overload. Exceptions inside the slot before
+    a status is recorded (timeouts, connection errors) are overloads too.
+    """
+    def __init__(self) -> None:
+        self.is_overloaded: Optional[bool] = None
+
+    def record(self, status_code: int) -> None:
+        self.is_overloaded = status_code == 429 or status_code >= 500
+
+    def overloaded(self) -> None:
+        self.is_overloaded = True
+
+
+class AdaptiveLimiter:
+    """
+    AIMD concurrency limiter for one upstream.
+    The limit grows by 1 / limit per successful request while it is
+    in use, and shrinks by `backoff_ratio` (at most once per baseline
+    latency) on errors or when latency exceeds `tolerance` times the
+    baseline. The baseline follows the lowest latency seen and slowly
+    drifts up. Requests over the limit wait up to `queue_timeout`
+    in a bounded queue, then UpstreamOverloaded is raised so callers
+    fall back.
+    """
+    def __init__(
+            self,
+            name: str,
+            initial_limit: int = 10,
+            min_limit: int = 1,
+            max_limit: int = 100,
+            tolerance: float = 2.0,
+            backoff_ratio: float = 0.9,
+            queue_timeout: float = 0.5,
+            queue_size: int = 100
+    ) -> None:
+        self.name = name
+        self.limit = float(initial_limit)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.tolerance = tolerance
+        self.backoff_ratio = backoff_ratio
+        self.queue_timeout = queue_timeout
+        self.queue_size = queue_size
+
+        self.in_flight: int = 0
+        self.baseline: Optional[float] = None
+        self._waiters: deque[asyncio.Future] = deque()
+        self._last_decrease: float = 0.0
+
+        self.accepted: int = 0
+        self.queued: int = 0
+        self.rejected: int = 0
+        self.overloads: int = 0
+        self.decreases: int = 0
+
+    @classmethod
+    def from_settings(
+            cls,
+            name: str,
+            settings: ConcurrencySettings
+    ) -> "AdaptiveLimiter":
+        return cls(
+            name,
+            initial_limit=settings.UPSTREAM_LIMIT_INITIAL,
+            min_limit=settings.UPSTREAM_LIMIT_MIN,
+            max_limit=settings.UPSTREAM_LIMIT_MAX,
+            tolerance=settings.UPSTREAM_LATENCY_TOLERANCE,
+            backoff_ratio=settings.UPSTREAM_BACKOFF_RATIO,
+            queue_timeout=settings.UPSTREAM_QUEUE_TIMEOUT,
+            queue_size=settings.UPSTREAM_QUEUE_SIZE
+        )
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[Slot]:
+        """
+        Holds one unit of the limit for the duration of a request.
+        :raises UpstreamOverloaded: No slot was freed in time.
+        :return: Slot to mark the request outcome.
+        """
+        await self._acquire()
+        slot = Slot()
+        utilized = self.in_flight >= self.limit / 2
+        started = time.monotonic()
+        try:
+            yield slot
+        except Exception:
+            if slot.is_overloaded is None:
+                slot.overloaded()
+            raise
+        finally:
+            self.in_flight -= 1
+            self._on_sample(
+                time.monotonic() - started, bool(slot.is_overloaded), utilized
+            )
+            self._wake()
+
+    async def _acquire(self) -> None:
+        if not self._waiters and self.in_flight < int(self.limit):
+            self.in_flight += 1
+            self.accepted += 1
+            return
+
+        if len(self._waiters) >= self.queue_size:
+            self.rejected += 1
+            raise UpstreamOverloaded(details=f"{self.name}: queue is full")
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        self.queued += 1
+        try:
+            await asyncio.wait_for(
+                asyncio.shield(waiter), self.queue_timeout
+            )
+        except (TimeoutError, asyncio.CancelledError) as e:
+            if waiter.done() and not waiter.cancelled():
+                # The slot was handed over at the same time, give it back.
+                self.in_flight -= 1
+                self._wake()
+            else:
+                waiter.cancel()
+                self._waiters.remove(waiter)
+            if isinstance(e, TimeoutError):
+                self.rejected += 1
+                raise UpstreamOverloaded(
+                    details=f"{self.name}: no slot in {self.queue_timeout} s"
+                )
+            raise
+        self.accepted += 1
+
+    def _wake(self) -> None:
+        while self._waiters and self.in_flight < int(self.limit):
+            waiter = self._waiters.popleft()
+            if waiter.done():
+                continue
+            self.in_flight += 1
+            waiter.set_result(None)
+
+    def _on_sample(
+            self,
+            latency: float,
+            overloaded: bool,
+            utilized: bool
+    ) -> None:
+        if not overloaded:
+            if self.baseline is None:
+                self.baseline = latency
+            else:
+                # Follows drops at once, rises slowly.
+                self.baseline = min(
+                    latency, self.baseline + (latency - self.baseline) * 0.01
+                )
+            overloaded = latency > self.baseline * self.tolerance
+
+        if overloaded:
+            self.overloads += 1
+            now = time.monotonic()
+            if now - self._last_decrease >= max(self.baseline or 0, 0.05):
+                self.limit = max(
+                    self.min_limit, self.limit * self.backoff_ratio
+                )
+                self._last_decrease = now
+                self.decreases += 1
+        elif utilized:
+            self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+
+    def stats(self) -> dict[str, Any]:
+        """
+        Returns limiter state and counters.
+        :return: Limiter stats as a dict.
+        """
+        return {
+            "limit": round(self.limit, 2),
+            "in_flight": self.in_flight,
+            "waiting": len(self._waiters),
+            "baseline_ms": (
+                round(self.baseline * 1000, 2) if self.baseline else None
+            ),
+            "accepted": self.accepted,
+            "queued": self.queued,
+            "rejected": self.rejected,
+            "overloads": self.overloads,
+            "decreases": self.decreases,
+        }
@@ -3,14 +3,20 @@ from functools import cache
 from logging.handlers import RotatingFileHandler
 
 from pathlib import Path
-from typing import Optional
+from typing import Literal, Optional
 
 from pydantic import ConfigDict
 from pydantic_settings import BaseSettings
 from dotenv import load_dotenv
 
 
-load_dotenv()
+logger = logging.getLogger("app")
+
+
+@cache
+def load_env() -> None:
+    """Loads the .env file once, on the first settings access."""
+    load_dotenv()
 
 
 class DbSettings(BaseSettings):
@@ -18,11 +24,19 @@ class DbSettings(BaseSettings):
     DB_URL_SYNC: str
 
     PAGINATION_LIMIT: int = 50
+    DB_WARM_UP_CONNECTIONS: int = 1
+
+    DB_SLOW_QUERY_LOG_ENABLED: bool = True
+    DB_SLOW_QUERY_MS: float = 100.0
+    DB_SLOW_QUERY_EXPLAIN: bool = True
+    DB_SLOW_QUERY_MAX_FINGERPRINTS: int = 500
 
 
 class LoggingSettings(BaseSettings):
     LOG_LEVEL: str = "INFO"
-    LOG_FORMAT: str = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+    LOG_FORMAT: str = (
+        "%(asctime)s - %(name)s - %(levelname)s - [%(trace_id)s] %(message)s"
+    )
     LOG_FILE: Optional[str] = "app.log"
 
     model_config = ConfigDict(env_prefix="LOG_")
@@ -38,12 +52,187 @@ class APISettings(BaseSettings):
     IP_API_BASE_URL: str
 
 
+class ConcurrencySettings(BaseSettings):
+    UPSTREAM_LIMIT_ENABLED: bool = True
+    UPSTREAM_LIMIT_INITIAL: int = 10
+    UPSTREAM_LIMIT_MIN: int = 1
+    UPSTREAM_LIMIT_MAX: int = 100
+    UPSTREAM_LATENCY_TOLERANCE: float = 2.0
+    UPSTREAM_BACKOFF_RATIO: float = 0.9
+    UPSTREAM_QUEUE_TIMEOUT: float = 0.5
+    UPSTREAM_QUEUE_SIZE: int = 100
+
+
+class AdmissionSettings(BaseSettings):
+    ADMISSION_ENABLED: bool = True
+    ADMISSION_MAX_IN_FLIGHT: int = 100
+    ADMISSION_QUEUE_TIMEOUT: float = 1.0
+    ADMISSION_TARGET_DELAY: float = 0.005
+    ADMISSION_INTERVAL: float = 0.1
+    ADMISSION_LOW_PRIORITY_PATHS: str = "/api/v1/complaints/add"
+    ADMISSION_LOW_PRIORITY_SHARE: float = 0.75
+    ADMISSION_EXEMPT_PREFIXES: str = "/api/v1/admin"
+    ADMISSION_RETRY_AFTER: int = 1
+
+
+class DeadlineSettings(BaseSettings):
+    DEADLINE_ENABLED: bool = True
+    DEADLINE_DEFAULT: float = 30.0
+    DEADLINE_MAX: float = 60.0
+    DEADLINE_ROUTE_DEFAULTS: dict[str, float] = {
+        "POST /api/v1/complaints/add": 15.0,
+    }
+
+
+class AbuseSettings(BaseSettings):
+    ABUSE_ENABLED: bool = True
+    ABUSE_ACTION: Literal["reject", "deprioritize"] = "reject"
+    ABUSE_WINDOW: float = 60.0
+    ABUSE_IP_LIMIT: int = 20
+    ABUSE_SUBNET_LIMIT: int = 100
+    ABUSE_TEXT_LIMIT: int = 5
+    ABUSE_SKETCH_WIDTH: int = 4096
+    ABUSE_SKETCH_DEPTH: int = 4
+    ABUSE_TOP_K: int = 100
+
+
+class PreFilterSettings(BaseSettings):
+    PREFILTER_ENABLED: bool = True
+    PREFILTER_MIN_LETTERS: int = 3
+    PREFILTER_MIN_LETTER_SHARE: float = 0.5
+    PREFILTER_MIN_ENTROPY: float = 2.5
+    PREFILTER_MIN_COMPRESSION_RATIO: float = 0.2
+    PREFILTER_SPAM_THRESHOLD: float = 1.0
+    # Extra spam patterns (regex) with their weights.
+    PREFILTER_SPAM_PATTERNS: dict[str, float] = {}
+    # Bodies of these paths over the limit are rejected before parsing.
+    PREFILTER_MAX_BODY_BYTES: int = 4096
+    PREFILTER_BODY_LIMIT_PATHS: str = "/api/v1/complaints/add"
+
+
+class ClassifierSettings(BaseSettings):
+    CLASSIFIER_MAX_TOKENS: int = 5
+    CLASSIFIER_MAX_TEXT_LENGTH: int = 500
+
+
+class CacheSettings(BaseSettings):
+    QUERY_CACHE_ENABLED: bool = True
+    QUERY_CACHE_MAX_SIZE: int = 256
+    QUERY_CACHE_TIME_BUCKET: int = 5
+
+
+class IPInfoSettings(BaseSettings):
+    IP_INFO_CACHE_TTL: float = 3600
+    IP_INFO_NEGATIVE_TTL: float = 60
+    IP_INFO_CACHE_MAX_SIZE: int = 10_000
+    IP_INFO_BATCH_WINDOW: float = 0.05
+    IP_INFO_BATCH_SIZE: int = 100
+
+
+class IdempotencySettings(BaseSettings):
+    IDEMPOTENCY_TTL: float = 86400
+    IDEMPOTENCY_MAX_SIZE: int = 10_000
+
+
+class ArchiveSettings(BaseSettings):
+    ARCHIVE_AFTER_DAYS: int = 30
+    ARCHIVE_BATCH_SIZE: int = 500
+    ARCHIVE_READ_THROUGH: bool = True
+
+
+class AdminSettings(BaseSettings):
+    ADMIN_TOKEN: str = ""
+
+
+class ProfilerSettings(BaseSettings):
+    PROFILE_SAMPLE_RATE: float = 0.0
+    PROFILE_INTERVAL_MS: float = 5
+    PROFILE_DIR: str = "profiles"
+    PROFILE_RETENTION: int = 100
+
+
+class TracingSettings(BaseSettings):
+    TRACING_ENABLED: bool = True
+    TRACING_SAMPLE_RATE: float = 0.01
+    TRACING_MAX_PER_SECOND: int = 10
+    TRACING_MAX_SPANS: int = 200
+    TRACING_BUFFER_SIZE: int = 1000
+    # JSON lines file for traces, kept in memory only when empty.
+    TRACING_FILE: Optional[str] = None
+
+
+class LoopMonitorSettings(BaseSettings):
+    LOOP_MONITOR_ENABLED: bool = True
+    LOOP_MONITOR_INTERVAL: float = 0.1
+    LOOP_MONITOR_THRESHOLD: float = 0.1
+    LOOP_MONITOR_MAX_STALLS: int = 20
+
+
+class CompressionSettings(BaseSettings):
+    COMPRESSION_ENABLED: bool = True
+    COMPRESSION_MIN_SIZE: int = 1024
+    COMPRESSION_GZIP_LEVEL: int = 6
+    COMPRESSION_BROTLI_QUALITY: int = 4
+    COMPRESSION_ZSTD_LEVEL: int = 3
+    COMPRESSION_CACHE_MAX_SIZE: int = 128
+
+
+class SimilaritySettings(BaseSettings):
+    SIMILARITY_ENABLED: bool = True
+    SIMILARITY_INDEX_PATH: str = "instance/similarity.idx"
+    SIMILARITY_FEATURES: int = 2 ** 18
+    SIMILARITY_MAX_CANDIDATES: int = 5000
+    SIMILARITY_SAVE_INTERVAL: float = 300.0
+
+
+class AnalyticsSettings(BaseSettings):
+    ANALYTICS_ENABLED: bool = True
+    ANALYTICS_SNAPSHOT_PATH: str = "instance/analytics.snapshot"
+    ANALYTICS_REFRESH_INTERVAL: float = 300.0
+    ANALYTICS_BATCH_SIZE: int = 10_000
+
+
+class ShardingSettings(BaseSettings):
+    SHARDING_ENABLED: bool = False
+    SHARD_DIR: str = "instance/shards"
+    SHARD_PERIOD: Literal["month", "year"] = "month"
+
+
+class OutboxSettings(BaseSettings):
+    OUTBOX_WEBHOOK_URLS: str = ""
+    OUTBOX_POLL_INTERVAL: float = 1.0
+    OUTBOX_BATCH_SIZE: int = 200
+    OUTBOX_WEBHOOK_BATCH_SIZE: int = 50
+    OUTBOX_ENDPOINT_CONCURRENCY: int = 2
+    OUTBOX_MAX_ATTEMPTS: int = 10
+    OUTBOX_BACKOFF_BASE: float = 2.0
+    OUTBOX_BACKOFF_MAX: float = 600.0
+    OUTBOX_LEASE_SECONDS: float = 60.0
+
+    @property
+    def webhook_urls(self) -> list[str]:
+        return [
+            url.strip()
+            for url in self.OUTBOX_WEBHOOK_URLS.split(",") if url.strip()
+        ]
+
+
 def setup_logger() -> logging.Logger:
+    """
+    Attaches log handlers to the app logger once.
+    :return: App logger.
+    """
+    if logger.handlers:
+        return logger
+
+    load_env()
     settings = LoggingSettings()
-    logger = logging.getLogger("app")
     logger.setLevel(settings.LOG_LEVEL)
 
-    formatter = logging.Formatter(settings.LOG_FORMAT)
+    # trace_id is set by the tracing log filter.
+    formatter = logging.Formatter(
+        settings.LOG_FORMAT, defaults={"trace_id": "-"}
+    )
 
     console_handler = logging.StreamHandler()
     console_handler.setFormatter(formatter)
@@ -64,14 +253,125 @@ def setup_logger() -> logging.Logger:
 
 @cache
 def get_db_settings() -> DbSettings:
+    load_env()
     return DbSettings()
 
 
 @cache
 def get_api_settings() -> APISettings:
+    load_env()
     return APISettings()
 
 
-logger = setup_logger()
-db_settings = get_db_settings()
-api_settings = get_api_settings()
+@cache
+def get_concurrency_settings() -> ConcurrencySettings:
+    load_env()
+    return ConcurrencySettings()
+
+
+@cache
+def get_classifier_settings() -> ClassifierSettings:
+    load_env()
+    return ClassifierSettings()
+
+
+@cache
+def get_cache_settings() -> CacheSettings:
+    load_env()
+    return CacheSettings()
+
+
+@cache
+def get_ip_info_settings() -> IPInfoSettings:
+    load_env()
+    return IPInfoSettings()
+
+
+@cache
+def get_idempotency_settings() -> IdempotencySettings:
+    load_env()
+    return IdempotencySettings()
+
+
+@cache
+def get_archive_settings() -> ArchiveSettings:
+    load_env()
+    return ArchiveSettings()
+
+
+@cache
+def get_admin_settings() -> AdminSettings:
+    load_env()
+    return AdminSettings()
+
+
+@cache
+def get_profiler_settings() -> ProfilerSettings:
+    load_env()
+    return ProfilerSettings()
+
+
+@cache
+def get_compression_settings() -> CompressionSettings:
+    load_env()
+    return CompressionSettings()
+
+
+@cache
+def get_loop_monitor_settings() -> LoopMonitorSettings:
+    load_env()
+    return LoopMonitorSettings()
+
+
+@cache
+def get_admission_settings() -> AdmissionSettings:
+    load_env()
+    return AdmissionSettings()
+
+
+@cache
+def get_deadline_settings() -> DeadlineSettings:
+    load_env()
+    return DeadlineSettings()
+
+
+@cache
+def get_abuse_settings() -> AbuseSettings:
+    load_env()
+    return AbuseSettings()
+
+
+@cache
+def get_tracing_settings() -> TracingSettings:
+    load_env()
+    return TracingSettings()
+
+
+@cache
+def get_prefilter_settings() -> PreFilterSettings:
+    load_env()
+    return PreFilterSettings()
+
+
+@cache
+def get_outbox_settings() -> OutboxSettings:
+    load_env()
+    return OutboxSettings()
+
+
+@cache
+def get_similarity_settings() -> SimilaritySettings:
+    load_env()
+    return SimilaritySettings()
+
+
+@cache
+def get_analytics_settings() -> AnalyticsSettings:
+    load_env()
+    return AnalyticsSettings()
+
+
+@cache
+def get_sharding_settings() -> ShardingSettings:
+    load_env()
+    return ShardingSettings()
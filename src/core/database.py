@@ -1,25 +1,101 @@
+import asyncio
+import time
+from typing import Any
+
+from sqlalchemy import event, text
 from sqlalchemy.ext.asyncio import (
     create_async_engine, async_sessionmaker,
     AsyncSession, AsyncEngine
 )
 from sqlalchemy.orm import declarative_base
 
-from src.core.config import db_settings
+from src.core.config import DbSettings
+from src.core.deadline import install_statement_deadline
+from src.core.metrics import metrics
+from src.core.slow_queries import slow_query_log
+from src.core.tracing import install_sql_tracing
 
 
-database_url = str(db_settings.DB_URL)
+Base = declarative_base()
 
-engine: AsyncEngine = create_async_engine(
-    database_url,
-    connect_args={"check_same_thread": False},
-    pool_pre_ping=True
-)
 
-AsyncSessionLocal = async_sessionmaker(
-    bind=engine,
-    class_=AsyncSession,
-    expire_on_commit=False,
-    autoflush=False
-)
+def create_engine(settings: DbSettings) -> AsyncEngine:
+    """
+    Creates the async engine. Statements are aborted
+    once the request deadline passes, traced in sampled requests
+    and timed for the slow query log.
+    :param settings: Database settings.
+    :return: AsyncEngine object.
+    """
+    engine = create_async_engine(
+        str(settings.DB_URL),
+        connect_args={"check_same_thread": False},
+        pool_pre_ping=True
+    )
+    install_statement_deadline(engine)
+    install_sql_tracing(engine)
+    if settings.DB_SLOW_QUERY_LOG_ENABLED:
+        slow_query_log.configure(
+            settings.DB_SLOW_QUERY_MS,
+            settings.DB_SLOW_QUERY_EXPLAIN,
+            settings.DB_SLOW_QUERY_MAX_FINGERPRINTS
+        )
+        install_query_timing(engine)
+        metrics.register("slow_queries", slow_query_log.stats)
+    return engine
 
-Base = declarative_base()
+
+def install_query_timing(engine: AsyncEngine) -> None:
+    """
+    Times every statement of the engine into the slow query log.
+    :param engine: AsyncEngine object.
+    :return: None
+    """
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def before_execute(
+            connection: Any, cursor: Any, statement: str,
+            parameters: Any, context: Any, executemany: bool
+    ) -> None:
+        context._query_started = time.perf_counter()
+
+    @event.listens_for(engine.sync_engine, "after_cursor_execute")
+    def after_execute(
+            connection: Any, cursor: Any, statement: str,
+            parameters: Any, context: Any, executemany: bool
+    ) -> None:
+        started = getattr(context, "_query_started", None)
+        if started is not None:
+            slow_query_log.record(
+                engine, statement, parameters, executemany,
+                (time.perf_counter() - started) * 1000
+            )
+
+
+def create_session_maker(
+        engine: AsyncEngine
+) -> async_sessionmaker[AsyncSession]:
+    """
+    Creates the session factory bound to the engine.
+    :param engine: AsyncEngine object.
+    :return: Session factory.
+    """
+    return async_sessionmaker(
+        bind=engine,
+        class_=AsyncSession,
+        expire_on_commit=False,
+        autoflush=False
+    )
+
+
+async def warm_up_pool(engine: AsyncEngine, connections: int) -> None:
+    """
+    Opens pooled connections ahead of the first request.
+    :param engine: AsyncEngine object.
+    :param connections: Number of connections to open.
+    :return: None
+    """
+    async def ping() -> None:
+        async with engine.connect() as connection:
+            await connection.execute(text("SELECT 1"))
+
+    await asyncio.gather(*(ping() for _ in range(connections)))
@@ -0,0 +1,208 @@
+import asyncio
+import time
+from contextvars import ContextVar
+from typing import Any, Optional
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+from starlette.requests import Request
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from src.core.admission import matched_route
+from src.core.config import logger, get_deadline_settings
+from src.core.exception_handler import app_exception_handler
+from src.core.exceptions import DeadlineExceeded
+from src.core.metrics import metrics
+
+# Monotonic time the current request must be done by.
+_deadline: ContextVar[Optional[float]] = ContextVar("deadline", default=None)
+
+DEADLINE_HEADER = b"x-request-timeout"
+# SQLite VM instructions between deadline checks of a running statement.
+PROGRESS_STEPS = 10_000
+
+
+def set_deadline(seconds: Optional[float]) -> None:
+    """
+    Sets the deadline of the current context.
+    :param seconds: Seconds from now, None to clear.
+    :return: None
+    """
+    _deadline.set(time.monotonic() + seconds if seconds is not None else None)
+
+
+def detach() -> None:
+    """
+    Clears the deadline in a background task started from a request,
+    its work is shared and must not be cut by one request.
+    :return: None
+    """
+    _deadline.set(None)
+
+
+def remaining() -> Optional[float]:
+    """
+    :return: Seconds left until the deadline, None without a deadline.
+    """
+    deadline = _deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+
+def timeout(default: float) -> float:
+    """
+    Caps a timeout by the deadline.
+    :param default: Timeout without a deadline, seconds.
+    :raises DeadlineExceeded: The deadline has passed.
+    :return: Timeout in seconds.
+    """
+    left = remaining()
+    if left is None:
+        return default
+    if left <= 0:
+        raise DeadlineExceeded()
+    return min(default, left)
+
+
+def install_statement_deadline(engine: AsyncEngine) -> None:
+    """
+    Makes SQLite abort statements that run past the request deadline.
+    The deadline is copied to the connection before each statement,
+    a progress handler checks it in the driver thread.
+    :param engine: AsyncEngine object.
+    :return: None
+    """
+    @event.listens_for(engine.sync_engine, "connect")
+    def on_connect(dbapi_connection: Any, connection_record: Any) -> None:
+        state = connection_record.info.setdefault("deadline", [None])
+
+        def expired() -> bool:
+            deadline = state[0]
+            return deadline is not None and time.monotonic() > deadline
+
+        dbapi_connection.run_async(
+            lambda connection: connection.set_progress_handler(
+                expired, PROGRESS_STEPS
+            )
+        )
+
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def before_execute(connection: Any, *args: Any) -> None:
+        state = connection.connection.info.get("deadline")
+        if state is not None:
+            state[0] = _deadline.get()
+
+
+def has_body(scope: Scope) -> bool:
+    headers = dict(scope["headers"])
+    return (
+        headers.get(b"content-length", b"0") != b"0"
+        or b"transfer-encoding" in headers
+    )
+
+
+class DeadlineMiddleware:
+    """
+    Runs every request under a deadline.
+    The deadline is `X-Request-Timeout` (seconds) if the client sent it,
+    capped by DEADLINE_MAX, or the route default from
+    DEADLINE_ROUTE_DEFAULTS / DEADLINE_DEFAULT. It is kept in
+    a contextvar that upstream calls, retry sleeps and SQL statements
+    read. When it passes, the request is cancelled and answered with
+    504; when the client disconnects, the request is cancelled too.
+    """
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+        self.settings = get_deadline_settings()
+        self._stats = {"expired": 0, "disconnected": 0}
+        metrics.register("deadlines", lambda: dict(self._stats))
+
+    def _seconds(self, scope: Scope) -> float:
+        default = self.settings.DEADLINE_ROUTE_DEFAULTS.get(
+            matched_route(scope),
+            self.settings.DEADLINE_DEFAULT
+        )
+        header = dict(scope["headers"]).get(DEADLINE_HEADER)
+        try:
+            requested = float(header) if header else None
+        except ValueError:
+            requested = None
+        if requested is None or requested <= 0:
+            return default
+        return min(requested, self.settings.DEADLINE_MAX)
+
+    async def __call__(
+            self, scope: Scope, receive: Receive, send: Send
+    ) -> None:
+        if scope["type"] != "http" or not self.settings.DEADLINE_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        seconds = self._seconds(scope)
+        set_deadline(seconds)
+        body_read = asyncio.Event()
+        if not has_body(scope):
+            body_read.set()
+        started = False
+
+        async def receive_body() -> Message:
+            message = await receive()
+            if message["type"] != "http.request" or not message.get(
+                    "more_body", False
+            ):
+                body_read.set()
+            return message
+
+        async def send_started(message: Message) -> None:
+            nonlocal started
+            started = True
+            await send(message)
+
+        async def disconnected() -> None:
+            # After the body, the next message can only be a disconnect.
+            await body_read.wait()
+            while (await receive())["type"] != "http.disconnect":
+                pass
+
+        app_task = asyncio.create_task(
+            self.app(scope, receive_body, send_started)
+        )
+        watcher = asyncio.create_task(disconnected())
+        try:
+            await asyncio.wait(
+                (app_task, watcher), timeout=seconds,
+                return_when=asyncio.FIRST_COMPLETED
+            )
+        except asyncio.CancelledError:
+            app_task.cancel()
+            watcher.cancel()
+            raise
+
+        client_gone = (
+            watcher.done() and not watcher.cancelled()
+            and watcher.exception() is None
+        )
+        watcher.cancel()
+        if app_task.done():
+            app_task.result()
+            return
+
+        app_task.cancel()
+        await asyncio.gather(app_task, return_exceptions=True)
+        if client_gone:
+            self._stats["disconnected"] += 1
+            logger.info(f"Client disconnected, cancelled {scope['path']}")
+            return
+
+        self._stats["expired"] += 1
+        logger.warning(
+            f"Deadline of {seconds} s exceeded, cancelled {scope['path']}"
+        )
+        if not started:
+            await self._timeout(scope, receive, send)
+
+    @staticmethod
+    async def _timeout(scope: Scope, receive: Receive, send: Send) -> None:
+        response = await app_exception_handler(
+            Request(scope), DeadlineExceeded()
+        )
+        await response(scope, receive, send)
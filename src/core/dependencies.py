@@ -1,20 +1,36 @@
+import hmac
 from typing import (
-    AsyncGenerator, Annotated
+    AsyncGenerator, Annotated, Optional
 )
 
-from fastapi import Depends
+from fastapi import Depends, Header, Request
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from src.core.config import api_settings
-from src.core.database import AsyncSessionLocal
+from src.core.abuse import AbuseDetector
+from src.core.analytics import AnalyticsSnapshot
+from src.core.cache import QueryCache
+from src.core.config import get_admin_settings
+from src.core.exceptions import ForbiddenException, ServiceUnavailable
 from src.core.external_api import ExternalAPIClient
-from src.repositories import ComplaintRepository
+from src.core.idempotency import IdempotencyStore
+from src.core.ip_info import IPInfoResolver
+from src.core.prefilter import PreFilter
+from src.core.sharding import ShardSet
+from src.core.similarity import SimilarityIndex
+from src.repositories import (
+    ComplaintRepository, OutboxRepository, ShardedComplaintRepository
+)
 from src.services import ComplaintService
 
 
-async def get_db() -> AsyncGenerator[AsyncSession, None]:
-    """Async session generator with auto reconnect."""
-    async with AsyncSessionLocal() as session:
+async def get_db(request: Request) -> AsyncGenerator[AsyncSession, None]:
+    """
+    Request-scoped async session.
+    The session checks out a pooled connection only on its first query
+    and repository methods end their transaction right away, so no
+    connection is held while a route waits on upstream APIs.
+    """
+    async with request.app.state.session_maker() as session:
         try:
             yield session
             await session.commit()
@@ -25,73 +41,117 @@ async def get_db() -> AsyncGenerator[AsyncSession, None]:
             await session.close()
 
 
+def get_shards(request: Request) -> ShardSet | None:
+    """
+    Get complaint shards.
+    :param request: Request object.
+    :return: ShardSet if sharding is enabled in settings, None otherwise.
+    """
+    return request.app.state.shards
+
+
 async def get_complaint_repository(
-        db: AsyncSession = Depends(get_db)
-) -> ComplaintRepository:
+        db: AsyncSession = Depends(get_db),
+        shards: ShardSet | None = Depends(get_shards)
+) -> ComplaintRepository | ShardedComplaintRepository:
     """
     Get async complaint repository.
     :param db: Database session.
-    :return: Complaint repository.
+    :param shards: Complaint shards.
+    :return: Complaint repository, sharded if sharding is enabled.
     """
+    if shards is not None:
+        return ShardedComplaintRepository(shards)
     repository = ComplaintRepository(db)
     return repository
 
 
+async def get_outbox_repository(
+        db: AsyncSession = Depends(get_db)
+) -> OutboxRepository:
+    """
+    Get async outbox repository.
+    :param db: Database session.
+    :return: Outbox repository.
+    """
+    return OutboxRepository(db)
+
+
+def get_query_cache(request: Request) -> QueryCache | None:
+    """
+    Get shared query cache.
+    :param request: Request object.
+    :return: Query cache if enabled in settings, None otherwise.
+    """
+    return request.app.state.query_cache
+
+
+def get_similarity_index(request: Request) -> SimilarityIndex | None:
+    """
+    Get shared similar complaints index.
+    :param request: Request object.
+    :return: Similarity index if enabled in settings, None otherwise.
+    """
+    return request.app.state.similarity_index
+
+
 async def get_complaint_service(
-        repository: ComplaintRepository = Depends(get_complaint_repository)
+        repository: ComplaintRepository | ShardedComplaintRepository = (
+            Depends(get_complaint_repository)
+        ),
+        cache: QueryCache | None = Depends(get_query_cache),
+        similarity_index: SimilarityIndex | None = Depends(
+            get_similarity_index
+        )
 ) -> ComplaintService:
     """
     Get async complaint service.
     :param repository: Complaint repository.
+    :param cache: Query cache.
+    :param similarity_index: Similar complaints index.
     :return: Complaint service.
     """
-    service = ComplaintService(repository)
+    service = ComplaintService(repository, cache, similarity_index)
     return service
 
 
 ComplaintRepositoryDep = Annotated[
-    ComplaintRepository, Depends(get_complaint_repository)
+    ComplaintRepository | ShardedComplaintRepository,
+    Depends(get_complaint_repository)
 ]
 ComplaintServiceDep = Annotated[
     ComplaintService, Depends(get_complaint_service)
 ]
+OutboxRepositoryDep = Annotated[
+    OutboxRepository, Depends(get_outbox_repository)
+]
 
 
-async def get_api_layer_client() -> AsyncGenerator[ExternalAPIClient, None]:
-    try:
-        api_client = ExternalAPIClient(
-            base_url=api_settings.SENTIMENT_ANALYSIS_BASE_URL,
-            extra_headers={"apikey": api_settings.SENTIMENT_ANALYSIS_API_KEY}
-        )
-        async with api_client:
-            yield api_client
-    finally:
-        pass
+def get_api_layer_client(request: Request) -> ExternalAPIClient:
+    """
+    Get shared apilayer client.
+    :param request: Request object.
+    :return: External API client.
+    """
+    return request.app.state.api_layer_client
 
 
-async def get_ip_api_client() -> AsyncGenerator[ExternalAPIClient, None]:
-    try:
-        api_client = ExternalAPIClient(
-            base_url=api_settings.IP_API_BASE_URL
-        )
-        async with api_client:
-            yield api_client
-    finally:
-        pass
-
-
-async def get_hugging_face_client() -> AsyncGenerator[ExternalAPIClient, None]:
-    try:
-        api_client = ExternalAPIClient(
-            base_url=api_settings.OPEN_ROUTER_BASE_URL,
-            extra_headers={
-                "Authorization": f"Bearer {api_settings.OPEN_ROUTER_API_KEY}"
-            }
-        )
-        async with api_client:
-            yield api_client
-    finally:
-        pass
+def get_ip_api_client(request: Request) -> ExternalAPIClient:
+    """
+    Get shared ip-api client.
+    :param request: Request object.
+    :return: External API client.
+    """
+    return request.app.state.ip_api_client
+
+
+def get_hugging_face_client(request: Request) -> ExternalAPIClient:
+    """
+    Get shared OpenRouter client.
+    :param request: Request object.
+    :return: External API client.
+    """
+    return request.app.state.hugging_face_client
 
 
 ApiLayerClientDep = Annotated[ExternalAPIClient, Depends(get_api_layer_client)]
@@ -99,3 +159,108 @@ ApiIPClientDep = Annotated[ExternalAPIClient, Depends(get_ip_api_client)]
 ApiHuggingFaceClientDep = Annotated[
     ExternalAPIClient, Depends(get_hugging_face_client)
 ]
+
+
+def get_ip_info_resolver(request: Request) -> IPInfoResolver:
+    """
+    Get shared IP info resolver.
+    :param request: Request object.
+    :return: IP info resolver.
+    """
+    return request.app.state.ip_info_resolver
+
+
+IPInfoResolverDep = Annotated[IPInfoResolver, Depends(get_ip_info_resolver)]
+
+
+def get_idempotency_store(request: Request) -> IdempotencyStore:
+    """
+    Get shared Idempotency-Key store.
+    :param request: Request object.
+    :return: IdempotencyStore object.
+    """
+    return request.app.state.idempotency_store
+
+
+IdempotencyStoreDep = Annotated[
+    IdempotencyStore, Depends(get_idempotency_store)
+]
+
+
+def get_abuse_detector(request: Request) -> AbuseDetector | None:
+    """
+    Get shared abuse detector.
+    :param request: Request object.
+    :return: AbuseDetector if enabled in settings, None otherwise.
+    """
+    return request.app.state.abuse_detector
+
+
+AbuseDetectorDep = Annotated[
+    AbuseDetector | None, Depends(get_abuse_detector)
+]
+
+
+def get_prefilter(request: Request) -> PreFilter | None:
+    """
+    Get shared complaint text pre-filter.
+    :param request: Request object.
+    :return: PreFilter if enabled in settings, None otherwise.
+    """
+    return request.app.state.prefilter
+
+
+PreFilterDep = Annotated[PreFilter | None, Depends(get_prefilter)]
+
+
+def get_analytics_snapshot(request: Request) -> AnalyticsSnapshot:
+    """
+    Get shared analytics snapshot.
+    :param request: Request object.
+    :raises ServiceUnavailable: Analytics are disabled in settings.
+    :return: AnalyticsSnapshot object.
+    """
+    snapshot = request.app.state.analytics_snapshot
+    if snapshot is None:
+        raise ServiceUnavailable(details="Analytics are disabled")
+    return snapshot
+
+
+AnalyticsSnapshotDep = Annotated[
+    AnalyticsSnapshot, Depends(get_analytics_snapshot)
+]
+
+
+def verify_admin_token(
+        x_admin_token: Optional[str] = Header(default=None)
+) -> None:
+    """
+    Checks the X-Admin-Token header against ADMIN_TOKEN.
+    :param x_admin_token: Admin token header.
+    :raises ForbiddenException: Token is missing, wrong or not configured.
+    :return: None
+    """
+    admin_token = get_admin_settings().ADMIN_TOKEN
+    if not admin_token or not x_admin_token or not hmac.compare_digest(
+            x_admin_token.encode(), admin_token.encode()
+    ):
+        raise ForbiddenException(details="Valid X-Admin-Token is required")
+
+
+AdminTokenDep = Depends(verify_admin_token)
+
+
+def require_shards(request: Request) -> ShardSet:
+    """
+    Get complaint shards for admin routes.
+    :param request: Request object.
+    :raises ServiceUnavailable: Sharding is disabled in settings.
+    :return: ShardSet object.
+    """
+    shards = get_shards(request)
+    if shards is None:
+        raise ServiceUnavailable(details="Sharding is disabled")
+    return shards
+
+
+ShardSetDep = Annotated[ShardSet, Depends(require_shards)]
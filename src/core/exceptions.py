@@ -32,6 +32,20 @@ class NotFoundException(AppException):
         )
 
 
+class ForbiddenException(AppException):
+    """
+    Access is forbidden (403).
+    """
+    def __init__(
+            self,
+            message: str = "Forbidden.",
+            details: Optional[str] = None
+    ):
+        super().__init__(
+            message, status.HTTP_403_FORBIDDEN, details
+        )
+
+
 class ValidationException(AppException):
     """
     Validation exception class (422).
@@ -118,6 +132,20 @@ class ComplaintNotFound(AppException):
         )
 
 
+class ConflictException(AppException):
+    """
+    State conflict exception class (409).
+    """
+    def __init__(
+            self,
+            message: str = "Conflict.",
+            details: Optional[str] = None
+    ):
+        super().__init__(
+            message, status.HTTP_409_CONFLICT, details
+        )
+
+
 class APIError(AppException):
     """
     API error class.
@@ -132,6 +160,47 @@ class APIError(AppException):
         )
 
 
+class UpstreamOverloaded(APIError):
+    """
+    Upstream concurrency limit is reached and the wait timed out (503).
+    """
+    def __init__(
+            self,
+            message: str = "Upstream is overloaded.",
+            details: Optional[str] = None
+    ):
+        super().__init__(message, details)
+        self.code = status.HTTP_503_SERVICE_UNAVAILABLE
+
+
+class ServiceUnavailable(AppException):
+    """
+    Feature is disabled or not ready (503).
+    """
+    def __init__(
+            self,
+            message: str = "Service unavailable.",
+            details: Optional[str] = None
+    ):
+        super().__init__(
+            message, status.HTTP_503_SERVICE_UNAVAILABLE, details
+        )
+
+
+class PayloadTooLarge(AppException):
+    """
+    Request body is over the limit (413).
+    """
+    def __init__(
+            self,
+            message: str = "Request body is too large.",
+            details: Optional[str] = None
+    ):
+        super().__init__(
+            message, status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, details
+        )
+
+
 class TooManyRequests(AppException):
     def __init__(
             self,
@@ -152,3 +221,15 @@ class AIException(AppException):
         super().__init__(
             message, status.HTTP_500_INTERNAL_SERVER_ERROR, details
         )
+
+
+class DeadlineExceeded(AppException):
+    """
+    Request deadline passed before the work was done (504).
+    """
+    def __init__(
+            self,
+            message: str = "Request deadline exceeded.",
+            details: Optional[str] = None
+    ):
+        super().__init__(message, status.HTTP_504_GATEWAY_TIMEOUT, details)
@@ -1,26 +1,45 @@
 import asyncio
+from contextlib import nullcontext
 from typing import (
-    Mapping, Any, Optional
+    Mapping, Any, Optional, AsyncIterator, AsyncContextManager
 )
 
 import httpx
 
-from src.core.config import logger
-from src.core.exceptions import APIError
+from src.core import deadline, tracing
+from src.core.concurrency import AdaptiveLimiter, Slot
+from src.core.config import logger, APISettings, OutboxSettings
+from src.core.exceptions import APIError, UpstreamOverloaded
+
+TIMEOUT = 10.0
+RETRY_DELAY = 1.0
 
 
 class ExternalAPIClient:
+    """
+    Pooled HTTP client for external APIs.
+    One instance is meant to be shared for the app lifetime,
+    it is closed on exit from the async context.
+    With a limiter, every attempt holds a slot of its adaptive
+    concurrency limit. Attempt timeouts and retry sleeps are capped
+    by the request deadline. In sampled requests, every call
+    and every attempt of it is a tracing span.
+    """
     def __init__(
             self,
             base_url: str,
-            extra_headers: Optional[Mapping[str, Any]] = None
+            extra_headers: Optional[Mapping[str, Any]] = None,
+            limits: Optional[httpx.Limits] = None,
+            limiter: Optional[AdaptiveLimiter] = None
     ) -> None:
         self.retries: int = 2
         self.base_url = base_url
+        self.limiter = limiter
         self.client = httpx.AsyncClient(
             base_url=self.base_url,
             headers=self.__setup_headers(extra_headers),
-            timeout=httpx.Timeout(10),
+            timeout=httpx.Timeout(TIMEOUT),
+            **({"limits": limits} if limits else {}),
         )
 
     async def __aenter__(self) -> "ExternalAPIClient":
@@ -46,6 +65,11 @@ class ExternalAPIClient:
             headers.update(extra_headers)
         return headers
 
+    def _slot(self) -> AsyncContextManager[Slot]:
+        if self.limiter is None:
+            return nullcontext(Slot())
+        return self.limiter.slot()
+
     async def __request(
             self,
             method: str,
@@ -58,25 +82,30 @@ class ExternalAPIClient:
         :param endpoint: Full URL of the external API.
         :param kwargs: Additional arguments to pass to the request.
         :raises: APIError when the request fails max attempts.
+        :raises DeadlineExceeded: The request deadline has passed.
         :return: HTTP response if successful or None otherwise.
         """
 
-        last_error = None
-        async with self.client:
+        with tracing.span(
+                "upstream", method=method, url=f"{self.base_url}{url}"
+        ) as call:
+            last_error = None
             for attempt in range(0, self.retries):
+                call.set(attempts=attempt + 1)
+                attempt_timeout = deadline.timeout(TIMEOUT)
                 try:
-                    response = await self.client.request(
-                        method=method,
-                        url=url,
-                        **kwargs
+                    return await self.__attempt(
+                        method, url, attempt,
+                        {"timeout": attempt_timeout, **kwargs}
                     )
-                    response.raise_for_status()
-                    return response.json()
+                except UpstreamOverloaded:
+                    raise
                 except httpx.HTTPStatusError as e:
                     last_error = APIError("HTTP Status Error", str(e))
                     logger.warning(
                         f"Attempt {attempt + 1}/{self.retries + 1} failed. "
-                        f"API returned status code {e.response.status_code}. "
+                        "API returned status code "
+                        f"{e.response.status_code}. "
                     )
                 except httpx.HTTPError as e:
                     last_error = APIError("HTTP Status Error", str(e))
@@ -98,15 +127,157 @@ class ExternalAPIClient:
                     )
 
                 if attempt < self.retries:
-                    await asyncio.sleep(1)
+                    left = deadline.remaining()
+                    if left is not None and left <= RETRY_DELAY:
+                        # The next attempt could not finish in time.
+                        break
+                    await asyncio.sleep(RETRY_DELAY)
 
             raise last_error if last_error else APIError(
                 "Unknown Error Occurred."
             )
 
+    async def __attempt(
+            self,
+            method: str,
+            url: str,
+            attempt: int,
+            kwargs: dict[str, Any]
+    ) -> dict[str, Any]:
+        """
+        Sends one attempt of a request in its own span.
+        :raises httpx.HTTPError: The attempt failed.
+        :return: Response JSON, empty dict for an empty body.
+        """
+        with tracing.span("upstream.attempt", attempt=attempt + 1) as span:
+            async with self._slot() as slot:
+                response = await self.client.request(
+                    method=method, url=url, **kwargs
+                )
+                slot.record(response.status_code)
+            span.set(status=response.status_code)
+            response.raise_for_status()
+            return response.json() if response.content else {}
+
+    async def stream_lines(
+            self,
+            method: str,
+            url: str,
+            **kwargs
+    ) -> AsyncIterator[str]:
+        """
+        Sends a request and yields the response body line by line.
+        Not retried. Closing the generator early (contextlib.aclosing)
+        closes the response, so the upstream stops sending.
+        :param method: Method of the request.
+        :param url: URL or path of the external API.
+        :param kwargs: Additional arguments to pass to the request.
+        :raises: APIError when the request fails.
+        :raises DeadlineExceeded: The request deadline has passed.
+        :return: Async iterator of response lines.
+        """
+        stream_timeout = deadline.timeout(TIMEOUT)
+        # Not made current, the generator is resumed by its consumer.
+        span = tracing.start_span(
+            "upstream.stream", method=method, url=f"{self.base_url}{url}"
+        )
+        error = None
+        try:
+            async with self._slot() as slot, self.client.stream(
+                    method=method,
+                    url=url,
+                    **{"timeout": stream_timeout, **kwargs}
+            ) as response:
+                slot.record(response.status_code)
+                span.set(status=response.status_code)
+                response.raise_for_status()
+                async for line in response.aiter_lines():
+                    yield line
+        except httpx.HTTPStatusError as e:
+            error = APIError("HTTP Status Error", str(e))
+            raise error
+        except httpx.HTTPError as e:
+            error = APIError("HTTP Error", str(e))
+            raise error
+        except GeneratorExit:
+            # Closed early by the consumer, not a failure.
+            raise
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            span.end(error)
+
     get = lambda self, e, **kw: self.__request("GET", e, **kw)  # noqa: E731
     post = lambda self, e, **kw: self.__request("POST", e, **kw)  # noqa: E731
     put = lambda self, e, **kw: self.__request("PUT", e, **kw)  # noqa: E731
     delete = lambda self, e, **kw: self.__request(  # noqa: E731
         "DELETE", e, **kw
     )
+
+
+def create_api_layer_client(
+        settings: APISettings,
+        limiter: Optional[AdaptiveLimiter] = None
+) -> ExternalAPIClient:
+    """
+    Creates apilayer (sentiment analysis) client.
+    :param settings: API settings.
+    :param limiter: Adaptive concurrency limiter.
+    :return: ExternalAPIClient object.
+    """
+    return ExternalAPIClient(
+        base_url=settings.SENTIMENT_ANALYSIS_BASE_URL,
+        extra_headers={"apikey": settings.SENTIMENT_ANALYSIS_API_KEY},
+        limiter=limiter
+    )
+
+
+def create_ip_api_client(
+        settings: APISettings,
+        limiter: Optional[AdaptiveLimiter] = None
+) -> ExternalAPIClient:
+    """
+    Creates ip-api client.
+    :param settings: API settings.
+    :param limiter: Adaptive concurrency limiter.
+    :return: ExternalAPIClient object.
+    """
+    return ExternalAPIClient(
+        base_url=settings.IP_API_BASE_URL,
+        limiter=limiter
+    )
+
+
+def create_hugging_face_client(
+        settings: APISettings,
+        limiter: Optional[AdaptiveLimiter] = None
+) -> ExternalAPIClient:
+    """
+    Creates OpenRouter (category classifier) client.
+    :param settings: API settings.
+    :param limiter: Adaptive concurrency limiter.
+    :return: ExternalAPIClient object.
+    """
+    return ExternalAPIClient(
+        base_url=settings.OPEN_ROUTER_BASE_URL,
+        extra_headers={
+            "Authorization": f"Bearer {settings.OPEN_ROUTER_API_KEY}"
+        },
+        limiter=limiter
+    )
+
+
+def create_webhook_client(settings: OutboxSettings) -> ExternalAPIClient:
+    """
+    Creates the outbox webhook client, endpoints are absolute URLs.
+    :param settings: Outbox settings.
+    :return: ExternalAPIClient object.
+    """
+    return ExternalAPIClient(
+        base_url="",
+        limits=httpx.Limits(
+            max_connections=settings.OUTBOX_ENDPOINT_CONCURRENCY
+            * max(len(settings.webhook_urls), 1)
+        )
+    )
@@ -0,0 +1,139 @@
+import asyncio
+import hashlib
+import time
+from collections import OrderedDict
+from typing import (
+    Any, Awaitable, Callable, Optional
+)
+
+from src.core.exceptions import ConflictException
+
+
+class IdempotencyStore:
+    """
+    Bounded TTL store of Idempotency-Key executions.
+    The first request with a key runs the call, concurrent duplicates
+    wait for it, later duplicates within the TTL replay its result.
+    A key reused with a different request body is rejected (409).
+    Failed executions are not stored, so the client may retry them.
+    """
+    def __init__(self, ttl: float = 86400, max_size: int = 10_000) -> None:
+        self.ttl = ttl
+        self.max_size = max_size
+        # key -> (fingerprint, expires_at, future), expires_at is None
+        # while the call is in flight.
+        self._entries: OrderedDict[
+            str, tuple[str, Optional[float], asyncio.Future]
+        ] = OrderedDict()
+
+        self.executed: int = 0
+        self.replayed: int = 0
+        self.waited: int = 0
+        self.conflicts: int = 0
+        self.evictions: int = 0
+
+    @staticmethod
+    def fingerprint(body: bytes) -> str:
+        return hashlib.blake2b(body, digest_size=16).hexdigest()
+
+    def _get(
+            self,
+            key: str
+    ) -> Optional[tuple[str, Optional[float], asyncio.Future]]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        _, expires_at, _ = entry
+        if expires_at is not None and expires_at <= time.monotonic():
+            del self._entries[key]
+            return None
+        return entry
+
+    def _set(
+            self,
+            key: str,
+            entry: tuple[str, Optional[float], asyncio.Future]
+    ) -> None:
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def _discard(self, key: str, future: asyncio.Future) -> None:
+        entry = self._entries.get(key)
+        if entry is not None and entry[2] is future:
+            del self._entries[key]
+
+    async def run(
+            self,
+            key: str,
+            fingerprint: str,
+            call: Callable[[], Awaitable[Any]]
+    ) -> tuple[Any, bool]:
+        """
+        Runs the call once per key.
+        :param key: Idempotency-Key header value.
+        :param fingerprint: Request fingerprint, see `fingerprint`.
+        :param call: Coroutine function executing the request.
+        :raises ConflictException: Key was used for a different request.
+        :raises: Any exception raised by the call.
+        :return: Result and whether it was replayed.
+        """
+        while True:
+            entry = self._get(key)
+            if entry is None:
+                break
+
+            stored_fingerprint, expires_at, future = entry
+            if stored_fingerprint != fingerprint:
+                self.conflicts += 1
+                raise ConflictException(
+                    message="Idempotency-Key was used for another request.",
+                    details=f"Key: {key}"
+                )
+
+            if expires_at is None:
+                self.waited += 1
+            else:
+                self.replayed += 1
+            try:
+                return await asyncio.shield(future), True
+            except asyncio.CancelledError:
+                if not future.cancelled():
+                    raise
+                # The first request was cancelled, run it again.
+
+        self.executed += 1
+        future = asyncio.get_running_loop().create_future()
+        self._set(key, (fingerprint, None, future))
+        try:
+            result = await call()
+        except asyncio.CancelledError:
+            self._discard(key, future)
+            future.cancel()
+            raise
+        except BaseException as e:
+            self._discard(key, future)
+            future.set_exception(e)
+            # Mark as retrieved when nobody waits for it.
+            future.exception()
+            raise
+        future.set_result(result)
+        if self._entries.get(key, (None, None, None))[2] is future:
+            self._set(key, (fingerprint, time.monotonic() + self.ttl, future))
+        return result, False
+
+    def stats(self) -> dict[str, int]:
+        """
+        Returns store counters.
+        :return: Store stats as a dict.
+        """
+        return {
+            "executed": self.executed,
+            "replayed": self.replayed,
+            "waited": self.waited,
+            "conflicts": self.conflicts,
+            "evictions": self.evictions,
+            "size": len(self._entries),
+        }
@@ -0,0 +1,172 @@
+import asyncio
+import time
+from collections import OrderedDict
+from itertools import islice
+from typing import (
+    Any, Optional
+)
+
+from src.core import deadline
+from src.core.config import logger
+from src.core.exceptions import APIError
+from src.core.external_api import ExternalAPIClient
+
+
+class IPInfoResolver:
+    """
+    Cached ip-api lookups.
+    Successful answers are cached for `ttl` seconds, failures for
+    `negative_ttl` seconds, the cache is bounded by an LRU.
+    Lookups arriving within `batch_window` seconds are resolved
+    with one request to the ip-api `/batch` endpoint.
+    """
+    def __init__(
+            self,
+            client: ExternalAPIClient,
+            ttl: float = 3600,
+            negative_ttl: float = 60,
+            max_size: int = 10_000,
+            batch_window: float = 0.05,
+            batch_size: int = 100
+    ) -> None:
+        self.client = client
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_size = max_size
+        self.batch_window = batch_window
+        self.batch_size = batch_size
+
+        self._cache: OrderedDict[
+            str, tuple[float, Optional[dict[str, Any]]]
+        ] = OrderedDict()
+        self._pending: dict[str, asyncio.Future] = {}
+        self._flush_task: Optional[asyncio.Task] = None
+        self._background: set[asyncio.Task] = set()
+
+        self.hits: int = 0
+        self.misses: int = 0
+        self.batches: int = 0
+
+    def _get(self, ip: str) -> tuple[bool, Optional[dict[str, Any]]]:
+        entry = self._cache.get(ip)
+        if entry is None:
+            return False, None
+        expires_at, info = entry
+        if expires_at < time.monotonic():
+            del self._cache[ip]
+            return False, None
+        self._cache.move_to_end(ip)
+        return True, info
+
+    def _set(self, ip: str, info: Optional[dict[str, Any]]) -> None:
+        ttl = self.ttl if info is not None else self.negative_ttl
+        self._cache[ip] = (time.monotonic() + ttl, info)
+        self._cache.move_to_end(ip)
+        while len(self._cache) > self.max_size:
+            self._cache.popitem(last=False)
+
+    async def lookup(self, ip: str) -> Optional[dict[str, Any]]:
+        """
+        Returns IP info from the cache or the next batch request.
+        :param ip: IP address.
+        :return: ip-api answer if successful, None otherwise.
+        """
+        found, info = self._get(ip)
+        if found:
+            self.hits += 1
+            return info
+
+        self.misses += 1
+        future = self._pending.get(ip)
+        if future is None:
+            future = asyncio.get_running_loop().create_future()
+            self._pending[ip] = future
+            if self._flush_task is None:
+                self._flush_task = asyncio.create_task(self._flush())
+        return await asyncio.shield(future)
+
+    def submit(self, ip: str) -> None:
+        """
+        Looks up and logs IP info in the background.
+        :param ip: IP address.
+        :return: None
+        """
+        task = asyncio.create_task(self._lookup_and_log(ip))
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+
+    async def _lookup_and_log(self, ip: str) -> None:
+        deadline.detach()
+        info = await self.lookup(ip)
+        logger.info(f"Got user info for {ip}: {info}")
+
+    async def _flush(self) -> None:
+        # Waiters of other requests share the batch.
+        deadline.detach()
+        try:
+            await asyncio.sleep(self.batch_window)
+            while self._pending:
+                batch = dict(islice(self._pending.items(), self.batch_size))
+                for ip in batch:
+                    del self._pending[ip]
+                await self._resolve(batch)
+        finally:
+            self._flush_task = None
+
+    async def _resolve(self, batch: dict[str, asyncio.Future]) -> None:
+        self.batches += 1
+        # The futures are no longer in _pending: each one is resolved
+        # here, or cancelled, so its waiters never hang.
+        try:
+            try:
+                response = await self.client.post("/batch", json=list(batch))
+            except APIError as e:
+                logger.warning(f"IP info batch request failed: {e.details}")
+                response = []
+            except Exception as e:
+                logger.warning(f"IP info batch request failed: {e!r}")
+                response = []
+
+            answers = {
+                item.get("query"): item
+                for item in response if isinstance(item, dict)
+            } if isinstance(response, list) else {}
+            for ip, future in batch.items():
+                info = answers.get(ip)
+                if not info or info.get("status") != "success":
+                    info = None
+                self._set(ip, info)
+                if not future.done():
+                    future.set_result(info)
+        finally:
+            for future in batch.values():
+                if not future.done():
+                    future.cancel()
+
+    async def close(self) -> None:
+        """
+        Cancels pending background lookups.
+        :return: None
+        """
+        tasks = [*self._background]
+        if self._flush_task is not None:
+            tasks.append(self._flush_task)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        for future in self._pending.values():
+            future.cancel()
+        self._pending.clear()
+
+    def stats(self) -> dict[str, int]:
+        """
+        Returns resolver counters.
+        :return: Resolver stats as a dict.
+        """
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "batches": self.batches,
+            "size": len(self._cache),
+            "pending": len(self._pending),
+        }
@@ -0,0 +1,284 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager, contextmanager, AsyncExitStack
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import (
+    Any, AsyncIterator, Iterator
+)
+
+from fastapi import FastAPI
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from src.core.abuse import AbuseDetector
+from src.core.analytics import AnalyticsSnapshot
+from src.core.cache import QueryCache
+from src.core.concurrency import AdaptiveLimiter
+from src.core.config import (
+    logger, setup_logger,
+    get_db_settings, get_api_settings, get_cache_settings,
+    get_ip_info_settings, get_archive_settings, get_outbox_settings,
+    get_idempotency_settings, get_concurrency_settings,
+    get_similarity_settings, get_analytics_settings, get_sharding_settings,
+    get_loop_monitor_settings, get_abuse_settings, get_prefilter_settings
+)
+from src.core.database import (
+    create_engine, create_session_maker, warm_up_pool
+)
+from src.core.exceptions import AppException
+from src.core.external_api import (
+    create_api_layer_client, create_ip_api_client,
+    create_hugging_face_client, create_webhook_client
+)
+from src.core.idempotency import IdempotencyStore
+from src.core.ip_info import IPInfoResolver
+from src.core.loop_monitor import LoopMonitor
+from src.core.metrics import metrics
+from src.core.outbox import OutboxDispatcher
+from src.core.prefilter import PreFilter
+from src.core.sharding import ShardSet
+from src.core.similarity import SimilarityIndex
+from src.models.enums import ComplaintStatus
+from src.models.schemas import ComplaintFilters
+from src.repositories import ComplaintRepository, complaint_repository_scope
+
+
+class StartupTimings:
+    """
+    Startup time breakdown by phase, in milliseconds.
+    """
+    def __init__(self) -> None:
+        self.phases: dict[str, float] = {}
+
+    @contextmanager
+    def measure(self, phase: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[phase] = round(
+                (time.perf_counter() - started) * 1000, 3
+            )
+
+    def snapshot(self) -> dict[str, Any]:
+        return {
+            "phases_ms": dict(self.phases),
+            "total_ms": round(sum(self.phases.values()), 3),
+        }
+
+
+async def warm_up_queries(
+        session_maker: async_sessionmaker[AsyncSession]
+) -> None:
+    """
+    Runs the hot list query once over an empty time range,
+    so its SQL is compiled and cached before the first request.
+    :param session_maker: Session factory.
+    :return: None
+    """
+    epoch = datetime.fromtimestamp(0, timezone.utc)
+    async with session_maker() as session:
+        await ComplaintRepository(session).get_complaints_rows(
+            ComplaintFilters(
+                status=ComplaintStatus.OPEN,
+                timestamp={"start_date": epoch, "end_date": epoch}
+            )
+        )
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    """
+    Builds app resources in order and releases them on shutdown.
+    Everything is stored in `app.state` and read by dependencies.
+    :param app: FastAPI application.
+    """
+    timings = StartupTimings()
+    app.state.startup = timings
+    metrics.register("startup", timings.snapshot)
+
+    async with AsyncExitStack() as stack:
+        with timings.measure("settings"):
+            setup_logger()
+            db_settings = get_db_settings()
+            api_settings = get_api_settings()
+            cache_settings = get_cache_settings()
+            ip_info_settings = get_ip_info_settings()
+            outbox_settings = get_outbox_settings()
+            idempotency_settings = get_idempotency_settings()
+            concurrency_settings = get_concurrency_settings()
+            similarity_settings = get_similarity_settings()
+            analytics_settings = get_analytics_settings()
+            sharding_settings = get_sharding_settings()
+            loop_monitor_settings = get_loop_monitor_settings()
+            abuse_settings = get_abuse_settings()
+            prefilter_settings = get_prefilter_settings()
+            get_archive_settings()
+
+        with timings.measure("database"):
+            engine = create_engine(db_settings)
+            stack.push_async_callback(engine.dispose)
+            app.state.engine = engine
+            app.state.session_maker = create_session_maker(engine)
+
+            app.state.shards = None
+            if sharding_settings.SHARDING_ENABLED:
+                # The main database keeps serving pre-sharding complaints.
+                shards = ShardSet(
+                    Path(sharding_settings.SHARD_DIR),
+                    sharding_settings.SHARD_PERIOD,
+                    legacy_engine=engine
+                )
+                await shards.open()
+                stack.push_async_callback(shards.close)
+                app.state.shards = shards
+                metrics.register("shards", shards.stats)
+            repository_scope = complaint_repository_scope(
+                app.state.session_maker, app.state.shards
+            )
+
+        with timings.measure("http_clients"):
+            limiters = {}
+            if concurrency_settings.UPSTREAM_LIMIT_ENABLED:
+                limiters = {
+                    name: AdaptiveLimiter.from_settings(
+                        name, concurrency_settings
+                    )
+                    for name in ("api_layer", "ip_api", "hugging_face")
+                }
+            app.state.upstream_limiters = limiters
+            metrics.register("upstream_limits", lambda: {
+                name: limiter.stats() for name, limiter in limiters.items()
+            })
+
+            app.state.api_layer_client = await stack.enter_async_context(
+                create_api_layer_client(
+                    api_settings, limiters.get("api_layer")
+                )
+            )
+            app.state.ip_api_client = await stack.enter_async_context(
+                create_ip_api_client(api_settings, limiters.get("ip_api"))
+            )
+            app.state.hugging_face_client = await stack.enter_async_context(
+                create_hugging_face_client(
+                    api_settings, limiters.get("hugging_face")
+                )
+            )
+            app.state.webhook_client = await stack.enter_async_context(
+                create_webhook_client(outbox_settings)
+            )
+
+        with timings.measure("caches"):
+            app.state.query_cache = None
+            if cache_settings.QUERY_CACHE_ENABLED:
+                app.state.query_cache = QueryCache(
+                    max_size=cache_settings.QUERY_CACHE_MAX_SIZE
+                )
+                metrics.register("query_cache", app.state.query_cache.stats)
+
+            ip_info_resolver = IPInfoResolver(
+                client=app.state.ip_api_client,
+                ttl=ip_info_settings.IP_INFO_CACHE_TTL,
+                negative_ttl=ip_info_settings.IP_INFO_NEGATIVE_TTL,
+                max_size=ip_info_settings.IP_INFO_CACHE_MAX_SIZE,
+                batch_window=ip_info_settings.IP_INFO_BATCH_WINDOW,
+                batch_size=ip_info_settings.IP_INFO_BATCH_SIZE
+            )
+            stack.push_async_callback(ip_info_resolver.close)
+            app.state.ip_info_resolver = ip_info_resolver
+            metrics.register("ip_info", ip_info_resolver.stats)
+
+            app.state.idempotency_store = IdempotencyStore(
+                ttl=idempotency_settings.IDEMPOTENCY_TTL,
+                max_size=idempotency_settings.IDEMPOTENCY_MAX_SIZE
+            )
+            metrics.register("idempotency", app.state.idempotency_store.stats)
+
+            app.state.abuse_detector = None
+            if abuse_settings.ABUSE_ENABLED:
+                app.state.abuse_detector = AbuseDetector(abuse_settings)
+                metrics.register("abuse", app.state.abuse_detector.stats)
+
+            app.state.prefilter = None
+            if prefilter_settings.PREFILTER_ENABLED:
+                app.state.prefilter = PreFilter(prefilter_settings)
+                metrics.register("prefilter", app.state.prefilter.stats)
+
+            app.state.similarity_index = None
+            if similarity_settings.SIMILARITY_ENABLED:
+                app.state.similarity_index = await asyncio.to_thread(
+                    SimilarityIndex.load,
+                    Path(similarity_settings.SIMILARITY_INDEX_PATH),
+                    similarity_settings.SIMILARITY_FEATURES,
+                    similarity_settings.SIMILARITY_MAX_CANDIDATES
+                )
+                metrics.register(
+                    "similarity", app.state.similarity_index.stats
+                )
+
+            app.state.analytics_snapshot = None
+            if analytics_settings.ANALYTICS_ENABLED:
+                snapshot = AnalyticsSnapshot(
+                    Path(analytics_settings.ANALYTICS_SNAPSHOT_PATH),
+                    analytics_settings.ANALYTICS_BATCH_SIZE
+                )
+                # The last snapshot serves queries until the first refresh.
+                await asyncio.to_thread(snapshot.load)
+                app.state.analytics_snapshot = snapshot
+                metrics.register("analytics", snapshot.stats)
+
+        with timings.measure("warm_up"):
+            try:
+                await warm_up_pool(
+                    engine, db_settings.DB_WARM_UP_CONNECTIONS
+                )
+                await warm_up_queries(app.state.session_maker)
+            except (AppException, SQLAlchemyError) as e:
+                logger.warning(f"Database warm-up failed: {e}")
+
+        with timings.measure("background"):
+            app.state.loop_monitor = None
+            if loop_monitor_settings.LOOP_MONITOR_ENABLED:
+                loop_monitor = LoopMonitor.from_settings(
+                    loop_monitor_settings
+                )
+                loop_monitor.start()
+                stack.push_async_callback(loop_monitor.close)
+                app.state.loop_monitor = loop_monitor
+                metrics.register("event_loop", loop_monitor.stats)
+
+            app.state.outbox_dispatcher = None
+            if outbox_settings.webhook_urls:
+                dispatcher = OutboxDispatcher(
+                    app.state.session_maker,
+                    app.state.webhook_client,
+                    outbox_settings,
+                    app.state.shards
+                )
+                dispatcher.start()
+                stack.push_async_callback(dispatcher.close)
+                app.state.outbox_dispatcher = dispatcher
+                metrics.register("outbox", dispatcher.stats)
+
+            if app.state.similarity_index is not None:
+                index_path = Path(similarity_settings.SIMILARITY_INDEX_PATH)
+                app.state.similarity_index.start(
+                    repository_scope,
+                    index_path,
+                    similarity_settings.SIMILARITY_SAVE_INTERVAL
+                )
+                stack.push_async_callback(
+                    app.state.similarity_index.close, index_path
+                )
+
+            if app.state.analytics_snapshot is not None:
+                app.state.analytics_snapshot.start(
+                    repository_scope,
+                    analytics_settings.ANALYTICS_REFRESH_INTERVAL
+                )
+                stack.push_async_callback(app.state.analytics_snapshot.close)
+
+        logger.info(f"Startup finished: {timings.snapshot()}")
+        yield
+        logger.info("Shutting down")
@@ -0,0 +1,158 @@
+import asyncio
+import sys
+import threading
+import time
+from bisect import bisect_left
+from collections import deque
+from datetime import datetime, timezone
+from typing import Any, Optional
+
+from src.core.config import logger, LoopMonitorSettings
+from src.core.profiler import frame_name
+
+# Upper bounds of lag histogram buckets, in milliseconds.
+LAG_BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500)
+MAX_STACK_DEPTH = 40
+
+
+class LoopMonitor:
+    """
+    Measures event loop lag and catches callbacks that block it.
+    A heartbeat task sleeps for `interval` and records how late it
+    wakes up into a histogram. A watchdog thread checks the heartbeat
+    every half `threshold`: once the loop is late by more than
+    `threshold`, it takes the event loop thread stack, which is
+    the stack of the blocking callback. The stall is logged with
+    the stack when the loop gets back. The cost is one wake-up per
+    interval on the loop and a sleeping thread.
+    """
+    def __init__(
+            self,
+            interval: float = 0.1,
+            threshold: float = 0.1,
+            max_stalls: int = 20
+    ) -> None:
+        self.interval = interval
+        self.threshold = threshold
+        self.histogram = [0] * (len(LAG_BUCKETS_MS) + 1)
+        self.max_lag_ms = 0.0
+        self.stalls = 0
+        self.recent_stalls: deque[dict[str, Any]] = deque(maxlen=max_stalls)
+        self._deadline = 0.0
+        self._stack: Optional[str] = None
+        self._thread_id: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stop = threading.Event()
+        self._watchdog = threading.Thread(
+            target=self._watch, name="loop-watchdog", daemon=True
+        )
+
+    @classmethod
+    def from_settings(cls, settings: LoopMonitorSettings) -> "LoopMonitor":
+        return cls(
+            settings.LOOP_MONITOR_INTERVAL,
+            settings.LOOP_MONITOR_THRESHOLD,
+            settings.LOOP_MONITOR_MAX_STALLS
+        )
+
+    def start(self) -> None:
+        """
+        Starts the heartbeat task and the watchdog thread.
+        Must be called from the event loop thread.
+        :return: None
+        """
+        self._thread_id = threading.get_ident()
+        self._deadline = time.monotonic() + self.interval
+        self._task = asyncio.create_task(self._run())
+        self._watchdog.start()
+
+    async def close(self) -> None:
+        self._stop.set()
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+        if self._watchdog.is_alive():
+            await asyncio.to_thread(self._watchdog.join)
+
+    async def _run(self) -> None:
+        while True:
+            self._deadline = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            self.record(time.monotonic() - self._deadline)
+
+    def record(self, lag: float) -> None:
+        """
+        Adds a heartbeat lag to the histogram, reports a stall
+        if it is above the threshold.
+        :param lag: Seconds the heartbeat woke up late.
+        :return: None
+        """
+        lag_ms = max(lag, 0.0) * 1000
+        self.histogram[bisect_left(LAG_BUCKETS_MS, lag_ms)] += 1
+        self.max_lag_ms = max(self.max_lag_ms, lag_ms)
+        stack, self._stack = self._stack, None
+        if lag < self.threshold:
+            return
+
+        self.stalls += 1
+        self.recent_stalls.append({
+            "at": datetime.now(timezone.utc).isoformat(),
+            "lag_ms": round(lag_ms, 1),
+            "stack": stack,
+        })
+        logger.warning(
+            f"Event loop blocked for {lag_ms:.0f} ms"
+            + (f", stack: {stack}" if stack else "")
+        )
+
+    def _watch(self) -> None:
+        while not self._stop.wait(self.threshold / 2):
+            deadline = self._deadline
+            if (
+                    self._stack is None
+                    and time.monotonic() - deadline > self.threshold
+            ):
+                stack = self._capture()
+                # The loop may have moved on while the stack was taken.
+                if deadline == self._deadline:
+                    self._stack = stack
+
+    def _capture(self) -> Optional[str]:
+        frame = sys._current_frames().get(self._thread_id)
+        frames = []
+        while frame is not None and len(frames) < MAX_STACK_DEPTH:
+            frames.append(frame_name(frame))
+            frame = frame.f_back
+        return ";".join(reversed(frames)) or None
+
+    def percentile(self, q: float) -> Optional[float]:
+        """
+        Estimates a lag percentile from the histogram.
+        :param q: Percentile, 0..1.
+        :return: Upper bound of the bucket in ms, None without samples.
+        """
+        total = sum(self.histogram)
+        if not total:
+            return None
+        seen = 0
+        for bound, count in zip((*LAG_BUCKETS_MS, None), self.histogram):
+            seen += count
+            if seen >= q * total:
+                return bound if bound is not None else self.max_lag_ms
+        return self.max_lag_ms
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "samples": sum(self.histogram),
+            "lag_p50_ms": self.percentile(0.5),
+            "lag_p99_ms": self.percentile(0.99),
+            "lag_max_ms": round(self.max_lag_ms, 1),
+            "histogram_ms": {
+                f"le_{bound}": count
+                for bound, count in zip(
+                    (*LAG_BUCKETS_MS, "inf"), self.histogram
+                )
+            },
+            "stalls": self.stalls,
+            "recent_stalls": list(self.recent_stalls),
+        }
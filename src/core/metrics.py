@@ -0,0 +1,51 @@
+from collections import defaultdict
+from typing import Any, Callable
+
+
+class MetricsRegistry:
+    """
+    In-process metrics storage.
+    Counters are incremented directly, collectors are called on snapshot
+    and return the current state of a component (cache, monitor, etc.).
+    """
+    def __init__(self) -> None:
+        self.counters: defaultdict[str, int] = defaultdict(int)
+        self.collectors: dict[str, Callable[[], dict[str, Any]]] = {}
+
+    def inc(self, name: str, value: int = 1) -> None:
+        """
+        Increments a counter.
+        :param name: Counter name.
+        :param value: Increment value.
+        :return: None
+        """
+        self.counters[name] += value
+
+    def register(
+            self,
+            name: str,
+            collector: Callable[[], dict[str, Any]]
+    ) -> None:
+        """
+        Registers a collector called on every snapshot.
+        :param name: Collector name, used as a snapshot key.
+        :param collector: Callable that returns the component state.
+        :return: None
+        """
+        self.collectors[name] = collector
+
+    def snapshot(self) -> dict[str, Any]:
+        """
+        Returns the current state of all counters and collectors.
+        :return: Metrics as a dict.
+        """
+        return {
+            "counters": dict(self.counters),
+            **{
+                name: collector()
+                for name, collector in self.collectors.items()
+            }
+        }
+
+
+metrics = MetricsRegistry()
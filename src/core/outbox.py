@@ -0,0 +1,184 @@
+import asyncio
+import random
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Any, Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from src.core.config import logger, OutboxSettings
+from src.core.exceptions import AppException
+from src.core.external_api import ExternalAPIClient
+from src.core.sharding import ShardSet
+from src.models.models import OutboxEvent
+from src.repositories.outbox_repository import OutboxRepository
+
+
+def utcnow() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+class OutboxDispatcher:
+    """
+    Delivers outbox events to webhook endpoints in the background.
+    Due events are claimed with a lease, grouped by endpoint and posted
+    as JSON arrays of up to OUTBOX_WEBHOOK_BATCH_SIZE events, with at
+    most OUTBOX_ENDPOINT_CONCURRENCY requests in flight per endpoint.
+    Failed batches are retried with exponential backoff and jitter
+    until OUTBOX_MAX_ATTEMPTS. Delivery is at least once: an event
+    can be posted again only if the process dies between the post
+    and marking it as sent, receivers dedupe by the event `id`.
+    With sharding, events are claimed from every writable shard
+    and marked in the shard their id belongs to.
+    """
+    def __init__(
+            self,
+            session_maker: async_sessionmaker[AsyncSession],
+            client: ExternalAPIClient,
+            settings: OutboxSettings,
+            shards: Optional[ShardSet] = None
+    ) -> None:
+        self.session_maker = session_maker
+        self.shards = shards
+        self.client = client
+        self.settings = settings
+        self._semaphores: defaultdict[str, asyncio.Semaphore] = defaultdict(
+            lambda: asyncio.Semaphore(settings.OUTBOX_ENDPOINT_CONCURRENCY)
+        )
+        self._task: Optional[asyncio.Task] = None
+        self._stats = {"batches": 0, "sent": 0, "retried": 0, "failed": 0}
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._run())
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                claimed = await self.dispatch_once()
+            except Exception as e:
+                logger.warning(f"Outbox dispatch failed: {e!r}")
+                claimed = 0
+            if claimed < self.settings.OUTBOX_BATCH_SIZE:
+                await asyncio.sleep(self.settings.OUTBOX_POLL_INTERVAL)
+
+    def _session_makers(self) -> list[async_sessionmaker[AsyncSession]]:
+        if self.shards is None:
+            return [self.session_maker]
+        return [
+            shard.session_maker for shard in self.shards.shards()
+            if not shard.read_only
+        ]
+
+    def _by_session_maker(
+            self,
+            ids: list[int]
+    ) -> list[tuple[async_sessionmaker[AsyncSession], list[int]]]:
+        if self.shards is None:
+            return [(self.session_maker, ids)]
+        groups: defaultdict[int, list[int]] = defaultdict(list)
+        for event_id in ids:
+            groups[self.shards.for_id(event_id).key].append(event_id)
+        return [
+            (self.shards.get(key).session_maker, group)
+            for key, group in groups.items()
+        ]
+
+    async def dispatch_once(self) -> int:
+        """
+        Claims due events and delivers them.
+        :return: Number of claimed events.
+        """
+        now = utcnow()
+        events = []
+        for session_maker in self._session_makers():
+            async with session_maker() as session:
+                events += await OutboxRepository(session).claim_due(
+                    now,
+                    self.settings.OUTBOX_BATCH_SIZE,
+                    now + timedelta(
+                        seconds=self.settings.OUTBOX_LEASE_SECONDS
+                    )
+                )
+
+        by_endpoint: defaultdict[str, list[OutboxEvent]] = defaultdict(list)
+        for event in events:
+            by_endpoint[event.endpoint].append(event)
+
+        size = self.settings.OUTBOX_WEBHOOK_BATCH_SIZE
+        results = await asyncio.gather(*(
+            self._deliver(endpoint, endpoint_events[i:i + size])
+            for endpoint, endpoint_events in by_endpoint.items()
+            for i in range(0, len(endpoint_events), size)
+        ), return_exceptions=True)
+        for result in results:
+            # Unmarked events are claimed again when their lease expires.
+            if isinstance(result, Exception):
+                logger.warning(f"Outbox batch was not marked: {result!r}")
+        return len(events)
+
+    def _backoff(self, attempts: int) -> timedelta:
+        delay = min(
+            self.settings.OUTBOX_BACKOFF_BASE * 2 ** attempts,
+            self.settings.OUTBOX_BACKOFF_MAX
+        )
+        return timedelta(seconds=delay * random.uniform(0.5, 1))
+
+    async def _deliver(
+            self,
+            endpoint: str,
+            events: list[OutboxEvent]
+    ) -> None:
+        ids = [event.id for event in events]
+        async with self._semaphores[endpoint]:
+            try:
+                await self.client.post(endpoint, json=[
+                    {
+                        "id": event.id,
+                        "type": event.event_type,
+                        "created_at": event.created_at.isoformat(),
+                        "data": event.payload,
+                    }
+                    for event in events
+                ])
+            except AppException as e:
+                await self._retry_later(endpoint, events, e)
+                return
+
+        self._stats["batches"] += 1
+        self._stats["sent"] += len(ids)
+        for session_maker, group in self._by_session_maker(ids):
+            async with session_maker() as session:
+                await OutboxRepository(session).mark_sent(group, utcnow())
+
+    async def _retry_later(
+            self,
+            endpoint: str,
+            events: list[OutboxEvent],
+            error: AppException
+    ) -> None:
+        attempts = max(event.attempts for event in events)
+        failed = 0
+        for session_maker, group in self._by_session_maker(
+                [event.id for event in events]
+        ):
+            async with session_maker() as session:
+                failed += await OutboxRepository(session).mark_failed(
+                    group,
+                    f"{error.message} {error.details or ''}".strip(),
+                    utcnow() + self._backoff(attempts),
+                    self.settings.OUTBOX_MAX_ATTEMPTS
+                )
+        self._stats["retried"] += len(events) - failed
+        self._stats["failed"] += failed
+        logger.warning(
+            f"Outbox delivery of {len(events)} events to {endpoint} "
+            f"failed, {failed} gave up: {error.message}"
+        )
+
+    def stats(self) -> dict[str, Any]:
+        return dict(self._stats)
@@ -0,0 +1,221 @@
+import math
+import re
+import time
+import zlib
+from collections import Counter
+from typing import Any, Optional
+
+from starlette.requests import Request
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from src.core.config import PreFilterSettings, get_prefilter_settings
+from src.core.exception_handler import app_exception_handler
+from src.core.exceptions import PayloadTooLarge
+from src.core.metrics import metrics
+
+# Built-in spam model: rule name, pattern, weight. A text is spam
+# when the weights of the distinct rules it matches add up
+# to PREFILTER_SPAM_THRESHOLD. Links, crypto and contact handles are
+# common in real payment complaints: together they stay under
+# the default threshold and reject only with a stronger rule.
+SPAM_RULES: tuple[tuple[str, str, float], ...] = (
+    ("link", r"https?://|\bwww\.", 0.25),
+    ("shortener", r"\b(?:bit\.ly|tinyurl\.com|goo\.gl|t\.me)/", 1.0),
+    (
+        "promo",
+        r"\b(?:buy now|click here|free money|limited offer|promo code"
+        r"|discount code|act now)\b",
+        1.0
+    ),
+    ("pharma", r"\b(?:viagra|cialis|xanax)\b", 1.0),
+    ("gambling", r"\b(?:casino|jackpot|betting)\b|казино|ставк[иа]", 0.7),
+    ("crypto", r"\b(?:crypto|bitcoin|btc|usdt|airdrop)\b", 0.25),
+    (
+        "earnings",
+        r"\b(?:earn|make)\s+\$?\d+|заработ\w*\s+от\s+\d+",
+        0.7
+    ),
+    ("contact", r"\b(?:whatsapp|telegram)\b|телеграм", 0.25),
+)
+# Texts shorter than this are not checked for entropy and repetition,
+# the measures are meaningless on a few characters.
+MIN_MEASURED_LENGTH = 20
+
+
+def char_entropy(text: str) -> float:
+    """
+    :param text: Text.
+    :return: Shannon entropy of the characters, bits per character.
+    """
+    length = len(text)
+    return -sum(
+        count / length * math.log2(count / length)
+        for count in Counter(text).values()
+    )
+
+
+def compression_ratio(text: str) -> float:
+    """
+    :param text: Text.
+    :return: Compressed to raw size ratio, low for repetitive texts.
+    """
+    raw = text.encode()
+    return len(zlib.compress(raw)) / len(raw)
+
+
+class PreFilter:
+    """
+    Cheap local checks of a complaint text before it is sent
+    to the paid enrichment APIs. Rules, in order:
+    `too_short` - fewer than PREFILTER_MIN_LETTERS letters,
+    `symbols` - less than PREFILTER_MIN_LETTER_SHARE of letters,
+    `low_entropy` - character entropy under PREFILTER_MIN_ENTROPY,
+    `repetition` - compresses below PREFILTER_MIN_COMPRESSION_RATIO,
+    `spam` - SPAM_RULES and PREFILTER_SPAM_PATTERNS score reaches
+    PREFILTER_SPAM_THRESHOLD. All patterns are compiled into one regex.
+    """
+    def __init__(self, settings: PreFilterSettings) -> None:
+        self.settings = settings
+        rules = list(SPAM_RULES) + [
+            ("custom", pattern, weight)
+            for pattern, weight in settings.PREFILTER_SPAM_PATTERNS.items()
+        ]
+        self.spam_rules = [name for name, _, _ in rules]
+        self.weights = [weight for _, _, weight in rules]
+        self.spam_re = re.compile(
+            "|".join(
+                f"(?P<r{index}>{pattern})"
+                for index, (_, pattern, _) in enumerate(rules)
+            ),
+            re.IGNORECASE
+        )
+        self.checked = 0
+        self.check_ns = 0
+        self.hits: Counter[str] = Counter()
+
+    def spam_score(self, text: str) -> tuple[float, list[str]]:
+        """
+        :param text: Complaint text.
+        :return: Spam score and the names of the matched rules.
+        """
+        matched = {
+            int(match.lastgroup[1:])
+            for match in self.spam_re.finditer(text)
+        }
+        return (
+            sum(self.weights[index] for index in matched),
+            [self.spam_rules[index] for index in sorted(matched)]
+        )
+
+    def _rule(self, text: str) -> Optional[str]:
+        settings = self.settings
+        letters = sum(char.isalpha() for char in text)
+        if letters < settings.PREFILTER_MIN_LETTERS:
+            return "too_short"
+
+        compact = "".join(text.split())
+        if len(compact) >= MIN_MEASURED_LENGTH:
+            if letters / len(compact) < settings.PREFILTER_MIN_LETTER_SHARE:
+                return "symbols"
+            if char_entropy(compact.lower()) < settings.PREFILTER_MIN_ENTROPY:
+                return "low_entropy"
+            if (
+                    compression_ratio(text)
+                    < settings.PREFILTER_MIN_COMPRESSION_RATIO
+            ):
+                return "repetition"
+
+        score, matched = self.spam_score(text)
+        if score >= settings.PREFILTER_SPAM_THRESHOLD:
+            self.hits.update(f"spam.{name}" for name in matched)
+            return "spam"
+        return None
+
+    def check(self, text: str) -> Optional[str]:
+        """
+        Checks a complaint text.
+        :param text: Complaint text.
+        :return: Name of the rule that rejects the text, None if it passes.
+        """
+        started = time.perf_counter_ns()
+        rule = self._rule(text)
+        self.check_ns += time.perf_counter_ns() - started
+        self.checked += 1
+        if rule is not None:
+            self.hits[rule] += 1
+        return rule
+
+    def stats(self) -> dict[str, Any]:
+        rejected = sum(
+            count for rule, count in self.hits.items()
+            if not rule.startswith("spam.")
+        )
+        return {
+            "checked": self.checked,
+            "rejected": rejected,
+            "rules": dict(self.hits),
+            "check_us_avg": round(
+                self.check_ns / max(self.checked, 1) / 1000, 2
+            ),
+        }
+
+
+class BodyLimitMiddleware:
+    """
+    Rejects bodies of PREFILTER_BODY_LIMIT_PATHS over
+    PREFILTER_MAX_BODY_BYTES with 413 before they are parsed:
+    by Content-Length, or, for a chunked body, as soon as the received
+    bytes pass the limit. An accepted body is replayed to the app.
+    """
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+        settings = get_prefilter_settings()
+        self.max_bytes = settings.PREFILTER_MAX_BODY_BYTES
+        self.paths = {
+            path.strip()
+            for path in settings.PREFILTER_BODY_LIMIT_PATHS.split(",")
+            if path.strip()
+        }
+
+    async def __call__(
+            self, scope: Scope, receive: Receive, send: Send
+    ) -> None:
+        if scope["type"] != "http" or scope["path"] not in self.paths:
+            await self.app(scope, receive, send)
+            return
+
+        length = dict(scope["headers"]).get(b"content-length", b"")
+        if length.isdigit() and int(length) > self.max_bytes:
+            await self._reject(scope, receive, send)
+            return
+
+        messages: list[Message] = []
+        size = 0
+        while True:
+            message = await receive()
+            messages.append(message)
+            if message["type"] != "http.request":
+                break
+            size += len(message.get("body", b""))
+            if size > self.max_bytes:
+                await self._reject(scope, receive, send)
+                return
+            if not message.get("more_body", False):
+                break
+
+        async def replay() -> Message:
+            if messages:
+                return messages.pop(0)
+            return await receive()
+
+        await self.app(scope, replay, send)
+
+    async def _reject(
+            self, scope: Scope, receive: Receive, send: Send
+    ) -> None:
+        metrics.inc("prefilter_body_too_large")
+        response = await app_exception_handler(
+            Request(scope),
+            PayloadTooLarge(details=f"Limit: {self.max_bytes} bytes")
+        )
+        await response(scope, receive, send)
@@ -0,0 +1,206 @@
+import asyncio
+import hmac
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from pathlib import Path
+from types import FrameType
+from typing import Any, Optional
+
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from src.core.config import logger, get_admin_settings, get_profiler_settings
+
+
+PROFILE_SUFFIX = ".folded"
+
+
+def frame_name(frame: FrameType) -> str:
+    """
+    :param frame: Stack frame.
+    :return: Frame name in folded stacks, `qualname (file:line)`.
+    """
+    code = frame.f_code
+    return f"{code.co_qualname} ({code.co_filename}:{frame.f_lineno})"
+
+
+def _await_chain(coro: Any) -> list[FrameType]:
+    """Frames of a suspended coroutine and everything it awaits."""
+    frames = []
+    while coro is not None:
+        frame = getattr(coro, "cr_frame", None) or getattr(
+            coro, "gi_frame", None
+        ) or getattr(coro, "ag_frame", None)
+        if frame is None:
+            break
+        frames.append(frame)
+        coro = getattr(coro, "cr_await", None) or getattr(
+            coro, "gi_yieldfrom", None
+        ) or getattr(coro, "ag_await", None)
+    return frames
+
+
+class TaskSampler:
+    """
+    Sampling profiler for one asyncio task.
+    A daemon thread wakes up every `interval` seconds. If the task is
+    running, it records the event loop thread stack from the task
+    coroutine down. If the task is suspended, it records the await chain
+    with an `[await]` leaf, so time spent waiting on upstreams and the
+    database shows up in the profile too.
+    """
+    def __init__(self, task: asyncio.Task, interval: float) -> None:
+        self.task = task
+        self.interval = interval
+        self.samples: Counter[str] = Counter()
+        self._thread_id = threading.get_ident()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name="task-sampler", daemon=True
+        )
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> Counter[str]:
+        self._stop.set()
+        self._thread.join()
+        return self.samples
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self._sample()
+            except Exception:
+                # The task state may change under our feet, skip sample.
+                continue
+
+    def _sample(self) -> None:
+        coro = self.task.get_coro()
+        root = getattr(coro, "cr_frame", None)
+        if root is None:
+            return
+
+        if coro.cr_running:
+            frames = []
+            frame = sys._current_frames().get(self._thread_id)
+            while frame is not None:
+                frames.append(frame)
+                if frame is root:
+                    break
+                frame = frame.f_back
+            frames.reverse()
+            leaf = []
+        else:
+            frames = _await_chain(coro)
+            leaf = ["[await]"]
+
+        self.samples[";".join([*map(frame_name, frames), *leaf])] += 1
+
+
+class ProfilerMiddleware:
+    """
+    Profiles selected requests with TaskSampler.
+    A request is profiled when it carries `X-Profile: 1` together with
+    a valid `X-Admin-Token`, or randomly with PROFILE_SAMPLE_RATE.
+    Profiles are stored in PROFILE_DIR in folded stack format
+    (flamegraph.pl, speedscope), only the newest PROFILE_RETENTION
+    files are kept.
+    Must be added inside `http` middlewares, they run the app
+    in a separate task.
+    """
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+        self.settings = get_profiler_settings()
+        self.admin_token = get_admin_settings().ADMIN_TOKEN
+
+    def _is_selected(self, scope: Scope) -> bool:
+        headers = dict(scope["headers"])
+        if headers.get(b"x-profile") == b"1" and self.admin_token:
+            token = headers.get(b"x-admin-token", b"")
+            if hmac.compare_digest(token, self.admin_token.encode()):
+                return True
+        return random.random() < self.settings.PROFILE_SAMPLE_RATE
+
+    async def __call__(
+            self, scope: Scope, receive: Receive, send: Send
+    ) -> None:
+        if scope["type"] != "http" or not self._is_selected(scope):
+            await self.app(scope, receive, send)
+            return
+
+        sampler = TaskSampler(
+            asyncio.current_task(),
+            self.settings.PROFILE_INTERVAL_MS / 1000
+        )
+        started = time.perf_counter()
+        sampler.start()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            samples = sampler.stop()
+            duration_ms = (time.perf_counter() - started) * 1000
+            await asyncio.to_thread(
+                self._save, scope, samples, duration_ms
+            )
+
+    def _save(
+            self,
+            scope: Scope,
+            samples: Counter[str],
+            duration_ms: float
+    ) -> None:
+        directory = Path(self.settings.PROFILE_DIR)
+        directory.mkdir(parents=True, exist_ok=True)
+        slug = re.sub(r"[^A-Za-z0-9]+", "_", scope["path"]).strip("_")
+        name = (
+            f"{datetime.now(timezone.utc):%Y%m%dT%H%M%S%f}_"
+            f"{scope['method']}_{slug}_{duration_ms:.0f}ms{PROFILE_SUFFIX}"
+        )
+        (directory / name).write_text(
+            "".join(f"{stack} {count}\n" for stack, count in samples.items()),
+            encoding="utf-8"
+        )
+        logger.info(f"Request profile saved: {name}")
+
+        profiles = list_profiles()
+        for profile in profiles[self.settings.PROFILE_RETENTION:]:
+            (directory / profile["name"]).unlink(missing_ok=True)
+
+
+def list_profiles() -> list[dict[str, Any]]:
+    """
+    Lists stored profiles, newest first.
+    :return: Profile names, sizes and creation times.
+    """
+    directory = Path(get_profiler_settings().PROFILE_DIR)
+    if not directory.is_dir():
+        return []
+    profiles = [
+        {
+            "name": path.name,
+            "size": stat.st_size,
+            "created": datetime.fromtimestamp(
+                stat.st_mtime, timezone.utc
+            ).isoformat(),
+        }
+        for path in directory.glob(f"*{PROFILE_SUFFIX}")
+        if (stat := path.stat())
+    ]
+    return sorted(profiles, key=lambda item: item["name"], reverse=True)
+
+
+def get_profile_path(name: str) -> Optional[Path]:
+    """
+    Resolves a stored profile by name.
+    :param name: Profile file name.
+    :return: Profile path if exists, None otherwise.
+    """
+    path = Path(get_profiler_settings().PROFILE_DIR) / name
+    if Path(name).name != name or not name.endswith(PROFILE_SUFFIX):
+        return None
+    return path if path.is_file() else None
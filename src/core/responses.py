@@ -0,0 +1,13 @@
+from typing import Any
+
+from fastapi.responses import JSONResponse
+from pydantic_core import to_json
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSON response rendered by pydantic-core serializer.
+    Content is not validated, use it only for trusted data.
+    """
+    def render(self, content: Any) -> bytes:
+        return to_json(content)
@@ -0,0 +1,292 @@
+import asyncio
+import re
+import sqlite3
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Optional
+
+from sqlalchemy import MetaData, select, func, text
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine, AsyncSession, async_sessionmaker
+)
+
+from src.core.config import logger, DbSettings
+from src.core.database import create_engine, create_session_maker
+from src.core.exceptions import ConflictException, NotFoundException
+from src.models.enums import OutboxStatus
+from src.models.models import Complaint, ArchivedComplaint, OutboxEvent
+
+# Global ids are `shard key << SHARD_ID_BITS | local id`, so the shard
+# of an id is known without a lookup and ids grow with time.
+SHARD_ID_BITS = 32
+LEGACY_KEY = 0
+SEALED_VERSION = 1
+PERIOD_FORMATS = {"month": "%Y-%m", "year": "%Y"}
+PERIOD_PATTERNS = {"month": r"\d{4}-\d{2}", "year": r"\d{4}"}
+
+
+def _shard_metadata() -> MetaData:
+    """
+    Shard schema: complaint tables and the outbox, with AUTOINCREMENT
+    so ids are never reused and continue from the shard base id.
+    """
+    metadata = MetaData()
+    for table in (Complaint, ArchivedComplaint, OutboxEvent):
+        copy = table.__table__.to_metadata(metadata)
+        if table is not ArchivedComplaint:
+            copy.dialect_kwargs["sqlite_autoincrement"] = True
+    return metadata
+
+
+SHARD_METADATA = _shard_metadata()
+
+
+def utcnow() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def shard_key(label: str) -> int:
+    """
+    :param label: Period label, `2025-10` or `2025`.
+    :return: Shard key, `202510` or `2025`.
+    """
+    return int(label.replace("-", ""))
+
+
+class Shard:
+    """
+    One SQLite file with the complaints created in one time period.
+    The legacy shard is the main database with pre-sharding rows.
+    """
+    def __init__(
+            self,
+            key: int,
+            label: str,
+            engine: AsyncEngine,
+            path: Optional[Path] = None,
+            read_only: bool = False
+    ) -> None:
+        self.key = key
+        self.label = label
+        self.engine = engine
+        self.session_maker: async_sessionmaker[AsyncSession] = (
+            create_session_maker(engine)
+        )
+        self.path = path
+        self.read_only = read_only
+
+    @property
+    def base_id(self) -> int:
+        return self.key << SHARD_ID_BITS
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "key": self.key,
+            "label": self.label,
+            "path": str(self.path) if self.path else None,
+            "size_bytes": (
+                self.path.stat().st_size
+                if self.path and self.path.exists() else None
+            ),
+            "read_only": self.read_only,
+        }
+
+
+class ShardSet:
+    """
+    Time-sharded complaint storage: one SQLite file per period
+    (`complaints_2025-10.sqlite`), each with its own engine and writer
+    lock. New complaints go to the shard of the current period, which
+    is created on first use. Shards of past periods can be sealed:
+    vacuumed and reopened read-only.
+    """
+    def __init__(
+            self,
+            directory: Path,
+            period: str = "month",
+            legacy_engine: Optional[AsyncEngine] = None
+    ) -> None:
+        self.directory = directory
+        self.period = period
+        self._shards: dict[int, Shard] = {}
+        if legacy_engine is not None:
+            self._shards[LEGACY_KEY] = Shard(
+                LEGACY_KEY, "legacy", legacy_engine
+            )
+        self._lock = asyncio.Lock()
+
+    def _path(self, label: str) -> Path:
+        return self.directory / f"complaints_{label}.sqlite"
+
+    @staticmethod
+    def _engine(path: Path, read_only: bool) -> AsyncEngine:
+        if read_only:
+            url = f"sqlite+aiosqlite:///file:{path}?mode=ro&uri=true"
+        else:
+            url = f"sqlite+aiosqlite:///{path}"
+        return create_engine(DbSettings(
+            DB_URL=url, DB_URL_SYNC=url.replace("+aiosqlite", "")
+        ))
+
+    async def open(self) -> None:
+        """
+        Opens the existing shard files of the configured period.
+        :return: None
+        """
+        self.directory.mkdir(parents=True, exist_ok=True)
+        pattern = re.compile(
+            rf"complaints_({PERIOD_PATTERNS[self.period]})\.sqlite"
+        )
+        for path in sorted(self.directory.iterdir()):
+            match = pattern.fullmatch(path.name)
+            if match is None:
+                continue
+            label = match.group(1)
+            sealed = await asyncio.to_thread(self._user_version, path)
+            self._shards[shard_key(label)] = Shard(
+                shard_key(label), label,
+                self._engine(path, sealed == SEALED_VERSION),
+                path, sealed == SEALED_VERSION
+            )
+
+    @staticmethod
+    def _user_version(path: Path) -> int:
+        with sqlite3.connect(f"file:{path}?mode=ro", uri=True) as connection:
+            return connection.execute("PRAGMA user_version").fetchone()[0]
+
+    async def close(self) -> None:
+        for shard in self._shards.values():
+            if shard.key != LEGACY_KEY:
+                await shard.engine.dispose()
+
+    def shards(self) -> list[Shard]:
+        """
+        :return: All shards, oldest first, the legacy one first of all.
+        """
+        return [self._shards[key] for key in sorted(self._shards)]
+
+    def get(self, key: int) -> Optional[Shard]:
+        return self._shards.get(key)
+
+    def for_id(self, complaint_id: int) -> Optional[Shard]:
+        return self._shards.get(complaint_id >> SHARD_ID_BITS)
+
+    def key_of(self, value: datetime) -> int:
+        """
+        :param value: Datetime, naive values are UTC.
+        :return: Key of the period the datetime falls into.
+        """
+        if value.tzinfo is not None:
+            value = value.astimezone(timezone.utc)
+        return shard_key(value.strftime(PERIOD_FORMATS[self.period]))
+
+    def in_range(
+            self,
+            start: Optional[datetime] = None,
+            end: Optional[datetime] = None
+    ) -> list[Shard]:
+        """
+        Prunes shards by period. The legacy shard has no period
+        and always matches.
+        :param start: Range start, None for unbounded.
+        :param end: Range end, None for unbounded.
+        :return: Matching shards, oldest first.
+        """
+        low = self.key_of(start) if start else None
+        high = self.key_of(end) if end else None
+        return [
+            shard for shard in self.shards()
+            if shard.key == LEGACY_KEY or (
+                (low is None or shard.key >= low)
+                and (high is None or shard.key <= high)
+            )
+        ]
+
+    async def current(self) -> Shard:
+        """
+        Shard of the current period, created on first use.
+        :return: Shard object.
+        """
+        label = utcnow().strftime(PERIOD_FORMATS[self.period])
+        if (shard := self._shards.get(shard_key(label))) is not None:
+            return shard
+        async with self._lock:
+            if (shard := self._shards.get(shard_key(label))) is None:
+                shard = await self._create(label)
+                self._shards[shard.key] = shard
+        return shard
+
+    async def _create(self, label: str) -> Shard:
+        key = shard_key(label)
+        path = self._path(label)
+        engine = self._engine(path, read_only=False)
+        async with engine.begin() as connection:
+            await connection.run_sync(SHARD_METADATA.create_all)
+            # Seeds AUTOINCREMENT, unless the file existed already.
+            for table in ("complaint", "outbox_event"):
+                await connection.execute(
+                    text(
+                        "INSERT INTO sqlite_sequence (name, seq) "
+                        "SELECT :name, :seq WHERE NOT EXISTS ("
+                        "SELECT 1 FROM sqlite_sequence WHERE name = :name)"
+                    ),
+                    {"name": table, "seq": key << SHARD_ID_BITS}
+                )
+        logger.info(f"Created complaint shard {path}")
+        return Shard(key, label, engine, path)
+
+    async def seal(self, key: int) -> Shard:
+        """
+        Vacuums a past shard and reopens it read-only.
+        :param key: Shard key.
+        :raises NotFoundException: No such shard.
+        :raises ConflictException: Shard is current, legacy, sealed
+            or has undelivered outbox events.
+        :return: Sealed Shard object.
+        """
+        shard = self._shards.get(key)
+        if shard is None:
+            raise NotFoundException(details=f"Shard {key} not found")
+        if shard.key == LEGACY_KEY or shard.read_only:
+            raise ConflictException(details=f"Shard {key} can't be sealed")
+        if shard.key >= self.key_of(utcnow()):
+            raise ConflictException(
+                details=f"Shard {key} still receives new complaints"
+            )
+
+        async with shard.session_maker() as session:
+            pending = await session.scalar(
+                select(func.count())
+                .select_from(OutboxEvent)
+                .where(OutboxEvent.status == OutboxStatus.PENDING)
+            )
+        if pending:
+            raise ConflictException(
+                details=f"Shard {key} has {pending} undelivered outbox events"
+            )
+
+        async with shard.engine.connect() as connection:
+            connection = await connection.execution_options(
+                isolation_level="AUTOCOMMIT"
+            )
+            await connection.exec_driver_sql("VACUUM")
+            await connection.exec_driver_sql(
+                f"PRAGMA user_version = {SEALED_VERSION}"
+            )
+        await shard.engine.dispose()
+
+        sealed = Shard(
+            shard.key, shard.label,
+            self._engine(shard.path, read_only=True),
+            shard.path, read_only=True
+        )
+        self._shards[key] = sealed
+        logger.info(f"Sealed complaint shard {shard.path}")
+        return sealed
+
+    def stats(self) -> list[dict[str, Any]]:
+        """
+        Returns shard descriptions, oldest first.
+        :return: List of shard stats.
+        """
+        return [shard.stats() for shard in self.shards()]
@@ -0,0 +1,452 @@
+import array
+import asyncio
+import hashlib
+import heapq
+import math
+import mmap
+import os
+import re
+import struct
+from collections import Counter
+from functools import lru_cache
+from itertools import islice
+from pathlib import Path
+from typing import Any, Optional
+
+from src.core.config import logger
+from src.repositories.sharded_complaint_repository import RepositoryScope
+
+TOKEN_RE = re.compile(r"\w+")
+
+SIGNATURE_BITS = 64
+# Hash tables keyed by overlapping 12-bit windows of the signature.
+TABLES = 8
+TABLE_STEP = SIGNATURE_BITS // TABLES
+KEY_BITS = 12
+KEY_MASK = (1 << KEY_BITS) - 1
+# Per-bit weight sums are packed into 16-bit lanes of one integer.
+LANE_BITS = 16
+MAX_WEIGHT = 15
+MAX_TERMS = 1024
+
+FILE_MAGIC = b"DVSIM001"
+# magic, hashed features, indexed documents, signatures
+FILE_HEADER = struct.Struct("<8sIQQ")
+
+
+def tokenize(text: str) -> list[str]:
+    """
+    Splits a text into lowercase words.
+    :param text: Complaint text.
+    :return: List of terms.
+    """
+    words = TOKEN_RE.findall(text.lower())
+    return words
+
+
+@lru_cache(maxsize=65536)
+def _term_hash(term: str) -> tuple[int, int]:
+    """
+    Stable 64-bit hash of a term and the same bits spread
+    into LANE_BITS-wide lanes, one lane per signature bit.
+    """
+    value = int.from_bytes(
+        hashlib.blake2b(term.encode(), digest_size=8).digest(), "little"
+    )
+    spread = 0
+    for bit in range(SIGNATURE_BITS):
+        if value >> bit & 1:
+            spread |= 1 << bit * LANE_BITS
+    return value, spread
+
+
+class SimilarityIndex:
+    """
+    Approximate nearest-neighbour index of complaint texts.
+    Terms are hashed into `features` TF-IDF buckets and every text is
+    reduced to a 64-bit SimHash of its weighted terms, so cosine
+    similarity is estimated from the Hamming distance. Small indexes
+    are scanned in full. Larger ones look candidates up in hash tables
+    keyed by overlapping windows of the signature, probing keys one
+    bit away too, and rank at most `max_candidates` of them per query.
+    Document frequencies keep growing as complaints are added, older
+    signatures are not recomputed.
+    """
+    def __init__(
+            self,
+            features: int = 2 ** 18,
+            max_candidates: int = 5000
+    ) -> None:
+        self.features = features
+        self.max_candidates = max_candidates
+        self.df = array.array("I", bytes(4 * features))
+        self.documents = 0
+        # Append-only, the position of a complaint is its insertion
+        # order, so an out-of-order id never shifts the hash tables.
+        self.ids = array.array("q")
+        self.signatures = array.array("Q")
+        self.positions: dict[int, int] = {}
+        self._last_id = 0
+        self._tables: list[dict[int, array.array]] = [
+            {} for _ in range(TABLES)
+        ]
+        # Complaints added while the index catches up with the database.
+        self._pending: Optional[dict[int, str]] = None
+        self._task: Optional[asyncio.Task] = None
+        self.dirty = False
+        # Inserts so far, to tell if the index changed during a save.
+        self.changes = 0
+
+        self.queries: int = 0
+        self.candidates: int = 0
+        self.truncated: int = 0
+
+    @property
+    def last_id(self) -> int:
+        return self._last_id
+
+    def _position(self, complaint_id: int) -> Optional[int]:
+        return self.positions.get(complaint_id)
+
+    def _signature(self, terms: Counter[str]) -> int:
+        idf_base = self.documents + 1
+        total = 0
+        lanes = 0
+        for term, tf in islice(terms.items(), MAX_TERMS):
+            value, spread = _term_hash(term)
+            df = self.df[value % self.features]
+            weight = (1 + math.log(tf)) * math.log(idf_base / (df + 1)) + 1
+            weight = min(MAX_WEIGHT, max(1, round(weight)))
+            lanes += weight * spread
+            total += weight
+        sums = array.array("H")
+        sums.frombytes(
+            lanes.to_bytes(SIGNATURE_BITS * LANE_BITS // 8, "little")
+        )
+        signature = 0
+        for bit, value in enumerate(sums):
+            if 2 * value > total:
+                signature |= 1 << bit
+        return signature
+
+    def text_signature(self, text: str) -> int:
+        """
+        Signature of a text with the current document frequencies.
+        :param text: Any text.
+        :return: 64-bit signature.
+        """
+        return self._signature(Counter(tokenize(text)))
+
+    def signature_of(self, complaint_id: int) -> Optional[int]:
+        """
+        :param complaint_id: Complaint id.
+        :return: Stored signature, None if the complaint is not indexed.
+        """
+        position = self._position(complaint_id)
+        return None if position is None else self.signatures[position]
+
+    @staticmethod
+    def _keys(signature: int) -> list[int]:
+        rotated = signature | signature << SIGNATURE_BITS
+        return [
+            rotated >> table * TABLE_STEP & KEY_MASK
+            for table in range(TABLES)
+        ]
+
+    def _add_to_tables(self, position: int, signature: int) -> None:
+        for table, key in zip(self._tables, self._keys(signature)):
+            bucket = table.get(key)
+            if bucket is None:
+                table[key] = array.array("I", (position,))
+            else:
+                bucket.append(position)
+
+    def _rebuild_tables(self) -> None:
+        self._tables = [{} for _ in range(TABLES)]
+        for position, signature in enumerate(self.signatures):
+            self._add_to_tables(position, signature)
+
+    def _insert(self, complaint_id: int, text: str) -> None:
+        terms = Counter(tokenize(text))
+        position = self._position(complaint_id)
+        if position is None:
+            for term in terms:
+                self.df[_term_hash(term)[0] % self.features] += 1
+            self.documents += 1
+        signature = self._signature(terms)
+        self.dirty = True
+        self.changes += 1
+
+        if position is not None:
+            # Stale table entries only cost a candidate check.
+            self.signatures[position] = signature
+            self._add_to_tables(position, signature)
+        else:
+            position = len(self.ids)
+            self.ids.append(complaint_id)
+            self.signatures.append(signature)
+            self.positions[complaint_id] = position
+            self._last_id = max(self._last_id, complaint_id)
+            self._add_to_tables(position, signature)
+
+    def add(self, complaint_id: int, text: str) -> None:
+        """
+        Indexes a new complaint or reindexes a changed text.
+        :param complaint_id: Complaint id.
+        :param text: Complaint text.
+        :return: None
+        """
+        if self._pending is not None:
+            self._pending[complaint_id] = text
+            return
+        self._insert(complaint_id, text)
+
+    def search(
+            self,
+            signature: int,
+            k: int,
+            exclude: Optional[int] = None
+    ) -> list[tuple[int, float]]:
+        """
+        Finds complaints with the closest signatures.
+        :param signature: Query signature.
+        :param k: Max number of results.
+        :param exclude: Complaint id to leave out, e.g. the query itself.
+        :return: List of (complaint id, estimated cosine similarity),
+            most similar first.
+        """
+        if len(self.ids) <= self.max_candidates:
+            candidates = range(len(self.ids))
+        else:
+            candidates = self._candidates(signature)
+
+        self.queries += 1
+        self.candidates += len(candidates)
+
+        # (distance, position) pairs, computed without Python frames.
+        nearest = heapq.nsmallest(k + 1, zip(
+            map(int.bit_count, map(
+                signature.__xor__, map(self.signatures.__getitem__, candidates)
+            )),
+            candidates
+        ))
+        results = []
+        for distance, position in nearest:
+            complaint_id = self.ids[position]
+            if complaint_id == exclude:
+                continue
+            results.append((
+                complaint_id,
+                round(math.cos(math.pi * distance / SIGNATURE_BITS), 4)
+            ))
+        return results[:k]
+
+    def _candidates(self, signature: int) -> set[int]:
+        keys = self._keys(signature)
+        probes = [
+            (table, key) for table, key in zip(self._tables, keys)
+        ] + [
+            (table, key ^ 1 << bit)
+            for table, key in zip(self._tables, keys)
+            for bit in range(KEY_BITS)
+        ]
+        candidates: set[int] = set()
+        for table, key in probes:
+            bucket = table.get(key)
+            if bucket is None:
+                continue
+            room = self.max_candidates - len(candidates)
+            if len(bucket) >= room:
+                candidates.update(bucket[:room])
+                self.truncated += 1
+                break
+            candidates.update(bucket)
+        return candidates
+
+    async def catch_up(
+            self,
+            repository_scope: RepositoryScope,
+            batch_size: int = 5000,
+            chunk_size: int = 500
+    ) -> int:
+        """
+        Indexes complaints with ids above the last indexed one,
+        hot and archived. Complaints added meanwhile are queued
+        and indexed at the end.
+        :param repository_scope: Factory of short-lived repositories.
+        :param batch_size: Rows per query.
+        :param chunk_size: Rows indexed between event loop yields.
+        :return: Number of indexed complaints.
+        """
+        self._pending = {}
+        indexed = 0
+        try:
+            while True:
+                async with repository_scope() as repository:
+                    rows = await repository.get_complaint_texts(
+                        self.last_id, batch_size
+                    )
+                for start in range(0, len(rows), chunk_size):
+                    for complaint_id, text in rows[start:start + chunk_size]:
+                        self._insert(complaint_id, text)
+                    await asyncio.sleep(0)
+                indexed += len(rows)
+                if len(rows) < batch_size:
+                    break
+        finally:
+            pending, self._pending = self._pending, None
+            for complaint_id in sorted(pending):
+                self._insert(complaint_id, pending[complaint_id])
+        return indexed
+
+    def start(
+            self,
+            repository_scope: RepositoryScope,
+            path: Path,
+            save_interval: float
+    ) -> None:
+        """
+        Starts catching up with the database in the background,
+        then saves the index every `save_interval` seconds
+        while it has changes.
+        :param repository_scope: Factory of short-lived repositories.
+        :param path: Index file path.
+        :param save_interval: Seconds between saves.
+        :return: None
+        """
+        self._task = asyncio.create_task(
+            self._run(repository_scope, path, save_interval)
+        )
+
+    async def close(self, path: Path) -> None:
+        """
+        Stops the background task and saves unsaved changes.
+        :param path: Index file path.
+        :return: None
+        """
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+        if self.dirty:
+            await self.save(path)
+
+    async def _run(
+            self,
+            repository_scope: RepositoryScope,
+            path: Path,
+            save_interval: float
+    ) -> None:
+        try:
+            indexed = await self.catch_up(repository_scope)
+            logger.info(f"Similarity index caught up: {indexed} complaints")
+        except Exception as e:
+            logger.warning(f"Similarity index catch-up failed: {e!r}")
+        while True:
+            if self.dirty:
+                try:
+                    await self.save(path)
+                except OSError as e:
+                    logger.warning(f"Similarity index save failed: {e!r}")
+            await asyncio.sleep(save_interval)
+
+    def _dump(self) -> bytes:
+        return b"".join((
+            FILE_HEADER.pack(
+                FILE_MAGIC, self.features, self.documents, len(self.ids)
+            ),
+            self.df.tobytes(),
+            self.ids.tobytes(),
+            self.signatures.tobytes(),
+        ))
+
+    async def save(self, path: Path) -> None:
+        """
+        Writes the index to a file, atomically.
+        The snapshot is taken on the event loop, the write runs
+        in a thread. The index stays dirty if the write fails
+        or it changed after the snapshot.
+        :param path: Index file path.
+        :return: None
+        """
+        changes = self.changes
+        data = self._dump()
+
+        def write() -> None:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            temporary = path.with_name(path.name + ".tmp")
+            temporary.write_bytes(data)
+            os.replace(temporary, path)
+
+        await asyncio.to_thread(write)
+        if self.changes == changes:
+            self.dirty = False
+
+    @classmethod
+    def load(
+            cls,
+            path: Path,
+            features: int = 2 ** 18,
+            max_candidates: int = 5000
+    ) -> "SimilarityIndex":
+        """
+        Reads an index file through a memory map. A missing, corrupt
+        or differently configured file gives an empty index.
+        :param path: Index file path.
+        :param features: Hashed TF-IDF features.
+        :param max_candidates: Max candidates ranked per query.
+        :return: SimilarityIndex object.
+        """
+        index = cls(features, max_candidates)
+        if not path.exists() or path.stat().st_size < FILE_HEADER.size:
+            return index
+
+        with open(path, "rb") as file, mmap.mmap(
+                file.fileno(), 0, access=mmap.ACCESS_READ
+        ) as data:
+            magic, file_features, documents, count = FILE_HEADER.unpack_from(
+                data
+            )
+            size = FILE_HEADER.size + 4 * file_features + 16 * count
+            if (
+                    magic != FILE_MAGIC
+                    or file_features != features
+                    or len(data) != size
+            ):
+                logger.warning(f"Similarity index {path} is ignored")
+                return index
+
+            offset = FILE_HEADER.size
+            df = array.array("I")
+            df.frombytes(data[offset:offset + 4 * features])
+            offset += 4 * features
+            ids = array.array("q")
+            ids.frombytes(data[offset:offset + 8 * count])
+            offset += 8 * count
+            signatures = array.array("Q")
+            signatures.frombytes(data[offset:offset + 8 * count])
+
+        index.df, index.ids, index.signatures = df, ids, signatures
+        index.documents = documents
+        index.positions = {
+            complaint_id: position for position, complaint_id in enumerate(ids)
+        }
+        index._last_id = max(ids, default=0)
+        index._rebuild_tables()
+        return index
+
+    def stats(self) -> dict[str, Any]:
+        """
+        Returns index size and query counters.
+        :return: Index stats as a dict.
+        """
+        return {
+            "size": len(self.ids),
+            "documents": self.documents,
+            "catching_up": self._pending is not None,
+            "queries": self.queries,
+            "avg_candidates": (
+                round(self.candidates / self.queries, 1)
+                if self.queries else 0
+            ),
+            "truncated": self.truncated,
+        }
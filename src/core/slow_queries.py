@@ -0,0 +1,256 @@
+import asyncio
+import contextvars
+import hashlib
+import re
+from datetime import datetime, timezone
+from typing import Any
+
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from src.core.config import logger
+
+LITERAL_RE = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+IN_LIST_RE = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+SPACE_RE = re.compile(r"\s+")
+EXPLAINABLE = ("SELECT", "INSERT", "UPDATE", "DELETE", "WITH")
+# Distinct parameter shapes kept per statement.
+MAX_SHAPES = 5
+# Raw statements whose fingerprints are cached.
+MAX_CACHED_STATEMENTS = 2048
+
+
+def normalize_sql(statement: str) -> str:
+    """
+    :param statement: SQL statement.
+    :return: Statement with literals replaced by `?`, `IN` lists
+        of any length collapsed to `(?+)` and spacing normalized.
+    """
+    normalized = LITERAL_RE.sub("?", statement)
+    normalized = IN_LIST_RE.sub("(?+)", normalized)
+    return SPACE_RE.sub(" ", normalized).strip()
+
+
+def parameter_shape(parameters: Any, executemany: bool = False) -> str:
+    """
+    :param parameters: Bound parameters of a statement.
+    :param executemany: Parameters are a sequence of parameter sets.
+    :return: Types of the parameters, e.g. `(int, str, NoneType)`,
+        prefixed with the number of sets for executemany.
+    """
+    if executemany:
+        rows = list(parameters)
+        first = parameter_shape(rows[0]) if rows else "()"
+        return f"{len(rows)} x {first}"
+    if isinstance(parameters, dict):
+        return "(" + ", ".join(
+            f"{key}: {type(value).__name__}"
+            for key, value in parameters.items()
+        ) + ")"
+    return "(" + ", ".join(
+        type(value).__name__ for value in parameters or ()
+    ) + ")"
+
+
+class SlowQueryLog:
+    """
+    Times statements aggregated by fingerprint (normalized SQL).
+    A statement over the threshold is logged with its parameter shape,
+    and the query plan of its fingerprint is captured once with
+    `EXPLAIN QUERY PLAN` on another connection, in a background task.
+    At most `max_fingerprints` are tracked, the one with the least
+    total time is evicted for a new one.
+    """
+    def __init__(
+            self,
+            threshold_ms: float = 100.0,
+            explain: bool = True,
+            max_fingerprints: int = 500
+    ) -> None:
+        self.threshold_ms = threshold_ms
+        self.explain = explain
+        self.max_fingerprints = max_fingerprints
+        self.queries: dict[str, dict[str, Any]] = {}
+        self._fingerprints: dict[str, tuple[str, str]] = {}
+        self._tasks: set[asyncio.Task] = set()
+        self.statements = 0
+        self.slow = 0
+
+    def configure(
+            self,
+            threshold_ms: float,
+            explain: bool,
+            max_fingerprints: int
+    ) -> None:
+        self.threshold_ms = threshold_ms
+        self.explain = explain
+        self.max_fingerprints = max_fingerprints
+
+    def fingerprint(self, statement: str) -> tuple[str, str]:
+        """
+        :param statement: SQL statement.
+        :return: Fingerprint id and normalized statement.
+        """
+        cached = self._fingerprints.get(statement)
+        if cached is None:
+            if len(self._fingerprints) >= MAX_CACHED_STATEMENTS:
+                self._fingerprints.clear()
+            normalized = normalize_sql(statement)
+            cached = (
+                hashlib.blake2b(
+                    normalized.encode(), digest_size=8
+                ).hexdigest(),
+                normalized
+            )
+            self._fingerprints[statement] = cached
+        return cached
+
+    def _entry(self, fingerprint: str, normalized: str) -> dict[str, Any]:
+        entry = self.queries.get(fingerprint)
+        if entry is not None:
+            return entry
+        if len(self.queries) >= self.max_fingerprints:
+            del self.queries[min(
+                self.queries, key=lambda key: self.queries[key]["total_ms"]
+            )]
+        entry = self.queries[fingerprint] = {
+            "fingerprint": fingerprint,
+            "statement": normalized,
+            "calls": 0,
+            "slow_calls": 0,
+            "total_ms": 0.0,
+            "max_ms": 0.0,
+            "parameter_shapes": [],
+            "plan": None,
+            "last_slow_at": None,
+        }
+        return entry
+
+    def record(
+            self,
+            engine: AsyncEngine,
+            statement: str,
+            parameters: Any,
+            executemany: bool,
+            duration_ms: float
+    ) -> None:
+        """
+        Counts a finished statement.
+        :param engine: Engine the statement ran on.
+        :param statement: SQL statement.
+        :param parameters: Bound parameters.
+        :param executemany: Parameters are a sequence of parameter sets.
+        :param duration_ms: Statement duration.
+        :return: None
+        """
+        if statement.lstrip()[:7].upper() == "EXPLAIN":
+            return
+        self.statements += 1
+        fingerprint, normalized = self.fingerprint(statement)
+        entry = self._entry(fingerprint, normalized)
+        entry["calls"] += 1
+        entry["total_ms"] += duration_ms
+        entry["max_ms"] = max(entry["max_ms"], duration_ms)
+        if duration_ms < self.threshold_ms:
+            return
+
+        self.slow += 1
+        entry["slow_calls"] += 1
+        entry["last_slow_at"] = datetime.now(timezone.utc).isoformat()
+        shape = parameter_shape(parameters, executemany)
+        if (
+                shape not in entry["parameter_shapes"]
+                and len(entry["parameter_shapes"]) < MAX_SHAPES
+        ):
+            entry["parameter_shapes"].append(shape)
+        logger.warning(
+            f"Slow query {duration_ms:.1f} ms [{fingerprint}]: "
+            f"{normalized} {shape}"
+        )
+        if (
+                self.explain and entry["plan"] is None
+                and normalized.upper().startswith(EXPLAINABLE)
+        ):
+            entry["plan"] = []
+            self._capture_plan(
+                engine, entry, statement,
+                next(iter(parameters), ()) if executemany else parameters
+            )
+
+    def _capture_plan(
+            self,
+            engine: AsyncEngine,
+            entry: dict[str, Any],
+            statement: str,
+            parameters: Any
+    ) -> None:
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # Sync use of the engine (migrations), no loop to explain on.
+            entry["plan"] = None
+            return
+        # A fresh context: the plan is not part of the request deadline
+        # or trace that ran the slow statement.
+        task = loop.create_task(
+            self._explain(engine, entry, statement, parameters),
+            context=contextvars.Context()
+        )
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    @staticmethod
+    async def _explain(
+            engine: AsyncEngine,
+            entry: dict[str, Any],
+            statement: str,
+            parameters: Any
+    ) -> None:
+        try:
+            async with engine.connect() as connection:
+                rows = await connection.exec_driver_sql(
+                    f"EXPLAIN QUERY PLAN {statement}", parameters
+                )
+                entry["plan"] = [row[-1] for row in rows]
+        except Exception as e:
+            # Not retried, so a failing plan is not explained on every call.
+            entry["plan"] = [f"unavailable: {e}"]
+            logger.warning(
+                f"EXPLAIN QUERY PLAN of [{entry['fingerprint']}] failed: {e}"
+            )
+            return
+        logger.info(
+            f"Query plan [{entry['fingerprint']}]: "
+            + "; ".join(entry["plan"])
+        )
+
+    def top(
+            self, limit: int = 20, sort: str = "total_ms"
+    ) -> list[dict[str, Any]]:
+        """
+        :param limit: Max number of statements.
+        :param sort: `total_ms`, `max_ms`, `calls` or `slow_calls`.
+        :return: Aggregated statements, heaviest first.
+        """
+        queries = sorted(
+            self.queries.values(), key=lambda entry: entry[sort],
+            reverse=True
+        )[:limit]
+        return [
+            {
+                **entry,
+                "total_ms": round(entry["total_ms"], 3),
+                "max_ms": round(entry["max_ms"], 3),
+                "avg_ms": round(entry["total_ms"] / entry["calls"], 3),
+            }
+            for entry in queries
+        ]
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "statements": self.statements,
+            "slow": self.slow,
+            "fingerprints": len(self.queries),
+        }
+
+
+slow_query_log = SlowQueryLog()
@@ -0,0 +1,461 @@
+import functools
+import json
+import logging
+import random
+import re
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import (
+    Any, Awaitable, Callable, Iterator, Optional, Protocol, TypeVar
+)
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from src.core.admission import matched_route
+from src.core.config import logger, TracingSettings, get_tracing_settings
+from src.core.metrics import metrics
+
+T = TypeVar("T")
+
+TRACEPARENT_RE = re.compile(
+    r"^[0-9a-f]{2}-([0-9a-f]{32})-[0-9a-f]{16}-([0-9a-f]{2})$"
+)
+# Longer statements are cut in span attributes.
+SQL_MAX_LENGTH = 500
+
+
+class Span:
+    """
+    Timed operation of a trace. Finished spans are added to the trace.
+    """
+    __slots__ = (
+        "trace", "span_id", "parent_id", "name", "attributes",
+        "start", "_started", "duration_ms", "error"
+    )
+
+    def __init__(
+            self,
+            trace: "Trace",
+            name: str,
+            parent_id: Optional[str],
+            attributes: dict[str, Any]
+    ) -> None:
+        self.trace = trace
+        self.span_id = f"{random.getrandbits(64):016x}"
+        self.parent_id = parent_id
+        self.name = name
+        self.attributes = attributes
+        self.start = time.time()
+        self._started = time.perf_counter()
+        self.duration_ms = 0.0
+        self.error: Optional[str] = None
+
+    def set(self, **attributes: Any) -> None:
+        self.attributes.update(attributes)
+
+    def end(self, error: Optional[BaseException] = None) -> None:
+        """
+        Finishes the span.
+        :param error: Exception the operation failed with.
+        :return: None
+        """
+        self.duration_ms = (time.perf_counter() - self._started) * 1000
+        if error is not None:
+            self.error = f"{type(error).__name__}: {error}"
+        self.trace.add(self)
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start": self.start,
+            "duration_ms": round(self.duration_ms, 3),
+            "attributes": self.attributes,
+            "error": self.error,
+        }
+
+
+class _NoopSpan:
+    """Span of a request that is not sampled, records nothing."""
+    __slots__ = ()
+
+    def set(self, **attributes: Any) -> None:
+        pass
+
+    def end(self, error: Optional[BaseException] = None) -> None:
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+class Trace:
+    """
+    Spans of one request, at most `max_spans` are kept.
+    """
+    def __init__(self, trace_id: str, max_spans: int) -> None:
+        self.trace_id = trace_id
+        self.max_spans = max_spans
+        self.spans: list[Span] = []
+        self.dropped = 0
+
+    def add(self, span: Span) -> None:
+        if len(self.spans) < self.max_spans:
+            self.spans.append(span)
+        else:
+            self.dropped += 1
+
+    def to_dict(self) -> dict[str, Any]:
+        spans = sorted(self.spans, key=lambda span: span.start)
+        root = next(
+            (span for span in spans if span.parent_id is None), None
+        )
+        return {
+            "trace_id": self.trace_id,
+            "name": root.name if root else None,
+            "start": root.start if root else None,
+            "duration_ms": round(root.duration_ms, 3) if root else None,
+            "error": any(span.error for span in spans),
+            "dropped_spans": self.dropped,
+            "spans": [span.to_dict() for span in spans],
+        }
+
+
+# Trace of the sampled request and its innermost open span.
+_trace: ContextVar[Optional[Trace]] = ContextVar("trace", default=None)
+_span: ContextVar[Optional[Span]] = ContextVar("span", default=None)
+
+
+def current_trace_id() -> Optional[str]:
+    """
+    :return: Trace id of the current request if it is sampled.
+    """
+    trace = _trace.get()
+    return trace.trace_id if trace is not None else None
+
+
+def start_span(name: str, **attributes: Any) -> Span | _NoopSpan:
+    """
+    Starts a span under the current one without making it current,
+    for operations that have no children (SQL statements, streams).
+    :param name: Span name.
+    :param attributes: Span attributes.
+    :return: Span, a no-op span if the request is not sampled.
+    """
+    trace = _trace.get()
+    if trace is None:
+        return NOOP_SPAN
+    parent = _span.get()
+    return Span(
+        trace, name, parent.span_id if parent else None, attributes
+    )
+
+
+@contextmanager
+def span(name: str, **attributes: Any) -> Iterator[Span | _NoopSpan]:
+    """
+    Runs the block in a span, spans started inside are its children.
+    :param name: Span name.
+    :param attributes: Span attributes.
+    :return: Span, a no-op span if the request is not sampled.
+    """
+    current = start_span(name, **attributes)
+    if current is NOOP_SPAN:
+        yield current
+        return
+
+    token = _span.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.end(e)
+        raise
+    else:
+        current.end()
+    finally:
+        _span.reset(token)
+
+
+def traced(
+        func: Callable[..., Awaitable[T]]
+) -> Callable[..., Awaitable[T]]:
+    """
+    Runs every call of a coroutine function in a span
+    named after the function.
+    :param func: Coroutine function.
+    :return: Wrapped function.
+    """
+    name = func.__qualname__
+
+    @functools.wraps(func)
+    async def wrapper(*args: Any, **kwargs: Any) -> T:
+        if _trace.get() is None:
+            return await func(*args, **kwargs)
+        with span(name):
+            return await func(*args, **kwargs)
+
+    return wrapper
+
+
+def install_sql_tracing(engine: AsyncEngine) -> None:
+    """
+    Records every statement of a sampled request as an `sql` span.
+    :param engine: AsyncEngine object.
+    :return: None
+    """
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def before_execute(
+            connection: Any, cursor: Any, statement: str,
+            parameters: Any, context: Any, executemany: bool
+    ) -> None:
+        if _trace.get() is not None:
+            context._trace_span = start_span(
+                "sql",
+                statement=statement[:SQL_MAX_LENGTH],
+                executemany=executemany
+            )
+
+    @event.listens_for(engine.sync_engine, "after_cursor_execute")
+    def after_execute(
+            connection: Any, cursor: Any, statement: str,
+            parameters: Any, context: Any, executemany: bool
+    ) -> None:
+        sql_span = getattr(context, "_trace_span", None)
+        if sql_span is not None:
+            context._trace_span = None
+            sql_span.set(rows=cursor.rowcount)
+            sql_span.end()
+
+    @event.listens_for(engine.sync_engine, "handle_error")
+    def on_error(exception_context: Any) -> None:
+        context = exception_context.execution_context
+        sql_span = getattr(context, "_trace_span", None)
+        if sql_span is not None:
+            context._trace_span = None
+            sql_span.end(exception_context.original_exception)
+
+
+class SpanExporter(Protocol):
+    def export(self, trace: dict[str, Any]) -> None:
+        """
+        Receives a finished trace, must not block the event loop.
+        :param trace: Trace as a dict.
+        :return: None
+        """
+        ...
+
+
+class RingBufferExporter:
+    """
+    Keeps the newest traces in memory for the admin endpoint.
+    """
+    def __init__(self, size: int) -> None:
+        self.traces: deque[dict[str, Any]] = deque(maxlen=size)
+
+    def export(self, trace: dict[str, Any]) -> None:
+        self.traces.append(trace)
+
+    def get(self, trace_id: str) -> Optional[dict[str, Any]]:
+        return next(
+            (
+                trace for trace in reversed(self.traces)
+                if trace["trace_id"] == trace_id
+            ),
+            None
+        )
+
+    def query(
+            self,
+            limit: int = 20,
+            name: Optional[str] = None,
+            min_duration_ms: float = 0.0,
+            errors: bool = False
+    ) -> list[dict[str, Any]]:
+        """
+        Finds stored traces, newest first.
+        :param limit: Max number of traces.
+        :param name: Root span name substring.
+        :param min_duration_ms: Min request duration.
+        :param errors: Only traces with a failed span.
+        :return: Traces without their spans.
+        """
+        found = []
+        for trace in reversed(self.traces):
+            if len(found) >= limit:
+                break
+            if (
+                    (name and name not in (trace["name"] or ""))
+                    or (trace["duration_ms"] or 0) < min_duration_ms
+                    or (errors and not trace["error"])
+            ):
+                continue
+            found.append({
+                **{key: value for key, value in trace.items()
+                   if key != "spans"},
+                "spans": len(trace["spans"]),
+            })
+        return found
+
+
+class FileExporter:
+    """
+    Appends traces to a file as JSON lines, in a writer thread.
+    """
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self._writer = ThreadPoolExecutor(1, thread_name_prefix="traces")
+
+    def export(self, trace: dict[str, Any]) -> None:
+        self._writer.submit(self._write, json.dumps(trace, default=str))
+
+    def _write(self, line: str) -> None:
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with self.path.open("a", encoding="utf-8") as file:
+                file.write(line + "\n")
+        except OSError as e:
+            logger.warning(f"Trace export to {self.path} failed: {e}")
+
+
+class TraceIdFilter(logging.Filter):
+    """Adds `trace_id` of the current request to log records."""
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.trace_id = current_trace_id() or "-"
+        return True
+
+
+class Tracer:
+    """
+    Samples requests and hands their finished traces to exporters.
+    A request is sampled when it carries a sampled W3C `traceparent`
+    (its trace id is kept) or randomly with TRACING_SAMPLE_RATE;
+    at most TRACING_MAX_PER_SECOND requests are sampled per second,
+    so the overhead stays bounded under any load.
+    """
+    def __init__(self) -> None:
+        self.settings = TracingSettings()
+        self.buffer = RingBufferExporter(self.settings.TRACING_BUFFER_SIZE)
+        self.exporters: list[SpanExporter] = [self.buffer]
+        self._second = 0
+        self._sampled_in_second = 0
+        self.sampled = 0
+        self.capped = 0
+
+    def configure(self, settings: TracingSettings) -> None:
+        """
+        Applies settings, file export is enabled with TRACING_FILE.
+        :param settings: Tracing settings.
+        :return: None
+        """
+        self.settings = settings
+        self.buffer = RingBufferExporter(settings.TRACING_BUFFER_SIZE)
+        self.exporters = [self.buffer]
+        if settings.TRACING_FILE:
+            self.exporters.append(FileExporter(Path(settings.TRACING_FILE)))
+        if not any(isinstance(f, TraceIdFilter) for f in logger.filters):
+            logger.addFilter(TraceIdFilter())
+
+    def sample(self, traceparent: Optional[bytes]) -> Optional[str]:
+        """
+        :param traceparent: W3C `traceparent` header.
+        :return: Trace id if the request is sampled, None otherwise.
+        """
+        match = TRACEPARENT_RE.match(
+            traceparent.decode("latin-1") if traceparent else ""
+        )
+        if match and int(match.group(2), 16) & 1:
+            trace_id = match.group(1)
+        elif random.random() < self.settings.TRACING_SAMPLE_RATE:
+            trace_id = f"{random.getrandbits(128):032x}"
+        else:
+            return None
+
+        second = int(time.monotonic())
+        if second != self._second:
+            self._second = second
+            self._sampled_in_second = 0
+        if self._sampled_in_second >= self.settings.TRACING_MAX_PER_SECOND:
+            self.capped += 1
+            return None
+        self._sampled_in_second += 1
+        self.sampled += 1
+        return trace_id
+
+    def export(self, trace: Trace) -> None:
+        exported = trace.to_dict()
+        for exporter in self.exporters:
+            try:
+                exporter.export(exported)
+            except Exception as e:
+                logger.warning(f"Trace export failed: {e}")
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "sampled": self.sampled,
+            "capped": self.capped,
+            "buffered": len(self.buffer.traces),
+        }
+
+
+tracer = Tracer()
+
+
+class TracingMiddleware:
+    """
+    Traces sampled requests, see Tracer. The request is the root span,
+    route handlers, service methods, upstream calls and SQL statements
+    add child spans through the `_trace` contextvar. Sampled responses
+    carry `X-Trace-Id`, app log records have `trace_id`.
+    Must be added outside middlewares that run the app in a new task,
+    the task copies the contextvars when it is created.
+    """
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+        self.settings = get_tracing_settings()
+        tracer.configure(self.settings)
+        metrics.register("tracing", tracer.stats)
+
+    async def __call__(
+            self, scope: Scope, receive: Receive, send: Send
+    ) -> None:
+        if scope["type"] != "http" or not self.settings.TRACING_ENABLED:
+            await self.app(scope, receive, send)
+            return
+        trace_id = tracer.sample(dict(scope["headers"]).get(b"traceparent"))
+        if trace_id is None:
+            await self.app(scope, receive, send)
+            return
+
+        trace = Trace(trace_id, self.settings.TRACING_MAX_SPANS)
+        trace_token = _trace.set(trace)
+        root = Span(
+            trace, matched_route(scope), None,
+            {"method": scope["method"], "path": scope["path"]}
+        )
+        span_token = _span.set(root)
+
+        async def send_traced(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                root.set(status=message["status"])
+                MutableHeaders(scope=message).append("X-Trace-Id", trace_id)
+            await send(message)
+
+        error = None
+        try:
+            await self.app(scope, receive, send_traced)
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            root.end(error)
+            _span.reset(span_token)
+            _trace.reset(trace_token)
+            tracer.export(trace)
@@ -1,11 +1,18 @@
 from fastapi import FastAPI, Request
 
-from src.api import complaints_router
+from src.api import admin_router, analytics_router, complaints_router
+from src.core.admission import AdmissionMiddleware
+from src.core.compression import CompressionMiddleware
 from src.core.config import logger
+from src.core.deadline import DeadlineMiddleware
 from src.core.exception_handler import app_exception_handler
 from src.core.exceptions import AppException
+from src.core.lifespan import lifespan
+from src.core.prefilter import BodyLimitMiddleware
+from src.core.profiler import ProfilerMiddleware
+from src.core.tracing import TracingMiddleware
 
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 app.add_exception_handler(AppException, app_exception_handler)
 
@@ -14,6 +21,19 @@ app.include_router(
     prefix="/api/v1/complaints",
     tags=["complaints"]
 )
+app.include_router(
+    analytics_router,
+    prefix="/api/v1/analytics",
+    tags=["analytics"]
+)
+app.include_router(
+    admin_router,
+    prefix="/api/v1/admin",
+    tags=["admin"]
+)
+
+# Added before log_requests so it runs inside it, in the request task.
+app.add_middleware(ProfilerMiddleware)
 
 
 @app.middleware("http")
@@ -28,3 +48,18 @@ async def log_requests(request: Request, call_next):
     response = await call_next(request)
     logger.info(f"Response: {response.status_code}")
     return response
+
+
+app.add_middleware(DeadlineMiddleware)
+
+# Outside DeadlineMiddleware, its app task inherits the trace.
+app.add_middleware(TracingMiddleware)
+
+# Sheds load before requests are logged, profiled or routed.
+app.add_middleware(AdmissionMiddleware)
+
+# Oversized bodies are rejected before they take an admission slot.
+app.add_middleware(BodyLimitMiddleware)
+
+# Added last so it is the outermost middleware.
+app.add_middleware(CompressionMiddleware)
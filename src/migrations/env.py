@@ -5,7 +5,8 @@ from sqlalchemy import pool
 
 from alembic import context
 
-from src.core.database import db_settings, Base
+from src.core.config import get_db_settings
+from src.core.database import Base
 
 
 # this is the Alembic Config object, which provides
@@ -61,7 +62,7 @@ def run_migrations_online() -> None:
 
     """
     sync_engine = create_engine(
-        db_settings.DB_URL_SYNC,
+        get_db_settings().DB_URL_SYNC,
         echo=True,
         connect_args={"check_same_thread": False}
     )
@@ -0,0 +1,39 @@
+"""complaint archive
+
+Revision ID: 3f9c2a7d1b54
+Revises: 166289400abc
+Create Date: 2026-10-19 13:10:42.512734
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f9c2a7d1b54'
+down_revision: Union[str, Sequence[str], None] = '166289400abc'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('complaint_archive',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('text', sa.String(length=500), nullable=False),
+    sa.Column('status', sa.Enum('OPEN', 'CLOSED', name='complaintstatus'), nullable=False),
+    sa.Column('timestamp', sa.DateTime(), nullable=False),
+    sa.Column('sentiment', sa.Enum('POSITIVE', 'NEGATIVE', 'NEUTRAL', 'UNKNOWN', name='complaintsentiment'), nullable=True),
+    sa.Column('category', sa.Enum('TECHNICAL', 'PAYMENT', 'OTHER', name='complaintcategory'), nullable=False),
+    sa.Column('archived_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_complaint_archive_timestamp'), 'complaint_archive', ['timestamp'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_complaint_archive_timestamp'), table_name='complaint_archive')
+    op.drop_table('complaint_archive')
@@ -17,3 +17,9 @@ class ComplaintCategory(str, Enum):
     TECHNICAL = "technical"
     PAYMENT = "payment"
     OTHER = "other"
+
+
+class OutboxStatus(str, Enum):
+    PENDING = "pending"
+    SENT = "sent"
+    FAILED = "failed"
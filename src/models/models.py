@@ -1,7 +1,8 @@
 from datetime import datetime
+from typing import Any, Optional
 
 from sqlalchemy import (
-    Integer, String, DateTime,
+    Integer, String, DateTime, JSON, Index,
     func, Enum as SaEnum
 )
 from sqlalchemy.orm import (
@@ -11,7 +12,7 @@ from sqlalchemy.orm import (
 from src.core.database import Base
 
 from .enums import (
-    ComplaintStatus, ComplaintSentiment, ComplaintCategory
+    ComplaintStatus, ComplaintSentiment, ComplaintCategory, OutboxStatus
 )
 
 
@@ -36,3 +37,77 @@ class Complaint(Base):
     category: Mapped[ComplaintCategory] = mapped_column(
         SaEnum(ComplaintCategory), default=ComplaintCategory.OTHER
     )
+
+
+class ArchivedComplaint(Base):
+    """
+    Cold storage for closed complaints moved out of the main table.
+    """
+    __tablename__ = "complaint_archive"
+
+    id: Mapped[int] = mapped_column(
+        Integer, primary_key=True
+    )
+    text: Mapped[str] = mapped_column(
+        String(500), nullable=False
+    )
+    status: Mapped[ComplaintStatus] = mapped_column(
+        SaEnum(ComplaintStatus), default=ComplaintStatus.CLOSED
+    )
+    timestamp: Mapped[datetime] = mapped_column(
+        DateTime, index=True
+    )
+    sentiment: Mapped[ComplaintSentiment] = mapped_column(
+        SaEnum(ComplaintSentiment), nullable=True
+    )
+    category: Mapped[ComplaintCategory] = mapped_column(
+        SaEnum(ComplaintCategory), default=ComplaintCategory.OTHER
+    )
+    archived_at: Mapped[datetime] = mapped_column(
+        DateTime, default=func.now()
+    )
+
+
+class OutboxEvent(Base):
+    """
+    Webhook event written in the same transaction as the complaint
+    change, one row per endpoint. Delivered by OutboxDispatcher.
+    """
+    __tablename__ = "outbox_event"
+    __table_args__ = (
+        Index("ix_outbox_event_due", "status", "next_attempt_at"),
+    )
+
+    id: Mapped[int] = mapped_column(
+        Integer, primary_key=True, autoincrement=True
+    )
+    endpoint: Mapped[str] = mapped_column(
+        String(500), nullable=False
+    )
+    event_type: Mapped[str] = mapped_column(
+        String(50), nullable=False
+    )
+    payload: Mapped[dict[str, Any]] = mapped_column(
+        JSON, nullable=False
+    )
+    status: Mapped[OutboxStatus] = mapped_column(
+        SaEnum(OutboxStatus), default=OutboxStatus.PENDING
+    )
+    attempts: Mapped[int] = mapped_column(
+        Integer, default=0
+    )
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime, default=func.now()
+    )
+    next_attempt_at: Mapped[datetime] = mapped_column(
+        DateTime, default=func.now()
+    )
+    locked_until: Mapped[Optional[datetime]] = mapped_column(
+        DateTime, nullable=True
+    )
+    sent_at: Mapped[Optional[datetime]] = mapped_column(
+        DateTime, nullable=True
+    )
+    last_error: Mapped[Optional[str]] = mapped_column(
+        String(500), nullable=True
+    )
@@ -1,7 +1,7 @@
 from datetime import datetime
 from typing import Optional
 
-from pydantic import BaseModel, model_validator, ConfigDict
+from pydantic import BaseModel, Field, model_validator, ConfigDict
 
 from .enums import (
     ComplaintStatus, ComplaintCategory, ComplaintSentiment
@@ -9,7 +9,8 @@ from .enums import (
 
 
 class ComplaintCreate(BaseModel):
-    text: str
+    # Bounded by the String(500) column.
+    text: str = Field(min_length=1, max_length=500)
     sentiment: Optional[ComplaintSentiment] = ComplaintSentiment.UNKNOWN
     category: Optional[ComplaintCategory] = ComplaintCategory.OTHER
 
@@ -64,9 +65,61 @@ class ComplaintListResponse(BaseModel):
     model_config = ConfigDict(from_attributes=True)
 
 
+class ComplaintSimilarResponse(ComplaintListResponse):
+    score: float
+
+
+class ComplaintSimilarRequest(BaseModel):
+    text: str = Field(min_length=1, max_length=5000)
+    k: int = Field(default=10, ge=1, le=100)
+
+
 class ComplaintUpdate(BaseModel):
     id: int
     text: Optional[str] = None
     status: Optional[ComplaintStatus] = None
     sentiment: Optional[ComplaintSentiment] = None
     category: Optional[ComplaintCategory] = None
+
+
+class ComplaintBulkValues(BaseModel):
+    status: Optional[ComplaintStatus] = None
+    sentiment: Optional[ComplaintSentiment] = None
+    category: Optional[ComplaintCategory] = None
+
+    @model_validator(mode="after")
+    def validate_not_empty(self):
+        if not self.model_dump(exclude_none=True):
+            raise ValueError("At least one field must be set")
+        return self
+
+
+class ComplaintBulkUpdate(BaseModel):
+    ids: Optional[list[int]] = Field(default=None, min_length=1)
+    filters: Optional[ComplaintFilters] = None
+    values: ComplaintBulkValues
+    expected_status: Optional[ComplaintStatus] = None
+    strict: bool = False
+    return_ids: bool = True
+
+    @model_validator(mode="after")
+    def validate_target(self):
+        if (self.ids is None) == (self.filters is None):
+            raise ValueError("Exactly one of ids or filters must be set")
+        if self.filters and not self.filters.model_dump(exclude_none=True):
+            raise ValueError("filters must contain at least one condition")
+        if self.strict and self.ids is None:
+            raise ValueError("strict mode requires ids")
+        return self
+
+
+class ComplaintBulkUpdateResponse(BaseModel):
+    count: int
+    ids: Optional[list[int]] = None
+
+
+class AnalyticsCountResponse(BaseModel):
+    count: int
+    groups: Optional[dict[str, int]] = None
+    snapshot_at: datetime
+    snapshot_rows: int
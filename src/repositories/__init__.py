@@ -1,6 +1,13 @@
 from .complaint_repository import ComplaintRepository
+from .outbox_repository import OutboxRepository
+from .sharded_complaint_repository import (
+    ShardedComplaintRepository, complaint_repository_scope
+)
 
 
 __all__ = [
     "ComplaintRepository",
+    "OutboxRepository",
+    "ShardedComplaintRepository",
+    "complaint_repository_scope",
 ]
@@ -1,17 +1,35 @@
+from datetime import datetime, timedelta, timezone
 from typing import (
     Any, Sequence
 )
 
-from sqlalchemy import select, Row, RowMapping, and_, update
+from sqlalchemy import (
+    select, Row, RowMapping, and_, update, insert, delete, union_all,
+    func, cast, Integer, Select, CompoundSelect
+)
 from sqlalchemy.exc import OperationalError, SQLAlchemyError
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from src.core.config import get_archive_settings
 from src.core.exceptions import (
-    DatabaseNotFound, RepositoryError, ComplaintNotFound
+    DatabaseNotFound, RepositoryError, ComplaintNotFound, ConflictException
 )
-from src.models.models import Complaint
+from src.models.enums import ComplaintStatus
+from src.models.models import Complaint, ArchivedComplaint
 from src.models.schemas import (
-    ComplaintCreate, ComplaintUpdate, ComplaintFilters
+    ComplaintCreate, ComplaintUpdate, ComplaintFilters,
+    ComplaintListResponse, ComplaintBulkUpdate
+)
+from src.repositories.outbox_repository import (
+    build_outbox_events, complaint_payload
+)
+
+
+LIST_COLUMNS = tuple(
+    getattr(Complaint, name) for name in ComplaintListResponse.model_fields
+)
+ENTITY_COLUMNS = tuple(
+    getattr(Complaint, column.key) for column in Complaint.__table__.columns
 )
 
 
@@ -19,12 +37,99 @@ class ComplaintRepository:
     def __init__(self, session: AsyncSession):
         self.session = session
 
+    @staticmethod
+    def _build_conditions(
+            filters: ComplaintFilters,
+            model: type[Complaint | ArchivedComplaint] = Complaint
+    ) -> list[Any]:
+        """
+        Builds WHERE conditions from filters.
+        :param filters: ComplaintFilters schema.
+        :param model: Table to build conditions for.
+        :return: List of SQLAlchemy conditions.
+        """
+        conditions = []
+
+        if filters.category:
+            conditions.append(model.category == filters.category)
+        if filters.status:
+            conditions.append(model.status == filters.status)
+        if filters.sentiment:
+            conditions.append(model.sentiment == filters.sentiment)
+        if filters.timestamp:
+            conditions.append(
+                model.timestamp.between(
+                    filters.timestamp['start_date'],
+                    filters.timestamp['end_date']
+                )
+            )
+        return conditions
+
+    @staticmethod
+    def _hot_only(filters: ComplaintFilters) -> bool:
+        """
+        Whether the filters can only match rows of the hot table:
+        open complaints are never archived, and archived ones were
+        created more than ARCHIVE_AFTER_DAYS ago.
+        :param filters: ComplaintFilters schema.
+        :return: True if the archive can be skipped.
+        """
+        archive_settings = get_archive_settings()
+        if (
+                not archive_settings.ARCHIVE_READ_THROUGH
+                or filters.status == ComplaintStatus.OPEN
+        ):
+            return True
+        if not filters.timestamp:
+            return False
+        cutoff = datetime.now(timezone.utc).replace(tzinfo=None) - timedelta(
+            days=archive_settings.ARCHIVE_AFTER_DAYS
+        )
+        return filters.timestamp["start_date"].replace(tzinfo=None) >= cutoff
+
+    @classmethod
+    def _list_query(
+            cls,
+            filters: ComplaintFilters,
+            columns: Sequence[Any]
+    ) -> Select | CompoundSelect:
+        """
+        Builds a list query, reading through to the archive
+        unless the filters can only match hot rows.
+        :param filters: ComplaintFilters schema.
+        :param columns: Complaint columns to select.
+        :return: Select or UNION ALL of hot and archived rows.
+        """
+        query = select(*columns)
+        if conditions := cls._build_conditions(filters):
+            query = query.where(and_(*conditions))
+
+        if cls._hot_only(filters):
+            return query
+
+        archive_query = select(
+            *(getattr(ArchivedComplaint, column.key) for column in columns)
+        )
+        if conditions := cls._build_conditions(filters, ArchivedComplaint):
+            archive_query = archive_query.where(and_(*conditions))
+        return union_all(query, archive_query)
+
+    async def _release_connection(self) -> None:
+        """
+        Ends the read transaction, so the connection goes back
+        to the pool right after the query, not at the end of the request.
+        :return: None
+        """
+        await self.session.commit()
+
     async def create_complaint(
             self,
             complaint: ComplaintCreate
     ) -> Complaint:
         """
         Creates a complaint.
+        A `complaint.created` outbox event is written in the same
+        transaction.
         :param complaint: ComplaintCreate schema.
         :raises DatabaseNotFound: Database not found.
         :raises RepositoryError: Raises on SQLAlchemyError | unknown errors.
@@ -37,8 +142,12 @@ class ComplaintRepository:
                 category=complaint.category,
             )
             self.session.add(db_complaint)
-            await self.session.commit()
+            await self.session.flush()
             await self.session.refresh(db_complaint)
+            self.session.add_all(build_outbox_events(
+                "complaint.created", complaint_payload(db_complaint)
+            ))
+            await self.session.commit()
             return db_complaint
         except OperationalError as e:
             raise DatabaseNotFound(details=str(e))
@@ -56,6 +165,8 @@ class ComplaintRepository:
     ) -> Complaint:
         """
         Updates a complaint.
+        A `complaint.updated` outbox event is written in the same
+        transaction.
         :param complaint_data: Complaint data as a ComplaintUpdate schema.
         :raises DatabaseNotFound: Database not found.
         :raises RepositoryError: Raises on SQLAlchemyError | unknown errors.
@@ -76,6 +187,9 @@ class ComplaintRepository:
                     details=f"Complaint {complaint_data.id} not found"
                 )
 
+            self.session.add_all(build_outbox_events(
+                "complaint.updated", complaint_payload(complaint)
+            ))
             await self.session.commit()
             await self.session.refresh(complaint)
             return complaint
@@ -89,6 +203,70 @@ class ComplaintRepository:
         except Exception as e:
             raise RepositoryError("Unexpected error", details=str(e))
 
+    async def bulk_update_complaints(
+            self,
+            data: ComplaintBulkUpdate
+    ) -> list[int]:
+        """
+        Updates many complaints with one set-based UPDATE ... RETURNING.
+        One `complaint.bulk_updated` outbox event with all updated ids
+        is written in the same transaction.
+        :param data: Targets and values as a ComplaintBulkUpdate schema.
+        :raises ConflictException: Some ids were not updated in strict mode.
+        :raises DatabaseNotFound: Database not found.
+        :raises RepositoryError: Raises on SQLAlchemyError | unknown errors.
+        :return: List of updated complaint ids.
+        """
+        try:
+            if data.ids is not None:
+                conditions = [Complaint.id.in_(data.ids)]
+            else:
+                conditions = self._build_conditions(data.filters)
+            if data.expected_status:
+                conditions.append(Complaint.status == data.expected_status)
+
+            result = await self.session.execute(
+                update(Complaint)
+                .where(and_(*conditions))
+                .values(**data.values.model_dump(exclude_none=True))
+                .returning(Complaint.id)
+                .execution_options(synchronize_session=False)
+            )
+            updated_ids = list(result.scalars().all())
+
+            if data.strict:
+                missing = set(data.ids) - set(updated_ids)
+                if missing:
+                    raise ConflictException(
+                        message="Complaints were changed or not found.",
+                        details=f"Not updated: {sorted(missing)}"
+                    )
+
+            if updated_ids:
+                self.session.add_all(build_outbox_events(
+                    "complaint.bulk_updated",
+                    {
+                        "ids": updated_ids,
+                        **data.values.model_dump(
+                            mode="json", exclude_none=True
+                        ),
+                    }
+                ))
+            await self.session.commit()
+            return updated_ids
+        except ConflictException:
+            await self.session.rollback()
+            raise
+        except OperationalError as e:
+            raise DatabaseNotFound(details=str(e))
+        except SQLAlchemyError as e:
+            raise RepositoryError(
+                "Database operation failed",
+                details=str(e)
+            )
+        except Exception as e:
+            raise RepositoryError("Unexpected error", details=str(e))
+
     async def get_complaints_list(
             self,
             filters: ComplaintFilters
@@ -102,26 +280,13 @@ class ComplaintRepository:
         :return: List of complaints if exists, None otherwise.
         """
         try:
-            conditions = []
-
-            if filters.category:
-                conditions.append(Complaint.category == filters.category)
-            if filters.status:
-                conditions.append(Complaint.status == filters.status)
-            if filters.sentiment:
-                conditions.append(Complaint.sentiment == filters.sentiment)
-            if filters.timestamp:
-                conditions.append(
-                    Complaint.timestamp.between(
-                        filters.timestamp['start_date'],
-                        filters.timestamp['end_date']
-                    )
+            result = await self.session.execute(
+                select(Complaint).from_statement(
+                    self._list_query(filters, ENTITY_COLUMNS)
                 )
-            query = select(Complaint)
-            if conditions:
-                query = query.where(and_(*conditions))
-            result = await self.session.execute(query)
+            )
             complaints = result.scalars().all()
+            await self._release_connection()
             return complaints if complaints else None
         except OperationalError as e:
             raise DatabaseNotFound(details=str(e))
@@ -132,3 +297,227 @@ class ComplaintRepository:
             )
         except Exception as e:
             raise RepositoryError("Unexpected error", details=str(e))
+
+    async def get_complaints_rows(
+            self,
+            filters: ComplaintFilters,
+            with_timestamp: bool = False
+    ) -> Sequence[Row[Any]] | None:
+        """
+        Gets a list of complaints by filters as plain rows.
+        Selects only ComplaintListResponse columns, no ORM entities.
+        :param filters: ComplaintFilters schema.
+        :param with_timestamp: Select the timestamp column too.
+        :raises DatabaseNotFound: Database not found.
+        :raises RepositoryError: Raises on SQLAlchemyError | unknown errors.
+        :return: List of rows if exists, None otherwise.
+        """
+        columns = LIST_COLUMNS
+        if with_timestamp:
+            columns += (Complaint.timestamp,)
+        try:
+            result = await self.session.execute(
+                self._list_query(filters, columns)
+            )
+            rows = result.all()
+            await self._release_connection()
+            return rows if rows else None
+        except OperationalError as e:
+            raise DatabaseNotFound(details=str(e))
+        except SQLAlchemyError as e:
+            raise RepositoryError(
+                "Database operation failed",
+                details=str(e)
+            )
+        except Exception as e:
+            raise RepositoryError("Unexpected error", details=str(e))
+
+    async def get_complaints_by_ids(
+            self,
+            ids: Sequence[int]
+    ) -> Sequence[Row[Any]]:
+        """
+        Gets complaints by ids as plain rows, hot and archived.
+        Selects only ComplaintListResponse columns, no ORM entities.
+        :param ids: Complaint ids.
+        :raises DatabaseNotFound: Database not found.
+        :raises RepositoryError: Raises on SQLAlchemyError | unknown errors.
+        :return: List of found rows, in no particular order.
+        """
+        try:
+            result = await self.session.execute(union_all(
+                select(*LIST_COLUMNS).where(Complaint.id.in_(ids)),
+                select(
+                    *(getattr(ArchivedComplaint, column.key)
+                      for column in LIST_COLUMNS)
+                ).where(ArchivedComplaint.id.in_(ids))
+            ))
+            rows = result.all()
+            await self._release_connection()
+            return rows
+        except OperationalError as e:
+            raise DatabaseNotFound(details=str(e))
+        except SQLAlchemyError as e:
+            raise RepositoryError(
+                "Database operation failed",
+                details=str(e)
+            )
+        except Exception as e:
+            raise RepositoryError("Unexpected error", details=str(e))
+
+    async def get_complaint_texts(
+            self,
+            after_id: int,
+            limit: int
+    ) -> Sequence[Row[Any]]:
+        """
+        Gets (id, text) rows of hot and archived complaints
+        with ids above a cursor, in id order.
+        :param after_id: Last seen complaint id.
+        :param limit: Max rows.
+        :raises DatabaseNotFound: Database not found.
+        :raises RepositoryError: Raises on SQLAlchemyError | unknown errors.
+        :return: List of rows.
+        """
+        try:
+            hot = (
+                select(Complaint.id, Complaint.text)
+                .where(Complaint.id > after_id)
+                .order_by(Complaint.id)
+                .limit(limit)
+                .subquery()
+            )
+            archived = (
+                select(ArchivedComplaint.id, ArchivedComplaint.text)
+                .where(ArchivedComplaint.id > after_id)
+                .order_by(ArchivedComplaint.id)
+                .limit(limit)
+                .subquery()
+            )
+            result = await self.session.execute(
+                union_all(select(hot), select(archived))
+                .order_by("id")
+                .limit(limit)
+            )
+            rows = result.all()
+            await self._release_connection()
+            return rows
+        except OperationalError as e:
+            raise DatabaseNotFound(details=str(e))
+        except SQLAlchemyError as e:
+            raise RepositoryError(
+                "Database operation failed",
+                details=str(e)
+            )
+        except Exception as e:
+            raise RepositoryError("Unexpected error", details=str(e))
+
+    async def get_complaint_columns(
+            self,
+            after_id: int,
+            limit: int,
+            archived: bool = False
+    ) -> Sequence[Row[Any]]:
+        """
+        Gets analytics columns of complaints with ids above a cursor,
+        in id order: id, epoch (timestamp in epoch seconds),
+        status, sentiment, category.
+        :param after_id: Last seen complaint id.
+        :param limit: Max rows.
+        :param archived: Read the archive table instead.
+        :raises DatabaseNotFound: Database not found.
+        :raises RepositoryError: Raises on SQLAlchemyError | unknown errors.
+        :return: List of rows.
+        """
+        model = ArchivedComplaint if archived else Complaint
+        try:
+            result = await self.session.execute(
+                select(
+                    model.id,
+                    cast(
+                        func.strftime("%s", model.timestamp), Integer
+                    ).label("epoch"),
+                    model.status,
+                    model.sentiment,
+                    model.category
+                )
+                .where(model.id > after_id)
+                .order_by(model.id)
+                .limit(limit)
+            )
+            rows = result.all()
+            await self._release_connection()
+            return rows
+        except OperationalError as e:
+            raise DatabaseNotFound(details=str(e))
+        except SQLAlchemyError as e:
+            raise RepositoryError(
+                "Database operation failed",
+                details=str(e)
+            )
+        except Exception as e:
+            raise RepositoryError("Unexpected error", details=str(e))
+
+    async def archive_closed_complaints(
+            self,
+            before: datetime,
+            batch_size: int
+    ) -> int:
+        """
+        Moves closed complaints older than a threshold to the archive.
+        Every batch is copied and deleted in its own transaction.
+        :param before: Complaints created before it are archived.
+        :param batch_size: Max complaints per transaction.
+        :raises DatabaseNotFound: Database not found.
+        :raises RepositoryError: Raises on SQLAlchemyError | unknown errors.
+        :return: Number of archived complaints.
+        """
+        archived = 0
+        while True:
+            try:
+                result = await self.session.execute(
+                    select(Complaint.id)
+                    .where(
+                        Complaint.status == ComplaintStatus.CLOSED,
+                        Complaint.timestamp < before,
+                        # SQLite reuses max(id) + 1 after deleting the
+                        # last row, keep it so ids stay globally unique.
+                        Complaint.id < select(
+                            func.max(Complaint.id)
+                        ).scalar_subquery()
+                    )
+                    .order_by(Complaint.id)
+                    .limit(batch_size)
+                )
+                ids = result.scalars().all()
+                if not ids:
+                    return archived
+
+                await self.session.execute(
+                    insert(ArchivedComplaint).from_select(
+                        [column.key for column in ENTITY_COLUMNS],
+                        select(*ENTITY_COLUMNS).where(Complaint.id.in_(ids))
+                    )
+                )
+                await self.session.execute(
+                    delete(Complaint)
+                    .where(Complaint.id.in_(ids))
+                    .execution_options(synchronize_session=False)
+                )
+                await self.session.commit()
+            except OperationalError as e:
+                await self.session.rollback()
+                raise DatabaseNotFound(details=str(e))
+            except SQLAlchemyError as e:
+                await self.session.rollback()
+                raise RepositoryError(
+                    "Database operation failed",
+                    details=str(e)
+                )
+            except Exception as e:
+                await self.session.rollback()
+                raise RepositoryError("Unexpected error", details=str(e))
+
+            archived += len(ids)
+            if len(ids) < batch_size:
+                return archived
@@ -0,0 +1,228 @@
+from datetime import datetime, timezone
+from typing import Any, Sequence
+
+from sqlalchemy import (
+    select, update, func, or_
+)
+from sqlalchemy.exc import OperationalError, SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.core.config import get_outbox_settings
+from src.core.exceptions import DatabaseNotFound, RepositoryError
+from src.models.enums import OutboxStatus
+from src.models.models import Complaint, OutboxEvent
+
+
+def complaint_payload(complaint: Complaint) -> dict[str, Any]:
+    """
+    Webhook payload of a complaint.
+    :param complaint: Complaint object.
+    :return: JSON-serializable dict.
+    """
+    return {
+        "id": complaint.id,
+        "text": complaint.text,
+        "status": complaint.status.value if complaint.status else None,
+        "timestamp": (
+            complaint.timestamp.isoformat() if complaint.timestamp else None
+        ),
+        "sentiment": (
+            complaint.sentiment.value if complaint.sentiment else None
+        ),
+        "category": complaint.category.value if complaint.category else None,
+    }
+
+
+def build_outbox_events(
+        event_type: str,
+        payload: dict[str, Any]
+) -> list[OutboxEvent]:
+    """
+    Builds one outbox row per configured webhook endpoint.
+    Add them to the session before the commit of the change itself.
+    :param event_type: Event type, e.g. `complaint.created`.
+    :param payload: Event payload.
+    :return: List of OutboxEvent objects, empty if no endpoints are set.
+    """
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    return [
+        OutboxEvent(
+            endpoint=endpoint,
+            event_type=event_type,
+            payload=payload,
+            status=OutboxStatus.PENDING,
+            attempts=0,
+            created_at=now,
+            next_attempt_at=now,
+        )
+        for endpoint in get_outbox_settings().webhook_urls
+    ]
+
+
+class OutboxRepository:
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def claim_due(
+            self,
+            now: datetime,
+            limit: int,
+            lease_until: datetime
+    ) -> Sequence[OutboxEvent]:
+        """
+        Claims pending events that are due, oldest first.
+        A claim is a lease: if the dispatcher dies before marking
+        the events, they become due again once the lease expires.
+        :param now: Current time (naive UTC).
+        :param limit: Max events to claim.
+        :param lease_until: Lease expiration time.
+        :raises DatabaseNotFound: Database not found.
+        :raises RepositoryError: Raises on SQLAlchemyError | unknown errors.
+        :return: List of claimed events.
+        """
+        try:
+            available = (
+                OutboxEvent.status == OutboxStatus.PENDING,
+                OutboxEvent.next_attempt_at <= now,
+                or_(
+                    OutboxEvent.locked_until.is_(None),
+                    OutboxEvent.locked_until < now
+                ),
+            )
+            due = (
+                select(OutboxEvent.id)
+                .where(*available)
+                .order_by(OutboxEvent.id)
+                .limit(limit)
+            )
+            result = await self.session.execute(
+                update(OutboxEvent)
+                .where(OutboxEvent.id.in_(due.scalar_subquery()), *available)
+                .values(locked_until=lease_until)
+                .returning(OutboxEvent)
+                .execution_options(synchronize_session=False)
+            )
+            events = sorted(result.scalars().all(), key=lambda e: e.id)
+            await self.session.commit()
+            return events
+        except OperationalError as e:
+            raise DatabaseNotFound(details=str(e))
+        except SQLAlchemyError as e:
+            raise RepositoryError(
+                "Database operation failed",
+                details=str(e)
+            )
+        except Exception as e:
+            raise RepositoryError("Unexpected error", details=str(e))
+
+    async def mark_sent(self, ids: list[int], now: datetime) -> None:
+        """
+        Marks events as delivered.
+        :param ids: Event ids.
+        :param now: Delivery time (naive UTC).
+        :raises DatabaseNotFound: Database not found.
+        :raises RepositoryError: Raises on SQLAlchemyError | unknown errors.
+        :return: None
+        """
+        try:
+            await self.session.execute(
+                update(OutboxEvent)
+                .where(OutboxEvent.id.in_(ids))
+                .values(
+                    status=OutboxStatus.SENT,
+                    attempts=OutboxEvent.attempts + 1,
+                    sent_at=now,
+                    locked_until=None,
+                    last_error=None
+                )
+                .execution_options(synchronize_session=False)
+            )
+            await self.session.commit()
+        except OperationalError as e:
+            raise DatabaseNotFound(details=str(e))
+        except SQLAlchemyError as e:
+            raise RepositoryError(
+                "Database operation failed",
+                details=str(e)
+            )
+        except Exception as e:
+            raise RepositoryError("Unexpected error", details=str(e))
+
+    async def mark_failed(
+            self,
+            ids: list[int],
+            error: str,
+            next_attempt_at: datetime,
+            max_attempts: int
+    ) -> int:
+        """
+        Schedules a retry of failed events. Events that ran out of
+        attempts are marked as FAILED and are not retried anymore.
+        :param ids: Event ids.
+        :param error: Delivery error.
+        :param next_attempt_at: Time of the next attempt (naive UTC).
+        :param max_attempts: Max delivery attempts.
+        :raises DatabaseNotFound: Database not found.
+        :raises RepositoryError: Raises on SQLAlchemyError | unknown errors.
+        :return: Number of events marked as FAILED.
+        """
+        try:
+            await self.session.execute(
+                update(OutboxEvent)
+                .where(OutboxEvent.id.in_(ids))
+                .values(
+                    attempts=OutboxEvent.attempts + 1,
+                    next_attempt_at=next_attempt_at,
+                    locked_until=None,
+                    last_error=error[:500]
+                )
+                .execution_options(synchronize_session=False)
+            )
+            result = await self.session.execute(
+                update(OutboxEvent)
+                .where(
+                    OutboxEvent.id.in_(ids),
+                    OutboxEvent.attempts >= max_attempts
+                )
+                .values(status=OutboxStatus.FAILED)
+                .returning(OutboxEvent.id)
+                .execution_options(synchronize_session=False)
+            )
+            failed = len(result.scalars().all())
+            await self.session.commit()
+            return failed
+        except OperationalError as e:
+            raise DatabaseNotFound(details=str(e))
+        except SQLAlchemyError as e:
+            raise RepositoryError(
+                "Database operation failed",
+                details=str(e)
+            )
+        except Exception as e:
+            raise RepositoryError("Unexpected error", details=str(e))
+
+    async def count_by_status(self) -> dict[str, int]:
+        """
+        Counts events by delivery status.
+        :raises DatabaseNotFound: Database not found.
+        :raises RepositoryError: Raises on SQLAlchemyError | unknown errors.
+        :return: Status to number of events.
+        """
+        try:
+            result = await self.session.execute(
+                select(OutboxEvent.status, func.count())
+                .group_by(OutboxEvent.status)
+            )
+            counts = {status.value: count for status, count in result.all()}
+            # Release the connection right after the read.
+            await self.session.commit()
+            return counts
+        except OperationalError as e:
+            raise DatabaseNotFound(details=str(e))
+        except SQLAlchemyError as e:
+            raise RepositoryError(
+                "Database operation failed",
+                details=str(e)
+            )
+        except Exception as e:
+            raise RepositoryError("Unexpected error", details=str(e))
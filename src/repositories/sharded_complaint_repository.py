@@ -0,0 +1,332 @@
+import asyncio
+from collections import defaultdict
+from contextlib import AbstractAsyncContextManager, asynccontextmanager
+from datetime import datetime
+from typing import (
+    Any, AsyncIterator, Awaitable, Callable, Optional, Sequence, TypeVar
+)
+
+from sqlalchemy import Row, RowMapping
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from src.core.exceptions import (
+    ComplaintNotFound, ConflictException, ValidationException
+)
+from src.core.sharding import SHARD_ID_BITS, Shard, ShardSet
+from src.models.models import Complaint
+from src.models.schemas import (
+    ComplaintCreate, ComplaintUpdate, ComplaintFilters, ComplaintBulkUpdate
+)
+from src.repositories.complaint_repository import ComplaintRepository
+
+T = TypeVar("T")
+
+
+class ShardedComplaintRepository:
+    """
+    ComplaintRepository over a ShardSet.
+    Every call opens short sessions on the shards it needs: writes go
+    to one shard, reads prune shards by the timestamp filter and query
+    the rest concurrently, results are concatenated oldest shard first.
+    Sealed shards are read-only, updates by filters skip them.
+    """
+    def __init__(self, shards: ShardSet):
+        self.shards = shards
+
+    @staticmethod
+    async def _run(
+            shard: Shard,
+            call: Callable[[ComplaintRepository], Awaitable[T]]
+    ) -> T:
+        async with shard.session_maker() as session:
+            return await call(ComplaintRepository(session))
+
+    async def _fan_out(
+            self,
+            shards: Sequence[Shard],
+            call: Callable[[ComplaintRepository], Awaitable[T]]
+    ) -> list[T]:
+        return list(await asyncio.gather(
+            *(self._run(shard, call) for shard in shards)
+        ))
+
+    def _prune(self, filters: Optional[ComplaintFilters]) -> list[Shard]:
+        if filters is None or not filters.timestamp:
+            return self.shards.shards()
+        return self.shards.in_range(
+            filters.timestamp["start_date"], filters.timestamp["end_date"]
+        )
+
+    def _writable(self, complaint_id: int) -> Shard:
+        shard = self.shards.for_id(complaint_id)
+        if shard is None:
+            raise ComplaintNotFound(
+                details=f"Complaint {complaint_id} not found"
+            )
+        if shard.read_only:
+            raise ConflictException(
+                message="Complaint is read-only.",
+                details=f"Shard {shard.label} is sealed"
+            )
+        return shard
+
+    @staticmethod
+    def _concat(results: list[Optional[Sequence[T]]]) -> list[T]:
+        return [row for rows in results if rows for row in rows]
+
+    async def create_complaint(
+            self,
+            complaint: ComplaintCreate
+    ) -> Complaint:
+        """
+        Creates a complaint in the shard of the current period.
+        :param complaint: ComplaintCreate schema.
+        :return: Complaint object.
+        """
+        return await self._run(
+            await self.shards.current(),
+            lambda repository: repository.create_complaint(complaint)
+        )
+
+    async def update_complaint(
+            self,
+            complaint_data: ComplaintUpdate
+    ) -> Complaint:
+        """
+        Updates a complaint in its shard.
+        :param complaint_data: Complaint data as a ComplaintUpdate schema.
+        :raises ComplaintNotFound: Complaint not found.
+        :raises ConflictException: Complaint is in a sealed shard.
+        :return: Complaint object.
+        """
+        return await self._run(
+            self._writable(complaint_data.id),
+            lambda repository: repository.update_complaint(complaint_data)
+        )
+
+    async def bulk_update_complaints(
+            self,
+            data: ComplaintBulkUpdate
+    ) -> list[int]:
+        """
+        Updates complaints shard by shard, one transaction per shard.
+        :param data: Targets and values as a ComplaintBulkUpdate schema.
+        :raises ValidationException: Strict update spans several shards.
+        :raises ConflictException: Some ids were not updated in strict mode
+            or are in a sealed shard.
+        :return: List of updated complaint ids.
+        """
+        if data.ids is None:
+            targets = [
+                (shard, data) for shard in self._prune(data.filters)
+                if not shard.read_only
+            ]
+        else:
+            ids_by_shard: defaultdict[int, list[int]] = defaultdict(list)
+            for complaint_id in data.ids:
+                try:
+                    shard = self._writable(complaint_id)
+                except ComplaintNotFound:
+                    # Missing ids are reported by strict mode.
+                    shard = None
+                ids_by_shard[shard.key if shard else -1].append(complaint_id)
+            if data.strict and len(ids_by_shard) > 1:
+                raise ValidationException(
+                    details="Strict bulk update must target one shard"
+                )
+            if data.strict and -1 in ids_by_shard:
+                raise ConflictException(
+                    message="Complaints were changed or not found.",
+                    details=f"Not updated: {sorted(ids_by_shard[-1])}"
+                )
+            targets = [
+                (
+                    self.shards.get(key),
+                    data.model_copy(update={"ids": ids})
+                )
+                for key, ids in ids_by_shard.items() if key != -1
+            ]
+
+        results = await asyncio.gather(*(
+            self._run(
+                shard,
+                lambda repository, shard_data=shard_data: (
+                    repository.bulk_update_complaints(shard_data)
+                )
+            )
+            for shard, shard_data in targets
+        ))
+        return self._concat(results)
+
+    async def get_complaints_list(
+            self,
+            filters: ComplaintFilters
+    ) -> Sequence[Row[Any] | RowMapping | Any] | None:
+        """
+        Gets a list of complaints by filters from the matching shards.
+        :param filters: ComplaintFilters schema.
+        :return: List of complaints if exists, None otherwise.
+        """
+        complaints = self._concat(await self._fan_out(
+            self._prune(filters),
+            lambda repository: repository.get_complaints_list(filters)
+        ))
+        return complaints or None
+
+    async def get_complaints_rows(
+            self,
+            filters: ComplaintFilters,
+            with_timestamp: bool = False
+    ) -> Sequence[Row[Any]] | None:
+        """
+        Gets a list of complaints by filters as plain rows
+        from the matching shards.
+        :param filters: ComplaintFilters schema.
+        :param with_timestamp: Select the timestamp column too.
+        :return: List of rows if exists, None otherwise.
+        """
+        rows = self._concat(await self._fan_out(
+            self._prune(filters),
+            lambda repository: repository.get_complaints_rows(
+                filters, with_timestamp
+            )
+        ))
+        return rows or None
+
+    async def get_complaints_by_ids(
+            self,
+            ids: Sequence[int]
+    ) -> Sequence[Row[Any]]:
+        """
+        Gets complaints by ids as plain rows from their shards.
+        :param ids: Complaint ids.
+        :return: List of found rows, in no particular order.
+        """
+        ids_by_shard: defaultdict[int, list[int]] = defaultdict(list)
+        for complaint_id in ids:
+            if (shard := self.shards.for_id(complaint_id)) is not None:
+                ids_by_shard[shard.key].append(complaint_id)
+        results = await asyncio.gather(*(
+            self._run(
+                self.shards.get(key),
+                lambda repository, ids=shard_ids: (
+                    repository.get_complaints_by_ids(ids)
+                )
+            )
+            for key, shard_ids in ids_by_shard.items()
+        ))
+        return self._concat(results)
+
+    async def _scan(
+            self,
+            after_id: int,
+            limit: int,
+            call: Callable[[ComplaintRepository, int, int], Awaitable[T]]
+    ) -> list[Any]:
+        """
+        Keyset scan in global id order. Ids grow with the shard key,
+        so shards are read one after another.
+        """
+        rows: list[Any] = []
+        for shard in self.shards.shards():
+            if (shard.key + 1) << SHARD_ID_BITS <= after_id:
+                continue
+            rows.extend(await self._run(
+                shard,
+                lambda repository: call(
+                    repository, after_id, limit - len(rows)
+                )
+            ))
+            if len(rows) >= limit:
+                break
+        return rows
+
+    async def get_complaint_texts(
+            self,
+            after_id: int,
+            limit: int
+    ) -> Sequence[Row[Any]]:
+        """
+        Gets (id, text) rows with ids above a cursor, in id order.
+        :param after_id: Last seen complaint id.
+        :param limit: Max rows.
+        :return: List of rows.
+        """
+        return await self._scan(
+            after_id, limit,
+            lambda repository, cursor, size: repository.get_complaint_texts(
+                cursor, size
+            )
+        )
+
+    async def get_complaint_columns(
+            self,
+            after_id: int,
+            limit: int,
+            archived: bool = False
+    ) -> Sequence[Row[Any]]:
+        """
+        Gets analytics columns with ids above a cursor, in id order.
+        :param after_id: Last seen complaint id.
+        :param limit: Max rows.
+        :param archived: Read the archive tables instead.
+        :return: List of rows.
+        """
+        return await self._scan(
+            after_id, limit,
+            lambda repository, cursor, size: (
+                repository.get_complaint_columns(cursor, size, archived)
+            )
+        )
+
+    async def archive_closed_complaints(
+            self,
+            before: datetime,
+            batch_size: int
+    ) -> int:
+        """
+        Archives closed complaints in every writable shard
+        that may hold complaints older than the threshold.
+        :param before: Complaints created before it are archived.
+        :param batch_size: Max complaints per transaction.
+        :return: Number of archived complaints.
+        """
+        shards = [
+            shard for shard in self.shards.in_range(end=before)
+            if not shard.read_only
+        ]
+        return sum(await self._fan_out(
+            shards,
+            lambda repository: repository.archive_closed_complaints(
+                before, batch_size
+            )
+        ))
+
+
+RepositoryScope = Callable[[], AbstractAsyncContextManager[
+    ComplaintRepository | ShardedComplaintRepository
+]]
+
+
+def complaint_repository_scope(
+        session_maker: async_sessionmaker[AsyncSession],
+        shards: Optional[ShardSet] = None
+) -> RepositoryScope:
+    """
+    Builds a factory of short-lived repositories for background jobs.
+    :param session_maker: Session factory of the main database.
+    :param shards: ShardSet if sharding is enabled.
+    :return: Function returning an async context manager
+        that yields a complaint repository.
+    """
+    @asynccontextmanager
+    async def scope() -> AsyncIterator[
+        ComplaintRepository | ShardedComplaintRepository
+    ]:
+        if shards is not None:
+            yield ShardedComplaintRepository(shards)
+            return
+        async with session_maker() as session:
+            yield ComplaintRepository(session)
+
+    return scope
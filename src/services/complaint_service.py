@@ -1,24 +1,102 @@
+from datetime import datetime, timedelta, timezone
 from typing import (
-    Any, Sequence
+    Any, Hashable, Optional, Sequence
 )
 
 from sqlalchemy import Row, RowMapping
 
-from src.core.config import logger
+from src.core.cache import QueryCache
+from src.core.config import (
+    logger, get_cache_settings, get_archive_settings
+)
 from src.core.exceptions import (
-    DatabaseNotFound, RepositoryError, ServiceError, ComplaintNotFound
+    DatabaseNotFound, RepositoryError, ServiceError, ComplaintNotFound,
+    ConflictException, ServiceUnavailable
 )
+from src.core.similarity import SimilarityIndex
+from src.core.tracing import traced
 from src.models.models import Complaint
 from src.models.schemas import (
-    ComplaintCreate, ComplaintUpdate, ComplaintFilters
+    ComplaintCreate, ComplaintUpdate, ComplaintFilters,
+    ComplaintBulkUpdate, ComplaintBulkUpdateResponse
 )
-from src.repositories import ComplaintRepository
+from src.repositories import ComplaintRepository, ShardedComplaintRepository
+
+
+def _bucket_offset(value: datetime, bucket: timedelta) -> timedelta:
+    """Offset of the datetime from the start of its time bucket."""
+    return (value - datetime(1970, 1, 1, tzinfo=value.tzinfo)) % bucket
+
+
+def _in_range(
+        value: Optional[datetime],
+        timestamp: dict[str, datetime]
+) -> bool:
+    """
+    Whether a timestamp is within a filter range, as SQL BETWEEN
+    compares them: SQLite stores datetimes without time zone.
+    """
+    if value is None:
+        return False
+    start = timestamp["start_date"].replace(tzinfo=None)
+    end = timestamp["end_date"].replace(tzinfo=None)
+    return start <= value.replace(tzinfo=None) <= end
 
 
 class ComplaintService:
-    def __init__(self, repository: ComplaintRepository):
+    def __init__(
+            self,
+            repository: ComplaintRepository | ShardedComplaintRepository,
+            cache: Optional[QueryCache] = None,
+            similarity_index: Optional[SimilarityIndex] = None
+    ):
         self.repository = repository
+        self.cache = cache
+        self.similarity_index = similarity_index
+
+    def _invalidate_cache(self) -> None:
+        """
+        Makes all cached query results stale after a write.
+        :return: None
+        """
+        if self.cache is not None:
+            self.cache.invalidate()
+
+    @staticmethod
+    def _normalize_filters(
+            filters: ComplaintFilters
+    ) -> tuple[ComplaintFilters, Hashable]:
+        """
+        Widens the timestamp range to the cache time bucket grid,
+        so close "last hour" queries share one cache entry.
+        Rows of the widened range must be narrowed down to the
+        requested one before they are returned.
+        :param filters: ComplaintFilters object.
+        :return: Normalized filters and their cache key.
+        """
+        timestamp = None
+        if filters.timestamp:
+            bucket = timedelta(
+                seconds=max(1, get_cache_settings().QUERY_CACHE_TIME_BUCKET)
+            )
+            start = filters.timestamp["start_date"]
+            end = filters.timestamp["end_date"]
+            start -= _bucket_offset(start, bucket)
+            if end_offset := _bucket_offset(end, bucket):
+                end += bucket - end_offset
+            timestamp = {"start_date": start, "end_date": end}
+            filters = filters.model_copy(update={"timestamp": timestamp})
 
+        key = (
+            filters.status.value if filters.status else None,
+            filters.category.value if filters.category else None,
+            filters.sentiment.value if filters.sentiment else None,
+            timestamp["start_date"].isoformat() if timestamp else None,
+            timestamp["end_date"].isoformat() if timestamp else None,
+        )
+        return filters, key
+
+    @traced
     async def add_complaint(
             self,
             complaint_data: ComplaintCreate
@@ -39,6 +117,9 @@ class ComplaintService:
                 complaint_data
             )
             logger.info(f"Complaint created successfully. ID: {complaint.id}")
+            self._invalidate_cache()
+            if self.similarity_index is not None:
+                self.similarity_index.add(complaint.id, complaint.text)
             return complaint
         except DatabaseNotFound as e:
             logger.error(f"Database not found: {e.details}")
@@ -53,6 +134,7 @@ class ComplaintService:
             )
             raise ServiceError("Complaint creation failed", details=str(e))
 
+    @traced
     async def update_complaint(
             self, complaint_data: ComplaintUpdate
     ) -> Complaint:
@@ -69,6 +151,12 @@ class ComplaintService:
                 complaint_data
             )
             logger.info(f"Complaint updated successfully. ID: {complaint.id}")
+            self._invalidate_cache()
+            if (
+                    self.similarity_index is not None
+                    and complaint_data.text is not None
+            ):
+                self.similarity_index.add(complaint.id, complaint.text)
             return complaint
         except DatabaseNotFound as e:
             logger.error(f"Database not found: {e.details}")
@@ -89,6 +177,89 @@ class ComplaintService:
                 details=str(e)
             )
 
+    @traced
+    async def bulk_update_complaints(
+            self, data: ComplaintBulkUpdate
+    ) -> ComplaintBulkUpdateResponse:
+        """
+        Updates many complaints from the database at once.
+        :param data: Targets and values as a ComplaintBulkUpdate schema.
+        :raises ConflictException: Some ids were not updated in strict mode.
+        :raises ServiceError: Raises on unexpected errors.
+        :return: ComplaintBulkUpdateResponse object.
+        """
+        try:
+            logger.info(
+                f"Bulk updates complaints: {data.values}"
+            )
+            updated_ids = await self.repository.bulk_update_complaints(data)
+            logger.info(
+                f"Complaints updated successfully. Count: {len(updated_ids)}"
+            )
+            if updated_ids:
+                self._invalidate_cache()
+            return ComplaintBulkUpdateResponse(
+                count=len(updated_ids),
+                ids=updated_ids if data.return_ids else None
+            )
+        except DatabaseNotFound as e:
+            logger.error(f"Database not found: {e.details}")
+            raise
+        except RepositoryError as e:
+            logger.error(f"Repository error: {e.details}")
+            raise
+        except ConflictException as e:
+            logger.warning(f"Bulk update conflict: {e.details}")
+            raise
+        except Exception as e:
+            logger.error(
+                f"Unexpected error bulk updating complaints: {e}",
+                exc_info=True
+            )
+            raise ServiceError(
+                "Complaints bulk update failed",
+                details=str(e)
+            )
+
+    @traced
+    async def archive_closed_complaints(self) -> int:
+        """
+        Moves closed complaints older than ARCHIVE_AFTER_DAYS
+        to the archive table in batches.
+        :raises ServiceError: Raises on unexpected errors.
+        :return: Number of archived complaints.
+        """
+        archive_settings = get_archive_settings()
+        before = datetime.now(timezone.utc).replace(tzinfo=None) - timedelta(
+            days=archive_settings.ARCHIVE_AFTER_DAYS
+        )
+        try:
+            logger.info(f"Archives closed complaints before {before}")
+            archived = await self.repository.archive_closed_complaints(
+                before, archive_settings.ARCHIVE_BATCH_SIZE
+            )
+            logger.info(f"Complaints archived successfully. Count: {archived}")
+            return archived
+        except DatabaseNotFound as e:
+            logger.error(f"Database not found: {e.details}")
+            raise
+        except RepositoryError as e:
+            logger.error(f"Repository error: {e.details}")
+            raise
+        except Exception as e:
+            logger.error(
+                f"Unexpected error archiving complaints: {e}",
+                exc_info=True
+            )
+            raise ServiceError(
+                "Complaints archiving failed",
+                details=str(e)
+            )
+        finally:
+            # Batches may be committed before an error.
+            self._invalidate_cache()
+
+    @traced
     async def get_complaints_by_time_range(
             self, filters: ComplaintFilters,
     ) -> Sequence[Row[Any] | RowMapping | Any] | None:
@@ -102,9 +273,19 @@ class ComplaintService:
             logger.info(
                 f"Finds complaints by filters: {filters}"
             )
-            complaints = await self.repository.get_complaints_list(
-                filters
+            if self.cache is None:
+                return await self.repository.get_complaints_list(filters)
+
+            widened, key = self._normalize_filters(filters)
+            complaints = await self.cache.get_or_load(
+                key,
+                lambda: self.repository.get_complaints_list(widened)
             )
+            if complaints and filters.timestamp:
+                complaints = [
+                    complaint for complaint in complaints
+                    if _in_range(complaint.timestamp, filters.timestamp)
+                ] or None
             return complaints
         except DatabaseNotFound as e:
             logger.error(f"Database not found: {e.details}")
@@ -118,3 +299,169 @@ class ComplaintService:
                 "Get complaints by time range failed",
                 details=str(e)
             )
+
+    @traced
+    async def get_complaint_rows_by_time_range(
+            self, filters: ComplaintFilters,
+    ) -> list[dict[str, Any]] | None:
+        """
+        Returns complaints based on the time created as plain dicts.
+        Rows are trusted DB data and are not validated by pydantic.
+        :param filters: ComplaintFilters object.
+        :raises ServiceError: Raises on unexpected errors.
+        :return: List of ComplaintListResponse-shaped dicts
+            if rows exists, None otherwise.
+        """
+        async def load() -> list[dict[str, Any]] | None:
+            rows = await self.repository.get_complaints_rows(filters)
+            return [row._asdict() for row in rows] if rows else None
+
+        try:
+            logger.info(
+                f"Finds complaint rows by filters: {filters}"
+            )
+            if self.cache is None:
+                return await load()
+            if not filters.timestamp:
+                _, key = self._normalize_filters(filters)
+                return await self.cache.get_or_load(("rows", key), load)
+
+            widened, key = self._normalize_filters(filters)
+
+            async def load_widened() -> list[dict[str, Any]] | None:
+                rows = await self.repository.get_complaints_rows(
+                    widened, with_timestamp=True
+                )
+                return [row._asdict() for row in rows] if rows else None
+
+            rows = await self.cache.get_or_load(("rows", key), load_widened)
+            rows = [
+                {
+                    name: value for name, value in row.items()
+                    if name != "timestamp"
+                }
+                for row in rows or ()
+                if _in_range(row["timestamp"], filters.timestamp)
+            ]
+            return rows or None
+        except DatabaseNotFound as e:
+            logger.error(f"Database not found: {e.details}")
+            raise
+        except RepositoryError as e:
+            logger.error(f"Repository error: {e.details}")
+            raise
+        except Exception as e:
+            logger.error(f"Unexpected error finding complaints: {e}")
+            raise ServiceError(
+                "Get complaint rows by time range failed",
+                details=str(e)
+            )
+
+    async def _similar_rows(
+            self,
+            signature: int,
+            k: int,
+            exclude: Optional[int] = None
+    ) -> list[dict[str, Any]]:
+        """
+        Looks up the nearest signatures and loads their rows.
+        :param signature: Query signature.
+        :param k: Max number of results.
+        :param exclude: Complaint id to leave out.
+        :return: ComplaintSimilarResponse-shaped dicts, most similar first.
+        """
+        matches = self.similarity_index.search(signature, k, exclude)
+        if not matches:
+            return []
+        rows = {
+            row.id: row._asdict()
+            for row in await self.repository.get_complaints_by_ids(
+                [complaint_id for complaint_id, _ in matches]
+            )
+        }
+        return [
+            {**rows[complaint_id], "score": score}
+            for complaint_id, score in matches
+            if complaint_id in rows
+        ]
+
+    @traced
+    async def find_similar_complaints(
+            self,
+            text: str,
+            k: int
+    ) -> list[dict[str, Any]]:
+        """
+        Returns complaints similar to a text.
+        :param text: Any text.
+        :param k: Max number of results.
+        :raises ServiceUnavailable: Similarity index is disabled.
+        :raises ServiceError: Raises on unexpected errors.
+        :return: ComplaintSimilarResponse-shaped dicts, most similar first.
+        """
+        if self.similarity_index is None:
+            raise ServiceUnavailable(details="Similarity index is disabled")
+        try:
+            return await self._similar_rows(
+                self.similarity_index.text_signature(text), k
+            )
+        except DatabaseNotFound as e:
+            logger.error(f"Database not found: {e.details}")
+            raise
+        except RepositoryError as e:
+            logger.error(f"Repository error: {e.details}")
+            raise
+        except Exception as e:
+            logger.error(f"Unexpected error finding similar complaints: {e}")
+            raise ServiceError(
+                "Find similar complaints failed",
+                details=str(e)
+            )
+
+    @traced
+    async def get_similar_complaints(
+            self,
+            complaint_id: int,
+            k: int
+    ) -> list[dict[str, Any]]:
+        """
+        Returns complaints similar to a stored complaint.
+        :param complaint_id: Complaint id.
+        :param k: Max number of results.
+        :raises ServiceUnavailable: Similarity index is disabled.
+        :raises ComplaintNotFound: Complaint not found.
+        :raises ServiceError: Raises on unexpected errors.
+        :return: ComplaintSimilarResponse-shaped dicts, most similar first.
+        """
+        if self.similarity_index is None:
+            raise ServiceUnavailable(details="Similarity index is disabled")
+        try:
+            signature = self.similarity_index.signature_of(complaint_id)
+            if signature is None:
+                # Not indexed yet, e.g. while the index catches up.
+                rows = await self.repository.get_complaints_by_ids(
+                    [complaint_id]
+                )
+                if not rows:
+                    raise ComplaintNotFound(
+                        details=f"Complaint {complaint_id} not found"
+                    )
+                signature = self.similarity_index.text_signature(
+                    rows[0].text
+                )
+            return await self._similar_rows(signature, k, complaint_id)
+        except DatabaseNotFound as e:
+            logger.error(f"Database not found: {e.details}")
+            raise
+        except RepositoryError as e:
+            logger.error(f"Repository error: {e.details}")
+            raise
+        except ComplaintNotFound as e:
+            logger.error(f"Complaint not found: {e.details}")
+            raise
+        except Exception as e:
+            logger.error(f"Unexpected error finding similar complaints: {e}")
+            raise ServiceError(
+                "Get similar complaints failed",
+                details=str(e)
+            )
@@ -1,12 +1,16 @@
 import pytest
-from unittest.mock import AsyncMock
+from unittest.mock import AsyncMock, MagicMock
 
 from fastapi import FastAPI
 from sqlalchemy.ext.asyncio import AsyncSession
 from starlette.testclient import TestClient
 
+from src.api.routers import complaints as complaints_module
+from src.core import dependencies
 from src.core.dependencies import ComplaintServiceDep, ApiLayerClientDep, \
     ApiIPClientDep, ApiHuggingFaceClientDep
+from src.core.exception_handler import app_exception_handler
+from src.core.exceptions import AppException
 from src.core.external_api import ExternalAPIClient
 from src.models.enums import (
     ComplaintSentiment, ComplaintCategory
@@ -84,3 +88,43 @@ def client(mock_dependencies):
     })
 
     return TestClient(app)
+
+
+@pytest.fixture
+def create_complaints_app(monkeypatch):
+    """
+    Factory of an app with the complaints router and the exception
+    handler. Upstream clients, the service and the stores are mocked,
+    abuse detection and the pre-filter are off, the per-IP throttle
+    starts empty.
+    Call it with dependency overrides, an override of None keeps
+    the real dependency, and with attributes to set on `app.state`.
+    """
+    from src.api import complaints_router
+    monkeypatch.setattr(complaints_module, "ip_request_cache", {})
+
+    def create(overrides=None, **state) -> FastAPI:
+        app = FastAPI()
+        app.add_exception_handler(AppException, app_exception_handler)
+        app.include_router(complaints_router)
+        for name, value in state.items():
+            setattr(app.state, name, value)
+
+        api_client = AsyncMock()
+        app.dependency_overrides.update({
+            dependencies.get_complaint_service: lambda: AsyncMock(),
+            dependencies.get_api_layer_client: lambda: api_client,
+            dependencies.get_hugging_face_client: lambda: api_client,
+            dependencies.get_ip_info_resolver: lambda: MagicMock(),
+            dependencies.get_idempotency_store: lambda: MagicMock(),
+            dependencies.get_abuse_detector: lambda: None,
+            dependencies.get_prefilter: lambda: None,
+        })
+        for dependency, override in (overrides or {}).items():
+            if override is None:
+                app.dependency_overrides.pop(dependency, None)
+            else:
+                app.dependency_overrides[dependency] = override
+        return app
+
+    return create
@@ -0,0 +1,132 @@
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from starlette.testclient import TestClient
+
+from src.api.routers import complaints as complaints_module
+from src.core import dependencies
+from src.core.abuse import (
+    AbuseDetector, CountMinSketch, DecayingSketch, subnet_of,
+    text_fingerprint
+)
+from src.core.config import AbuseSettings
+from src.models.enums import (
+    ComplaintStatus, ComplaintSentiment, ComplaintCategory
+)
+from src.models.models import Complaint
+
+
+class Clock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def create_detector(clock=None, **overrides) -> AbuseDetector:
+    settings = AbuseSettings(**{
+        "ABUSE_WINDOW": 60,
+        "ABUSE_IP_LIMIT": 3,
+        "ABUSE_SUBNET_LIMIT": 5,
+        "ABUSE_TEXT_LIMIT": 2,
+        "ABUSE_SKETCH_WIDTH": 256,
+        "ABUSE_TOP_K": 32,
+        **overrides,
+    })
+    return AbuseDetector(settings, clock or Clock())
+
+
+def test_count_min_never_undercounts():
+    """Collisions only inflate estimates."""
+    sketch = CountMinSketch(width=16, depth=4)
+    counts = {f"key{i}": i % 7 + 1 for i in range(64)}
+    for key, count in counts.items():
+        for _ in range(count):
+            sketch.add(sketch.cells(key))
+
+    assert all(
+        sketch.estimate(sketch.cells(key)) >= count
+        for key, count in counts.items()
+    )
+
+
+def test_sliding_window_decays():
+    """Counts of the previous window fade out linearly."""
+    clock = Clock()
+    sketch = DecayingSketch(256, 4, window=60, clock=clock)
+    for _ in range(10):
+        sketch.add("ip:1.2.3.4")
+
+    clock.now = 90
+    assert sketch.rotate()
+    assert sketch.estimate("ip:1.2.3.4") == pytest.approx(5)
+    clock.now = 200
+    sketch.rotate()
+    assert sketch.estimate("ip:1.2.3.4") == 0
+
+
+def test_keys():
+    assert subnet_of("203.0.113.77") == "203.0.113.0/24"
+    assert subnet_of("2001:db8:1:2::1") == "2001:db8:1::/48"
+    assert subnet_of("testclient") == "testclient"
+    assert text_fingerprint("Refund  NOW!") == text_fingerprint("refund now")
+
+
+def test_detector_flags_distributed_floods():
+    """Repeated texts and busy subnets are caught across many IPs."""
+    detector = create_detector()
+
+    verdicts = [
+        detector.check(f"198.51.{i}.1", "Same spam text") for i in range(3)
+    ]
+    assert verdicts == [None, None, "text"]
+
+    verdicts = [
+        detector.check(f"203.0.113.{i}", f"Complaint {i}") for i in range(6)
+    ]
+    assert verdicts[-1] == "subnet"
+
+    top = detector.top_offenders(3)
+    assert top[0] == {
+        "dimension": "subnet", "key": "203.0.113.0/24", "count": 6,
+        "window_count": 6, "limit": 5, "sample": None,
+    }
+    assert detector.stats()["offenses"] == {"ip": 0, "subnet": 1, "text": 1}
+
+
+@pytest.mark.parametrize(
+    "action, status_code", [("reject", 429), ("deprioritize", 201)]
+)
+def test_offenders_skip_paid_calls(
+        create_complaints_app, monkeypatch, action, status_code
+):
+    """Offenders never reach the upstream APIs and stay throttled."""
+    monkeypatch.setattr(
+        complaints_module, "get_abuse_settings",
+        lambda: AbuseSettings(ABUSE_ACTION=action)
+    )
+    service = AsyncMock()
+    service.add_complaint.return_value = Complaint(
+        id=1, status=ComplaintStatus.OPEN,
+        sentiment=ComplaintSentiment.UNKNOWN, category=ComplaintCategory.OTHER
+    )
+    api_client = AsyncMock()
+    detector = MagicMock()
+    detector.check.return_value = "ip"
+
+    app = create_complaints_app({
+        dependencies.get_complaint_service: lambda: service,
+        dependencies.get_api_layer_client: lambda: api_client,
+        dependencies.get_hugging_face_client: lambda: api_client,
+        dependencies.get_abuse_detector: lambda: detector,
+    })
+    client = TestClient(app)
+    response = client.post("/add", json={"text": "Refund"})
+    # Offenders are throttled per IP like everyone else.
+    second = client.post("/add", json={"text": "Refund again"})
+
+    assert response.status_code == status_code
+    assert second.status_code == 429
+    assert not api_client.mock_calls
+    assert service.add_complaint.await_count == (action == "deprioritize")
@@ -0,0 +1,52 @@
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from fastapi import FastAPI
+from starlette.testclient import TestClient
+
+from src.api import admin_router
+from src.core import dependencies
+from src.core.config import AdminSettings
+from src.core.exception_handler import app_exception_handler
+from src.core.exceptions import AppException
+
+
+@pytest.fixture
+def admin_client(monkeypatch) -> TestClient:
+    monkeypatch.setattr(
+        dependencies, "get_admin_settings",
+        lambda: AdminSettings(ADMIN_TOKEN="secret")
+    )
+    service = AsyncMock()
+    service.archive_closed_complaints.return_value = 3
+    outbox = AsyncMock()
+    outbox.count_by_status.return_value = {"pending": 1}
+    shards = MagicMock()
+    shards.stats.return_value = []
+
+    app = FastAPI()
+    app.add_exception_handler(AppException, app_exception_handler)
+    app.include_router(admin_router)
+    app.dependency_overrides.update({
+        dependencies.get_complaint_service: lambda: service,
+        dependencies.get_outbox_repository: lambda: outbox,
+        dependencies.require_shards: lambda: shards,
+    })
+    return TestClient(app)
+
+
+@pytest.mark.parametrize("method, path", [
+    ("GET", "/metrics"),
+    ("POST", "/archive"),
+    ("GET", "/outbox"),
+    ("GET", "/shards"),
+])
+def test_admin_routes_require_token(admin_client, method, path):
+    """Admin routes that move data or expose internals need the token."""
+    assert admin_client.request(method, path).status_code == 403
+    assert admin_client.request(
+        method, path, headers={"X-Admin-Token": "wrong"}
+    ).status_code == 403
+    assert admin_client.request(
+        method, path, headers={"X-Admin-Token": "secret"}
+    ).status_code == 200
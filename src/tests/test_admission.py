@@ -0,0 +1,142 @@
+import asyncio
+
+import httpx
+import pytest
+from fastapi import APIRouter, FastAPI
+
+from src.core import admission as admission_module
+from src.core.admission import (
+    AdmissionController, AdmissionMiddleware, Shed, UNMATCHED, matched_route
+)
+from src.core.config import AdmissionSettings
+from src.core.metrics import metrics
+
+
+def create_settings(**overrides) -> AdmissionSettings:
+    return AdmissionSettings(**{
+        "ADMISSION_MAX_IN_FLIGHT": 2,
+        "ADMISSION_LOW_PRIORITY_SHARE": 0.5,
+        "ADMISSION_QUEUE_TIMEOUT": 1.0,
+        "ADMISSION_TARGET_DELAY": 0.01,
+        "ADMISSION_INTERVAL": 0.05,
+        **overrides,
+    })
+
+
+def test_matched_route():
+    """Requests are named after the route template of the app."""
+    router = APIRouter()
+
+    @router.get("/{complaint_id}/similar")
+    async def similar(complaint_id: int):
+        return {}
+
+    app = FastAPI()
+    app.include_router(router, prefix="/api/v1/complaints")
+
+    def scope(path: str) -> dict:
+        return {
+            "type": "http", "app": app, "method": "GET",
+            "path": path, "root_path": "",
+        }
+
+    assert matched_route(scope("/api/v1/complaints/42/similar")) == (
+        "GET /api/v1/complaints/{complaint_id}/similar"
+    )
+    assert matched_route(scope("/x1")) == UNMATCHED
+
+
+@pytest.mark.asyncio
+async def test_controller_prioritizes_and_sheds_under_overload():
+    """Reads are woken first, a standing queue turns on fast shedding."""
+    controller = AdmissionController(create_settings())
+    await controller.acquire(low=False)
+    await controller.acquire(low=False)
+
+    low = asyncio.create_task(controller.acquire(low=True))
+    high = asyncio.create_task(controller.acquire(low=False))
+    await asyncio.sleep(0.001)
+    controller.release()
+    await asyncio.sleep(0.001)
+    assert high.done() and not low.done()
+
+    await asyncio.sleep(0.06)
+    assert controller.overloaded()
+    with pytest.raises(Shed):
+        await controller.acquire(low=True)
+    with pytest.raises(Shed):
+        await controller.acquire(low=False)
+
+    # Low priority requests only get the low priority share of slots.
+    controller.release()
+    await asyncio.sleep(0.001)
+    assert not low.done()
+    controller.release()
+    assert await low > 0
+    assert controller.in_flight == 1
+    assert not controller.overloaded()
+
+
+@pytest.mark.asyncio
+async def test_middleware_rejects_with_retry_after(monkeypatch):
+    """Shed requests get 503 with Retry-After, admin routes pass."""
+    monkeypatch.setattr(
+        admission_module, "get_admission_settings",
+        lambda: create_settings(
+            ADMISSION_MAX_IN_FLIGHT=1, ADMISSION_QUEUE_TIMEOUT=0.01
+        )
+    )
+    app = FastAPI()
+    app.add_middleware(AdmissionMiddleware)
+    release = asyncio.Event()
+
+    @app.get("/slow")
+    async def slow():
+        await release.wait()
+        return {}
+
+    @app.get("/api/v1/admin/metrics")
+    async def admin():
+        return {}
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(
+            transport=transport, base_url="http://test"
+    ) as client:
+        first = asyncio.create_task(client.get("/slow"))
+        await asyncio.sleep(0.01)
+
+        rejected = await client.get("/slow")
+        assert rejected.status_code == 503
+        assert rejected.headers["Retry-After"] == "1"
+        assert rejected.json()["message"] == "Server is overloaded."
+        assert (await client.get("/api/v1/admin/metrics")).status_code == 200
+
+        release.set()
+        assert (await first).status_code == 200
+
+
+@pytest.mark.asyncio
+async def test_route_stats_are_keyed_by_matched_route(monkeypatch):
+    """Random paths share one stats entry instead of adding their own."""
+    monkeypatch.setattr(
+        admission_module, "get_admission_settings", create_settings
+    )
+    app = FastAPI()
+    app.add_middleware(AdmissionMiddleware)
+
+    @app.get("/items/{item_id}")
+    async def item(item_id: str):
+        return {}
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(
+            transport=transport, base_url="http://test"
+    ) as client:
+        for index in range(5):
+            await client.get(f"/items/x{index}")
+            await client.get(f"/x{index}")
+
+    routes = metrics.collectors["admission"]()["routes"]
+    assert routes.keys() == {"GET /items/{item_id}", UNMATCHED}
+    assert routes[UNMATCHED]["admitted"] == 5
@@ -0,0 +1,134 @@
+from datetime import datetime
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import insert
+
+from src.core.analytics import AnalyticsSnapshot, ColumnTable
+from src.core.config import DbSettings
+from src.core.database import Base, create_engine, create_session_maker
+from src.core.exceptions import ServiceUnavailable, ValidationException
+from src.models.enums import (
+    ComplaintStatus, ComplaintSentiment, ComplaintCategory
+)
+from src.models.models import Complaint, ArchivedComplaint
+from src.repositories import complaint_repository_scope
+
+OPEN, CLOSED = ComplaintStatus.OPEN, ComplaintStatus.CLOSED
+NEGATIVE = ComplaintSentiment.NEGATIVE
+PAYMENT, TECHNICAL = ComplaintCategory.PAYMENT, ComplaintCategory.TECHNICAL
+
+ROWS = [
+    # (timestamp, status, sentiment, category), 2025-07-07 was a Monday
+    (datetime(2025, 7, 7, 10), OPEN, NEGATIVE, PAYMENT),
+    (datetime(2025, 7, 7, 11), CLOSED, NEGATIVE, PAYMENT),
+    (datetime(2025, 7, 8, 12), OPEN, None, TECHNICAL),
+    (datetime(2025, 8, 1, 9), CLOSED, NEGATIVE, PAYMENT),
+    (datetime(2025, 10, 1, 9), OPEN, NEGATIVE, PAYMENT),
+]
+
+
+@pytest_asyncio.fixture
+async def session_maker(tmp_path):
+    database = tmp_path / "database.sqlite"
+    engine = create_engine(DbSettings(
+        DB_URL=f"sqlite+aiosqlite:///{database}",
+        DB_URL_SYNC=f"sqlite:///{database}"
+    ))
+    async with engine.begin() as connection:
+        await connection.run_sync(Base.metadata.create_all)
+        # Inserted out of time order, the last one is archived.
+        for model, rows in (
+                (Complaint, reversed(ROWS[:4])), (ArchivedComplaint, ROWS[4:])
+        ):
+            await connection.execute(insert(model), [
+                {
+                    "text": "text",
+                    "timestamp": timestamp,
+                    "status": complaint_status,
+                    "sentiment": sentiment,
+                    "category": category,
+                }
+                for timestamp, complaint_status, sentiment, category in rows
+            ])
+    yield create_session_maker(engine)
+    await engine.dispose()
+
+
+@pytest_asyncio.fixture
+async def snapshot(session_maker, tmp_path):
+    snapshot = AnalyticsSnapshot(tmp_path / "analytics.snapshot", 2)
+    await snapshot.refresh(complaint_repository_scope(session_maker))
+    return snapshot
+
+
+@pytest.mark.asyncio
+async def test_refresh_reads_hot_and_archived_rows(snapshot):
+    """Rows of both tables are loaded in timestamp order."""
+    table = snapshot.table
+
+    assert len(table) == 5
+    assert list(table.timestamps) == sorted(table.timestamps)
+    assert snapshot.count({})["count"] == 5
+
+
+@pytest.mark.asyncio
+async def test_count_filters_and_time_range(snapshot):
+    """Enum filters combine with AND, values of one filter with OR."""
+    table = snapshot.table
+
+    assert table.count({"category": [PAYMENT], "sentiment": [NEGATIVE]}) == (
+        4, None
+    )
+    assert table.count(
+        {"status": [OPEN, CLOSED], "sentiment": [NEGATIVE]},
+        start=datetime(2025, 7, 1), end=datetime(2025, 9, 30)
+    )[0] == 3
+    assert table.count({"sentiment": [ComplaintSentiment.POSITIVE]})[0] == 0
+    assert table.count({}, start=datetime(2026, 1, 1))[0] == 0
+
+
+@pytest.mark.asyncio
+async def test_count_group_by(snapshot, monkeypatch):
+    """Groups by enum, derived and time bucket columns."""
+    table = snapshot.table
+
+    assert table.count({}, group_by="sentiment")[1] == {
+        "negative": 4, "none": 1
+    }
+    assert table.count({"category": [PAYMENT]}, group_by="weekday")[1] == {
+        "monday": 2, "friday": 1, "wednesday": 1
+    }
+    assert table.count({}, group_by="hour")[1] == {
+        "09": 2, "10": 1, "11": 1, "12": 1
+    }
+    assert table.count({"status": [OPEN]}, group_by="month")[1] == {
+        "2025-07": 2, "2025-08": 0, "2025-09": 0, "2025-10": 1
+    }
+    assert table.count(
+        {}, start=datetime(2025, 7, 7), end=datetime(2025, 7, 8, 23),
+        group_by="day"
+    )[1] == {"2025-07-07": 2, "2025-07-08": 1}
+
+    monkeypatch.setattr("src.core.analytics.MAX_TIME_BUCKETS", 30)
+    with pytest.raises(ValidationException):
+        table.count({}, group_by="day")
+
+
+@pytest.mark.asyncio
+async def test_snapshot_file_round_trip(snapshot):
+    """The saved snapshot is loaded as is."""
+    loaded = ColumnTable.load(snapshot.path)
+
+    assert list(loaded.timestamps) == list(snapshot.table.timestamps)
+    assert loaded.columns == snapshot.table.columns
+    assert loaded.built_at == snapshot.table.built_at
+
+
+def test_count_without_snapshot(tmp_path):
+    """Queries fail with 503 until a snapshot exists."""
+    snapshot = AnalyticsSnapshot(tmp_path / "missing.snapshot")
+    snapshot.load()
+
+    with pytest.raises(ServiceUnavailable):
+        snapshot.count({})
@@ -0,0 +1,103 @@
+import asyncio
+
+import pytest
+
+from src.core.cache import QueryCache
+
+
+@pytest.mark.asyncio
+async def test_cache_hit_after_miss():
+    """Second read is served from the cache."""
+    cache = QueryCache()
+    calls = 0
+
+    async def loader():
+        nonlocal calls
+        calls += 1
+        return [1, 2]
+
+    assert await cache.get_or_load("key", loader) == [1, 2]
+    assert await cache.get_or_load("key", loader) == [1, 2]
+    assert calls == 1
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+@pytest.mark.asyncio
+async def test_cache_invalidate():
+    """Generation bump makes entries stale."""
+    cache = QueryCache()
+    values = iter(["old", "new"])
+
+    async def loader():
+        return next(values)
+
+    assert await cache.get_or_load("key", loader) == "old"
+    cache.invalidate()
+    assert await cache.get_or_load("key", loader) == "new"
+
+
+@pytest.mark.asyncio
+async def test_cache_lru_eviction():
+    """Least recently used entry is evicted."""
+    cache = QueryCache(max_size=2)
+
+    async def loader():
+        return "value"
+
+    await cache.get_or_load("a", loader)
+    await cache.get_or_load("b", loader)
+    await cache.get_or_load("a", loader)
+    await cache.get_or_load("c", loader)
+
+    assert cache.stats()["evictions"] == 1
+    assert cache.stats()["size"] == 2
+    await cache.get_or_load("a", loader)
+    assert cache.stats()["hits"] == 2
+
+
+@pytest.mark.asyncio
+async def test_cache_coalesces_concurrent_loads():
+    """Concurrent identical queries run once."""
+    cache = QueryCache()
+    calls = 0
+
+    async def loader():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return "value"
+
+    results = await asyncio.gather(
+        *(cache.get_or_load("key", loader) for _ in range(5))
+    )
+
+    assert results == ["value"] * 5
+    assert calls == 1
+    assert cache.stats()["coalesced"] == 4
+
+
+@pytest.mark.asyncio
+async def test_cache_write_during_load_is_not_cached():
+    """Result loaded before a write is not stored."""
+    cache = QueryCache()
+
+    async def loader():
+        cache.invalidate()
+        return "stale"
+
+    await cache.get_or_load("key", loader)
+    assert cache.stats()["size"] == 0
+
+
+@pytest.mark.asyncio
+async def test_cache_loader_error_is_not_cached():
+    """Loader errors are propagated and not cached."""
+    cache = QueryCache()
+
+    async def loader():
+        raise ValueError("fail")
+
+    with pytest.raises(ValueError):
+        await cache.get_or_load("key", loader)
+    assert cache.stats()["size"] == 0
@@ -0,0 +1,96 @@
+import gzip
+
+from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from starlette.testclient import TestClient
+
+from src.core import compression as compression_module
+from src.core.compression import CompressionMiddleware, negotiate
+from src.core.config import CompressionSettings
+
+
+BODY = "complaint text " * 200
+
+
+def create_compressed_app(monkeypatch):
+    monkeypatch.setattr(
+        compression_module, "get_compression_settings",
+        lambda: CompressionSettings(COMPRESSION_MIN_SIZE=500)
+    )
+    app = FastAPI()
+    app.add_middleware(CompressionMiddleware)
+
+    @app.get("/small")
+    async def small():
+        return PlainTextResponse("short")
+
+    @app.get("/large")
+    async def large():
+        return PlainTextResponse(BODY)
+
+    @app.get("/private")
+    async def private():
+        return PlainTextResponse(BODY, headers={"Cache-Control": "no-store"})
+
+    @app.get("/stream")
+    async def stream():
+        async def chunks():
+            for _ in range(3):
+                yield BODY
+        return StreamingResponse(chunks(), media_type="text/plain")
+
+    return app
+
+
+def test_negotiate():
+    """The highest q-value wins, ties go to the server preference."""
+    assert negotiate("gzip, br", ["zstd", "br", "gzip"]) == "br"
+    assert negotiate("br;q=0.5, gzip", ["br", "gzip"]) == "gzip"
+    assert negotiate("*", ["br", "gzip"]) == "br"
+    assert negotiate("gzip;q=0, identity", ["gzip"]) is None
+    assert negotiate("", ["gzip"]) is None
+
+
+def test_compression_threshold(monkeypatch):
+    """Only bodies above the threshold are compressed."""
+    with TestClient(create_compressed_app(monkeypatch)) as client:
+        small = client.get("/small", headers={"Accept-Encoding": "gzip"})
+        large = client.get("/large", headers={"Accept-Encoding": "gzip"})
+        identity = client.get(
+            "/large", headers={"Accept-Encoding": "identity"}
+        )
+
+    assert "content-encoding" not in small.headers
+    assert large.headers["content-encoding"] == "gzip"
+    assert large.headers["vary"] == "Accept-Encoding"
+    assert int(large.headers["content-length"]) < len(BODY)
+    assert large.text == BODY
+    assert "content-encoding" not in identity.headers
+
+
+def test_compressed_body_cache(monkeypatch):
+    """A hot payload is compressed once, no-store responses every time."""
+    app = create_compressed_app(monkeypatch)
+    headers = {"Accept-Encoding": "gzip"}
+
+    with TestClient(app) as client:
+        for path in ("/large", "/large", "/private", "/private"):
+            assert client.get(path, headers=headers).text == BODY
+        stats = app.middleware_stack.app.stats()
+
+    assert stats["responses"] == 4
+    assert stats["cache_hits"] == 1
+    assert stats["cache_size"] == 1
+
+
+def test_streaming_compression(monkeypatch):
+    """Streaming responses are compressed chunk by chunk."""
+    with TestClient(create_compressed_app(monkeypatch)) as client:
+        with client.stream(
+                "GET", "/stream", headers={"Accept-Encoding": "gzip"}
+        ) as response:
+            raw = b"".join(response.iter_raw())
+
+    assert response.headers["content-encoding"] == "gzip"
+    assert "content-length" not in response.headers
+    assert gzip.decompress(raw).decode() == BODY * 3
@@ -0,0 +1,93 @@
+import asyncio
+
+import pytest
+
+from src.core.concurrency import AdaptiveLimiter
+from src.core.exceptions import UpstreamOverloaded, APIError
+from src.core.external_api import ExternalAPIClient
+
+
+async def hold(limiter: AdaptiveLimiter, seconds: float) -> None:
+    async with limiter.slot():
+        await asyncio.sleep(seconds)
+
+
+@pytest.mark.asyncio
+async def test_limiter_queues_and_rejects():
+    """Requests over the limit wait, then are rejected after the timeout."""
+    limiter = AdaptiveLimiter(
+        "test", initial_limit=1, max_limit=1, queue_timeout=0.05
+    )
+
+    first = asyncio.create_task(hold(limiter, 0.02))
+    await asyncio.sleep(0)
+    await hold(limiter, 0)
+    await first
+    assert limiter.stats()["queued"] == 1
+
+    blocking = asyncio.create_task(hold(limiter, 0.2))
+    await asyncio.sleep(0)
+    with pytest.raises(UpstreamOverloaded):
+        await hold(limiter, 0)
+    await blocking
+
+    assert limiter.stats()["rejected"] == 1
+    assert limiter.stats()["in_flight"] == 0
+    assert limiter.stats()["waiting"] == 0
+
+
+@pytest.mark.asyncio
+async def test_limiter_decreases_on_errors_and_recovers():
+    """Errors shrink the limit multiplicatively, successes grow it back."""
+    limiter = AdaptiveLimiter("test", initial_limit=10, backoff_ratio=0.5)
+
+    async with limiter.slot():
+        pass
+    with pytest.raises(RuntimeError):
+        async with limiter.slot():
+            raise RuntimeError("timeout")
+    assert limiter.limit == 5
+
+    async with limiter.slot() as slot:
+        slot.record(503)
+    assert limiter.limit == 5, "one decrease per baseline latency"
+
+    for _ in range(20):
+        await asyncio.gather(*(hold(limiter, 0) for _ in range(5)))
+    assert limiter.limit > 5
+
+
+@pytest.mark.asyncio
+async def test_limiter_decreases_on_latency_growth():
+    """Latency above the baseline times tolerance counts as overload."""
+    limiter = AdaptiveLimiter("test", initial_limit=10, tolerance=2.0)
+
+    await hold(limiter, 0.01)
+    await hold(limiter, 0.06)
+
+    assert limiter.limit == 9
+    assert limiter.stats()["overloads"] == 1
+
+
+@pytest.mark.asyncio
+async def test_client_reports_upstream_status(httpx_mock):
+    """5xx answers are overloads, 4xx are not, rejections are not retried."""
+    httpx_mock.add_response(url="http://test.com/bad", status_code=400)
+    httpx_mock.add_response(
+        url="http://test.com/down", status_code=503, is_reusable=True
+    )
+    limiter = AdaptiveLimiter("test", initial_limit=10, backoff_ratio=0.5)
+    client = ExternalAPIClient(base_url="http://test.com", limiter=limiter)
+    client.retries = 1
+
+    with pytest.raises(APIError):
+        await client.get("/bad")
+    assert limiter.limit == 10
+
+    with pytest.raises(APIError):
+        await client.get("/down")
+    assert limiter.limit == 5
+
+    limiter.limit = 0.5
+    with pytest.raises(UpstreamOverloaded):
+        await client.get("/down")
@@ -0,0 +1,140 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+from fastapi import FastAPI
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+from src.core import deadline
+from src.core.config import DbSettings, DeadlineSettings
+from src.core.database import create_engine
+from src.core.deadline import DeadlineMiddleware
+from src.core.exceptions import APIError, DeadlineExceeded
+from src.core.external_api import ExternalAPIClient
+
+
+def create_app(monkeypatch, cancelled: list[str]) -> FastAPI:
+    monkeypatch.setattr(
+        deadline, "get_deadline_settings",
+        lambda: DeadlineSettings(
+            DEADLINE_DEFAULT=5, DEADLINE_MAX=5,
+            DEADLINE_ROUTE_DEFAULTS={"GET /items/{item_id}": 0.05}
+        )
+    )
+    app = FastAPI()
+    app.add_middleware(DeadlineMiddleware)
+
+    @app.get("/slow")
+    async def slow():
+        try:
+            await asyncio.sleep(1)
+        except asyncio.CancelledError:
+            cancelled.append("slow")
+            raise
+        return {}
+
+    @app.get("/items/{item_id}")
+    async def item(item_id: int):
+        await asyncio.sleep(1)
+        return {}
+
+    @app.get("/remaining")
+    async def left():
+        return {"remaining": deadline.remaining()}
+
+    return app
+
+
+@pytest.mark.asyncio
+async def test_deadline_from_header_and_route_default(monkeypatch):
+    """Requests past their deadline are cancelled and get 504."""
+    cancelled = []
+    transport = httpx.ASGITransport(app=create_app(monkeypatch, cancelled))
+    async with httpx.AsyncClient(
+            transport=transport, base_url="http://test"
+    ) as client:
+        response = await client.get(
+            "/slow", headers={"X-Request-Timeout": "0.05"}
+        )
+        assert response.status_code == 504
+        assert cancelled == ["slow"]
+
+        assert (await client.get("/items/1")).status_code == 504
+
+        response = await client.get(
+            "/remaining", headers={"X-Request-Timeout": "30"}
+        )
+        assert 4 < response.json()["remaining"] <= 5
+
+
+@pytest.mark.asyncio
+async def test_client_disconnect_cancels_request(monkeypatch):
+    """A request is cancelled as soon as its client goes away."""
+    cancelled, sent = [], []
+    app = create_app(monkeypatch, cancelled)
+    messages = [{"type": "http.request", "body": b"", "more_body": False}]
+
+    async def receive():
+        if messages:
+            return messages.pop()
+        await asyncio.sleep(0.05)
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        sent.append(message)
+
+    started = time.monotonic()
+    await app({
+        "type": "http", "method": "GET", "path": "/slow", "headers": [],
+        "query_string": b"", "http_version": "1.1", "scheme": "http",
+        "server": ("test", 80), "client": ("127.0.0.1", 1), "root_path": "",
+    }, receive, send)
+
+    assert time.monotonic() - started < 0.5
+    assert cancelled == ["slow"]
+    assert sent == []
+
+
+@pytest.mark.asyncio
+async def test_external_api_respects_deadline(httpx_mock):
+    """No retry is started when it can't finish before the deadline."""
+    httpx_mock.add_response(url="http://test.com/endpoint", status_code=500)
+    client = ExternalAPIClient(base_url="http://test.com")
+
+    deadline.set_deadline(0.5)
+    started = time.monotonic()
+    with pytest.raises(APIError):
+        await client.get("/endpoint")
+    assert time.monotonic() - started < 0.5
+    assert len(httpx_mock.get_requests()) == 1
+
+    deadline.set_deadline(0)
+    with pytest.raises(DeadlineExceeded):
+        await client.get("/endpoint")
+    deadline.set_deadline(None)
+
+
+@pytest.mark.asyncio
+async def test_statement_is_aborted_at_deadline(tmp_path):
+    """A long SQLite statement stops once the deadline passes."""
+    database = tmp_path / "database.sqlite"
+    engine = create_engine(DbSettings(
+        DB_URL=f"sqlite+aiosqlite:///{database}",
+        DB_URL_SYNC=f"sqlite:///{database}"
+    ))
+    endless = text(
+        "WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n) "
+        "SELECT count(*) FROM n"
+    )
+    async with engine.connect() as connection:
+        deadline.set_deadline(0.05)
+        started = time.monotonic()
+        with pytest.raises(OperationalError, match="interrupted"):
+            await connection.execute(endless)
+        assert time.monotonic() - started < 1
+
+        deadline.set_deadline(None)
+        assert (await connection.execute(text("SELECT 1"))).scalar() == 1
+    await engine.dispose()
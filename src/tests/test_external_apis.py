@@ -1,11 +1,22 @@
+import asyncio
+import json
+from unittest.mock import AsyncMock
+
 import pytest
+from pytest_httpx import IteratorStream
 
-from src.core.config import api_settings
-from src.core.dependencies import (
-    get_hugging_face_client, get_ip_api_client, get_api_layer_client
+from src.api.routers.complaints import find_category, get_complaint_category
+from src.core.config import get_api_settings
+from src.core.external_api import (
+    ExternalAPIClient, create_hugging_face_client, create_ip_api_client,
+    create_api_layer_client
 )
-from src.core.external_api import ExternalAPIClient
 from src.core.exceptions import APIError
+from src.core.ip_info import IPInfoResolver
+from src.models.enums import ComplaintCategory
+
+
+api_settings = get_api_settings()
 
 
 @pytest.mark.asyncio
@@ -63,8 +74,8 @@ async def test_client_failure(httpx_mock):
 
 
 @pytest.mark.asyncio
-async def test_huggingface_dependency(httpx_mock):
-    """Test HuggingFace client dependency with proper async handling"""
+async def test_huggingface_client(httpx_mock):
+    """Test HuggingFace client is created with auth headers."""
     httpx_mock.add_response(
         url=f"{api_settings.OPEN_ROUTER_BASE_URL}endpoint",
         headers={
@@ -73,10 +84,7 @@ async def test_huggingface_dependency(httpx_mock):
         json={"result": "ok"}
     )
 
-    client_gen = get_hugging_face_client()
-
-    try:
-        client = await client_gen.__anext__()
+    async with create_hugging_face_client(api_settings) as client:
         response = await client.get("/endpoint")
         assert response == {"result": "ok"}
 
@@ -84,37 +92,27 @@ async def test_huggingface_dependency(httpx_mock):
         assert request.headers[
                    "Authorization"
                ] == f"Bearer {api_settings.OPEN_ROUTER_API_KEY}"
-    finally:
-        with pytest.raises(StopAsyncIteration):
-            await client_gen.__anext__()
 
 
 @pytest.mark.asyncio
-async def test_ip_api_dependency(httpx_mock):
-    """Test Api IP client dependency with proper async handling"""
+async def test_ip_api_client(httpx_mock):
+    """Test Api IP client is created with base url."""
     httpx_mock.add_response(
         url=f"{api_settings.IP_API_BASE_URL}endpoint",
         json={"result": "ok"}
     )
 
-    client_gen = get_ip_api_client()
-
-    try:
-        client = await client_gen.__anext__()
+    async with create_ip_api_client(api_settings) as client:
         response = await client.get("/endpoint")
         assert response == {"result": "ok"}
 
         request = httpx_mock.get_requests()[0]
-        print(request.url)
-        assert request.url == "https://ip-api.com/endpoint"
-    finally:
-        with pytest.raises(StopAsyncIteration):
-            await client_gen.__anext__()
+        assert request.url == f"{api_settings.IP_API_BASE_URL}endpoint"
 
 
 @pytest.mark.asyncio
-async def test_api_layer_dependency(httpx_mock):
-    """Test ApiLayer client dependency with proper async handling"""
+async def test_api_layer_client(httpx_mock):
+    """Test ApiLayer client is created with api key."""
     httpx_mock.add_response(
         url=f"{api_settings.SENTIMENT_ANALYSIS_BASE_URL}endpoint",
         headers={
@@ -123,10 +121,7 @@ async def test_api_layer_dependency(httpx_mock):
         json={"result": "ok"}
     )
 
-    client_gen = get_api_layer_client()
-
-    try:
-        client = await client_gen.__anext__()
+    async with create_api_layer_client(api_settings) as client:
         response = await client.get("/endpoint")
         assert response == {"result": "ok"}
 
@@ -134,6 +129,151 @@ async def test_api_layer_dependency(httpx_mock):
         assert request.headers[
                    "apikey"
                ] == api_settings.SENTIMENT_ANALYSIS_API_KEY
-    finally:
-        with pytest.raises(StopAsyncIteration):
-            await client_gen.__anext__()
+
+
+@pytest.mark.asyncio
+async def test_client_is_reusable(httpx_mock):
+    """Pooled client serves many requests."""
+    httpx_mock.add_response(
+        url="http://test.com/endpoint",
+        json={"key": "value"},
+        is_reusable=True
+    )
+
+    async with ExternalAPIClient(base_url="http://test.com") as client:
+        for _ in range(3):
+            assert await client.get("/endpoint") == {"key": "value"}
+
+
+@pytest.mark.asyncio
+async def test_ip_info_batches_and_caches(httpx_mock):
+    """Close lookups share one /batch request, repeats hit the cache."""
+    httpx_mock.add_response(
+        url="http://test.com/batch",
+        json=[
+            {"query": "1.1.1.1", "status": "success", "country": "AU"},
+            {"query": "10.0.0.1", "status": "fail"},
+        ]
+    )
+    resolver = IPInfoResolver(
+        client=ExternalAPIClient(base_url="http://test.com"),
+        batch_window=0.01
+    )
+
+    first, private, duplicate = await asyncio.gather(
+        resolver.lookup("1.1.1.1"),
+        resolver.lookup("10.0.0.1"),
+        resolver.lookup("1.1.1.1"),
+    )
+
+    assert first["country"] == "AU"
+    assert duplicate is first
+    assert private is None
+    assert await resolver.lookup("10.0.0.1") is None
+    assert len(httpx_mock.get_requests()) == 1
+    assert resolver.stats()["hits"] == 1
+
+
+@pytest.mark.asyncio
+async def test_ip_info_batch_failure_resolves_waiters():
+    """Any failure of the batch request resolves its waiters to None."""
+    client = AsyncMock()
+    client.post.side_effect = ValueError("Expecting value")
+    resolver = IPInfoResolver(client=client, batch_window=0.01)
+
+    results = await asyncio.wait_for(
+        asyncio.gather(
+            resolver.lookup("1.1.1.1"), resolver.lookup("8.8.8.8")
+        ),
+        timeout=1
+    )
+
+    assert results == [None, None]
+    assert resolver.stats()["pending"] == 0
+
+
+@pytest.mark.asyncio
+async def test_ip_info_submit_runs_in_background(httpx_mock):
+    """Submit returns immediately, lookup runs as a task."""
+    httpx_mock.add_response(
+        url="http://test.com/batch",
+        json=[{"query": "1.1.1.1", "status": "success"}]
+    )
+    resolver = IPInfoResolver(
+        client=ExternalAPIClient(base_url="http://test.com"),
+        batch_window=0.01
+    )
+
+    resolver.submit("1.1.1.1")
+    assert resolver.stats()["size"] == 0
+
+    await asyncio.gather(*resolver._background)
+    assert resolver.stats()["size"] == 1
+
+
+def completion_stream(*tokens: str) -> IteratorStream:
+    return IteratorStream([
+        *(
+            f"data: {json.dumps({'choices': [{'text': token}]})}\n\n".encode()
+            for token in tokens
+        ),
+        b"data: [DONE]\n\n",
+    ])
+
+
+def test_find_category():
+    """Only complete words are matched until the generation is over."""
+    assert find_category(" pay") is None
+    assert find_category(" payment") is None
+    assert find_category(" payment", final=True) == ComplaintCategory.PAYMENT
+    assert find_category("Category: technical.") == (
+        ComplaintCategory.TECHNICAL
+    )
+    assert find_category("neutral\n") is None
+
+
+@pytest.mark.asyncio
+async def test_complaint_category_stops_early(httpx_mock):
+    """The stream is closed once the category word is complete."""
+    sent = []
+
+    def tokens():
+        for token in (" pay", "ment", "\n", " because", " money"):
+            sent.append(token)
+            yield (
+                f"data: {json.dumps({'choices': [{'text': token}]})}\n\n"
+            ).encode()
+
+    httpx_mock.add_response(
+        url="http://test.com/api/v1/completions",
+        stream=IteratorStream(tokens())
+    )
+    client = ExternalAPIClient(base_url="http://test.com")
+
+    category = await get_complaint_category("  Refund   me ", client)
+
+    assert category == ComplaintCategory.PAYMENT
+    assert sent == [" pay", "ment", "\n"]
+    body = json.loads(httpx_mock.get_requests()[0].read())
+    assert body["stream"] is True
+    assert body["max_tokens"] == 5
+    assert "Refund me." in body["prompt"]
+
+
+@pytest.mark.asyncio
+async def test_complaint_category_at_stream_end(httpx_mock):
+    """A category ending the stream is found, a failure returns None."""
+    httpx_mock.add_response(
+        url="http://test.com/api/v1/completions",
+        stream=completion_stream(" other")
+    )
+    httpx_mock.add_response(
+        url="http://test.com/api/v1/completions",
+        status_code=500
+    )
+    client = ExternalAPIClient(base_url="http://test.com")
+
+    assert await get_complaint_category("text", client) == (
+        ComplaintCategory.OTHER
+    )
+    assert await get_complaint_category("text", client) is None
@@ -0,0 +1,123 @@
+import asyncio
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from starlette.testclient import TestClient
+
+from src.core import dependencies
+from src.core.exceptions import ConflictException, TooManyRequests
+from src.core.idempotency import IdempotencyStore
+from src.models.enums import (
+    ComplaintStatus, ComplaintSentiment, ComplaintCategory
+)
+from src.models.models import Complaint
+
+
+@pytest.mark.asyncio
+async def test_idempotency_replays_result():
+    """The call runs once, later duplicates replay its result."""
+    store = IdempotencyStore()
+    call = AsyncMock(return_value="created")
+
+    first = await store.run("key", "body", call)
+    second = await store.run("key", "body", call)
+
+    assert first == ("created", False)
+    assert second == ("created", True)
+    call.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_idempotency_concurrent_duplicates_wait():
+    """Concurrent duplicates wait for the first execution."""
+    store = IdempotencyStore()
+    calls = 0
+
+    async def call():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return calls
+
+    results = await asyncio.gather(
+        *(store.run("key", "body", call) for _ in range(5))
+    )
+
+    assert calls == 1
+    assert [result for result, _ in results] == [1] * 5
+    assert store.stats()["waited"] == 4
+
+
+@pytest.mark.asyncio
+async def test_idempotency_conflict_and_failure():
+    """Key reuse with another body is rejected, failures are not stored."""
+    store = IdempotencyStore()
+    await store.run("key", "body", AsyncMock(return_value=1))
+
+    with pytest.raises(ConflictException):
+        await store.run("key", "other body", AsyncMock())
+
+    with pytest.raises(TooManyRequests):
+        await store.run("failed", "body", AsyncMock(
+            side_effect=TooManyRequests()
+        ))
+    assert await store.run("failed", "body", AsyncMock(return_value=2)) == (
+        2, False
+    )
+
+
+@pytest.mark.asyncio
+async def test_idempotency_ttl_and_size():
+    """Entries expire after the TTL and the store is bounded."""
+    store = IdempotencyStore(ttl=0, max_size=2)
+    call = AsyncMock(return_value=1)
+
+    await store.run("key", "body", call)
+    await store.run("key", "body", call)
+    assert call.await_count == 2
+
+    store.ttl = 60
+    for key in ("a", "b", "c"):
+        await store.run(key, "body", call)
+    assert store.stats()["size"] == 2
+    assert store.stats()["evictions"] >= 1
+
+
+def test_add_complaint_with_idempotency_key(create_complaints_app):
+    """A retried request replays the response without a second insert."""
+    service = AsyncMock()
+    service.add_complaint.return_value = Complaint(
+        id=1,
+        status=ComplaintStatus.OPEN,
+        sentiment=ComplaintSentiment.NEGATIVE,
+        category=ComplaintCategory.PAYMENT
+    )
+    api_client = AsyncMock()
+    api_client.post.return_value = {"sentiment": "negative"}
+
+    async def completion(*args, **kwargs):
+        yield 'data: {"choices": [{"text": "payment\\n"}]}'
+
+    hugging_face_client = MagicMock()
+    hugging_face_client.stream_lines = completion
+    store = IdempotencyStore()
+
+    app = create_complaints_app({
+        dependencies.get_complaint_service: lambda: service,
+        dependencies.get_api_layer_client: lambda: api_client,
+        dependencies.get_hugging_face_client: lambda: hugging_face_client,
+        dependencies.get_idempotency_store: lambda: store,
+    })
+    client = TestClient(app)
+    headers = {"Idempotency-Key": "4f1c7c9e"}
+
+    first = client.post("/add", json={"text": "Refund"}, headers=headers)
+    second = client.post("/add", json={"text": "Refund"}, headers=headers)
+    other = client.post("/add", json={"text": "Other"}, headers=headers)
+
+    assert first.status_code == second.status_code == 201
+    assert first.json() == second.json()
+    assert "idempotent-replayed" not in first.headers
+    assert second.headers["idempotent-replayed"] == "true"
+    assert other.status_code == 409
+    service.add_complaint.assert_awaited_once()
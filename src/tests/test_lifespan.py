@@ -0,0 +1,30 @@
+from fastapi import FastAPI
+from starlette.testclient import TestClient
+
+from src.core import lifespan as lifespan_module
+from src.core.config import DbSettings
+from src.core.lifespan import lifespan
+
+
+def test_lifespan_builds_state(monkeypatch, tmp_path):
+    """Resources are built on startup and the breakdown is recorded."""
+    database = tmp_path / "database.sqlite"
+    monkeypatch.setattr(
+        lifespan_module, "get_db_settings",
+        lambda: DbSettings(
+            DB_URL=f"sqlite+aiosqlite:///{database}",
+            DB_URL_SYNC=f"sqlite:///{database}"
+        )
+    )
+    app = FastAPI(lifespan=lifespan)
+
+    with TestClient(app):
+        assert app.state.session_maker is not None
+        assert app.state.ip_info_resolver.client is app.state.ip_api_client
+        phases = app.state.startup.snapshot()["phases_ms"]
+        assert list(phases) == [
+            "settings", "database", "http_clients", "caches", "warm_up",
+            "background"
+        ]
+
+    assert app.state.api_layer_client.client.is_closed
@@ -0,0 +1,47 @@
+import asyncio
+import time
+
+import pytest
+
+from src.core.loop_monitor import LoopMonitor
+
+
+def busy_wait(seconds: float) -> None:
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        pass
+
+
+@pytest.mark.asyncio
+async def test_blocking_callback_is_caught_with_stack():
+    """A callback blocking the loop is reported with its stack."""
+    monitor = LoopMonitor(interval=0.01, threshold=0.05)
+    monitor.start()
+    await asyncio.sleep(0.05)
+
+    busy_wait(0.2)
+    await asyncio.sleep(0.05)
+    await monitor.close()
+
+    stats = monitor.stats()
+    assert stats["stalls"] == 1
+    assert stats["lag_max_ms"] >= 150
+    stall = stats["recent_stalls"][0]
+    assert "busy_wait" in stall["stack"]
+    assert "test_blocking_callback_is_caught_with_stack" in stall["stack"]
+
+
+def test_lag_histogram_and_percentiles():
+    """Lags are bucketed, only those above the threshold are stalls."""
+    monitor = LoopMonitor(threshold=0.1)
+    for lag in [0.0005] * 98 + [0.03, 0.3]:
+        monitor.record(lag)
+
+    stats = monitor.stats()
+    assert stats["samples"] == 100
+    assert stats["histogram_ms"]["le_1"] == 98
+    assert stats["histogram_ms"]["le_50"] == 1
+    assert stats["lag_p50_ms"] == 1
+    assert stats["lag_p99_ms"] == 50
+    assert stats["stalls"] == 1
+    assert stats["recent_stalls"][0]["stack"] is None
@@ -0,0 +1,158 @@
+from datetime import timedelta
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import select
+
+from src.core.config import DbSettings, OutboxSettings
+from src.core.database import Base, create_engine, create_session_maker
+from src.core.external_api import ExternalAPIClient
+from src.core.outbox import OutboxDispatcher, utcnow
+from src.models.enums import OutboxStatus
+from src.models.models import OutboxEvent
+from src.models.schemas import ComplaintCreate, ComplaintUpdate
+from src.repositories import ComplaintRepository, OutboxRepository
+from src.repositories import outbox_repository as outbox_module
+
+
+WEBHOOK = "http://n8n.test/webhook/complaints"
+
+
+@pytest.fixture
+def outbox_settings(monkeypatch):
+    settings = OutboxSettings(
+        OUTBOX_WEBHOOK_URLS=WEBHOOK,
+        OUTBOX_WEBHOOK_BATCH_SIZE=2,
+        OUTBOX_MAX_ATTEMPTS=2
+    )
+    monkeypatch.setattr(outbox_module, "get_outbox_settings", lambda: settings)
+    return settings
+
+
+@pytest_asyncio.fixture
+async def session_maker(tmp_path):
+    database = tmp_path / "database.sqlite"
+    engine = create_engine(DbSettings(
+        DB_URL=f"sqlite+aiosqlite:///{database}",
+        DB_URL_SYNC=f"sqlite:///{database}"
+    ))
+    async with engine.begin() as connection:
+        await connection.run_sync(Base.metadata.create_all)
+    yield create_session_maker(engine)
+    await engine.dispose()
+
+
+async def get_events(session_maker) -> list[OutboxEvent]:
+    async with session_maker() as session:
+        result = await session.execute(
+            select(OutboxEvent).order_by(OutboxEvent.id)
+        )
+        return list(result.scalars().all())
+
+
+async def add_complaints(session_maker, count: int) -> None:
+    async with session_maker() as session:
+        repository = ComplaintRepository(session)
+        for i in range(count):
+            await repository.create_complaint(
+                ComplaintCreate(text=f"Complaint {i}")
+            )
+
+
+@pytest.mark.asyncio
+async def test_complaint_changes_write_outbox_events(
+        session_maker, outbox_settings
+):
+    """Create and update write an event in the same transaction."""
+    async with session_maker() as session:
+        repository = ComplaintRepository(session)
+        complaint = await repository.create_complaint(
+            ComplaintCreate(text="Payment failed")
+        )
+        await repository.update_complaint(
+            ComplaintUpdate(id=complaint.id, text="Payment failed twice")
+        )
+
+    created, updated = await get_events(session_maker)
+    assert created.event_type == "complaint.created"
+    assert created.endpoint == WEBHOOK
+    assert created.payload["id"] == complaint.id
+    assert created.payload["status"] == "open"
+    assert updated.event_type == "complaint.updated"
+    assert updated.payload["text"] == "Payment failed twice"
+    assert updated.status == OutboxStatus.PENDING
+
+
+@pytest.mark.asyncio
+async def test_claim_due_leases_events(session_maker, outbox_settings):
+    """Claimed events are not claimed again until the lease expires."""
+    await add_complaints(session_maker, 3)
+    now = utcnow()
+
+    async with session_maker() as session:
+        repository = OutboxRepository(session)
+        lease = timedelta(seconds=60)
+        first = await repository.claim_due(now, 2, now + lease)
+        second = await repository.claim_due(now, 10, now + lease)
+        expired = await repository.claim_due(
+            now + 2 * lease, 10, now + 3 * lease
+        )
+
+    assert [event.id for event in first] == [1, 2]
+    assert [event.id for event in second] == [3]
+    assert [event.id for event in expired] == [1, 2, 3]
+
+
+@pytest.mark.asyncio
+async def test_dispatcher_delivers_batches(
+        session_maker, outbox_settings, httpx_mock
+):
+    """Events are posted in batches and marked as sent."""
+    httpx_mock.add_response(
+        method="POST", url=WEBHOOK, json={"ok": True}, is_reusable=True
+    )
+    await add_complaints(session_maker, 3)
+
+    async with ExternalAPIClient(base_url="") as client:
+        dispatcher = OutboxDispatcher(session_maker, client, outbox_settings)
+        assert await dispatcher.dispatch_once() == 3
+        assert await dispatcher.dispatch_once() == 0
+
+    batches = [request.read() for request in httpx_mock.get_requests()]
+    assert len(batches) == 2
+    events = await get_events(session_maker)
+    assert {event.status for event in events} == {OutboxStatus.SENT}
+    assert dispatcher.stats()["sent"] == 3
+
+
+@pytest.mark.asyncio
+async def test_dispatcher_retries_then_gives_up(
+        session_maker, outbox_settings, httpx_mock
+):
+    """Failed events are retried with backoff, then marked as failed."""
+    httpx_mock.add_response(
+        method="POST", url=WEBHOOK, status_code=500, is_reusable=True
+    )
+    await add_complaints(session_maker, 1)
+
+    async with ExternalAPIClient(base_url="") as client:
+        client.retries = 1
+        dispatcher = OutboxDispatcher(session_maker, client, outbox_settings)
+        await dispatcher.dispatch_once()
+
+        [event] = await get_events(session_maker)
+        assert event.status == OutboxStatus.PENDING
+        assert event.attempts == 1
+        assert event.next_attempt_at > utcnow()
+        assert event.locked_until is None
+        assert await dispatcher.dispatch_once() == 0
+
+        async with session_maker() as session:
+            await OutboxRepository(session).mark_failed(
+                [event.id], "HTTP Status Error", utcnow(),
+                outbox_settings.OUTBOX_MAX_ATTEMPTS
+            )
+
+    [event] = await get_events(session_maker)
+    assert event.status == OutboxStatus.FAILED
+    assert event.attempts == 2
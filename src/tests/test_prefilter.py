@@ -0,0 +1,118 @@
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from starlette.testclient import TestClient
+
+from src.core import dependencies, prefilter as prefilter_module
+from src.core.config import PreFilterSettings
+from src.core.prefilter import BodyLimitMiddleware, PreFilter
+
+
+@pytest.mark.parametrize("text", [
+    "The payment page freezes after I press the pay button.",
+    "Не могу оплатить заказ, кнопка оплаты не работает.",
+    "Refund",
+    "My bitcoin payment failed, receipt: https://shop.example.com/order/1",
+    "Paid with USDT but nothing arrived, your telegram support ignores me",
+    "Your www.example.com checkout page is broken and my crypto wallet "
+    "payment hangs",
+    "Crypto refund to my wallet failed, I wrote to your whatsapp and "
+    "telegram, see https://example.com/ticket/7",
+])
+def test_prefilter_passes_complaints(text):
+    """Real complaints pass every rule."""
+    assert PreFilter(PreFilterSettings()).check(text) is None
+
+
+@pytest.mark.parametrize("text, rule", [
+    ("   ", "too_short"),
+    ("?!", "too_short"),
+    ("Order 1234567890 !!! 1234567890 ???", "symbols"),
+    ("asdfasdfasdfasdfasdfasdf", "low_entropy"),
+    ("pay button broken " * 20, "repetition"),
+    ("Buy now at www.example.com", "spam"),
+    ("Click here: bit.ly/abc", "spam"),
+])
+def test_prefilter_rejects_junk(text, rule):
+    """Empty, noisy, repetitive and spam texts are rejected."""
+    assert PreFilter(PreFilterSettings()).check(text) == rule
+
+
+def test_prefilter_spam_score_and_stats():
+    """Weights of distinct rules add up, custom patterns are used."""
+    prefilter = PreFilter(PreFilterSettings(
+        PREFILTER_SPAM_PATTERNS={r"\bsale\b": 0.75}
+    ))
+
+    assert prefilter.spam_score("bitcoin airdrop, bitcoin") == (
+        0.25, ["crypto"]
+    )
+    assert prefilter.check("Big sale of bitcoin today") == "spam"
+    assert prefilter.check("The app crashes on login") is None
+
+    stats = prefilter.stats()
+    assert stats["checked"] == 2
+    assert stats["rejected"] == 1
+    assert stats["rules"] == {"spam": 1, "spam.crypto": 1, "spam.custom": 1}
+
+
+def test_rejected_text_skips_paid_calls(create_complaints_app):
+    """Junk is answered with 422 before any upstream call."""
+    service = AsyncMock()
+    api_client = AsyncMock()
+    detector = MagicMock()
+
+    app = create_complaints_app({
+        dependencies.get_complaint_service: lambda: service,
+        dependencies.get_api_layer_client: lambda: api_client,
+        dependencies.get_hugging_face_client: lambda: api_client,
+        dependencies.get_abuse_detector: lambda: detector,
+        dependencies.get_prefilter: lambda: PreFilter(PreFilterSettings()),
+    })
+    client = TestClient(app)
+
+    spam = client.post("/add", json={"text": "Free money, click here"})
+    empty = client.post("/add", json={"text": ""})
+    oversized = client.post("/add", json={"text": "a" * 501})
+
+    assert spam.status_code == empty.status_code == 422
+    assert oversized.status_code == 422
+    assert not api_client.mock_calls
+    assert not service.mock_calls
+    assert not detector.mock_calls
+
+
+def test_large_body_is_rejected_before_parsing(
+        create_complaints_app, monkeypatch
+):
+    """Bodies over the limit get 413, sent whole or chunked."""
+    monkeypatch.setattr(
+        prefilter_module, "get_prefilter_settings",
+        lambda: PreFilterSettings(
+            PREFILTER_MAX_BODY_BYTES=1024, PREFILTER_BODY_LIMIT_PATHS="/add"
+        )
+    )
+    service = AsyncMock()
+    app = create_complaints_app({
+        dependencies.get_complaint_service: lambda: service,
+    })
+    app.add_middleware(BodyLimitMiddleware)
+    client = TestClient(app)
+    body = b'{"text": "' + b"a" * 10_000 + b'"}'
+
+    def chunks():
+        for start in range(0, len(body), 512):
+            yield body[start:start + 512]
+
+    whole = client.post(
+        "/add", content=body, headers={"Content-Type": "application/json"}
+    )
+    chunked = client.post(
+        "/add", content=chunks(), headers={"Content-Type": "application/json"}
+    )
+    # Under the limit the body reaches the schema bound.
+    small = client.post("/add", json={"text": "a" * 501})
+
+    assert whole.status_code == chunked.status_code == 413
+    assert small.status_code == 422
+    assert not service.mock_calls
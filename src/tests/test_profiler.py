@@ -0,0 +1,92 @@
+import asyncio
+import time
+
+import pytest
+from fastapi import FastAPI
+from starlette.testclient import TestClient
+
+from src.core import profiler as profiler_module
+from src.core.config import AdminSettings, ProfilerSettings
+from src.core.profiler import ProfilerMiddleware, TaskSampler, list_profiles
+
+
+def busy_wait(seconds: float) -> None:
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        pass
+
+
+@pytest.mark.asyncio
+async def test_task_sampler_records_running_and_awaiting_stacks():
+    """Both CPU work and awaits of the task end up in the samples."""
+    async def handler():
+        busy_wait(0.05)
+        await asyncio.sleep(0.05)
+
+    task = asyncio.create_task(handler())
+    sampler = TaskSampler(task, interval=0.002)
+    sampler.start()
+    await task
+    samples = sampler.stop()
+
+    assert any("busy_wait" in stack for stack in samples)
+    assert any(
+        "handler" in stack and stack.endswith("[await]")
+        for stack in samples
+    )
+
+
+def create_profiled_app(monkeypatch, tmp_path, sample_rate=0.0):
+    settings = ProfilerSettings(
+        PROFILE_SAMPLE_RATE=sample_rate,
+        PROFILE_INTERVAL_MS=1,
+        PROFILE_DIR=str(tmp_path),
+        PROFILE_RETENTION=2
+    )
+    monkeypatch.setattr(
+        profiler_module, "get_profiler_settings", lambda: settings
+    )
+    monkeypatch.setattr(
+        profiler_module, "get_admin_settings",
+        lambda: AdminSettings(ADMIN_TOKEN="secret")
+    )
+    app = FastAPI()
+    app.add_middleware(ProfilerMiddleware)
+
+    @app.get("/slow")
+    async def slow():
+        busy_wait(0.02)
+        return {"ok": True}
+
+    return app
+
+
+def test_profiler_middleware_requires_admin_token(monkeypatch, tmp_path):
+    """Only requests with X-Profile and a valid token are profiled."""
+    app = create_profiled_app(monkeypatch, tmp_path)
+
+    with TestClient(app) as client:
+        client.get("/slow", headers={"X-Profile": "1"})
+        client.get(
+            "/slow", headers={"X-Profile": "1", "X-Admin-Token": "wrong"}
+        )
+        assert list_profiles() == []
+
+        client.get(
+            "/slow", headers={"X-Profile": "1", "X-Admin-Token": "secret"}
+        )
+
+    [profile] = list_profiles()
+    assert "_GET_slow_" in profile["name"]
+    assert "busy_wait" in (tmp_path / profile["name"]).read_text()
+
+
+def test_profiler_middleware_keeps_newest_profiles(monkeypatch, tmp_path):
+    """Sampled profiles beyond PROFILE_RETENTION are deleted."""
+    app = create_profiled_app(monkeypatch, tmp_path, sample_rate=1.0)
+
+    with TestClient(app) as client:
+        for _ in range(4):
+            client.get("/slow")
+
+    assert len(list_profiles()) == 2
@@ -1,12 +1,18 @@
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
 from unittest.mock import MagicMock
 
 import pytest
 from sqlalchemy.exc import OperationalError, SQLAlchemyError
 
-from src.core.exceptions import DatabaseNotFound, RepositoryError
+from src.core.exceptions import (
+    DatabaseNotFound, RepositoryError, ConflictException
+)
+from src.models.enums import ComplaintStatus
 from src.models.models import Complaint
-from src.models.schemas import ComplaintCreate, ComplaintFilters
+from src.repositories.complaint_repository import LIST_COLUMNS
+from src.models.schemas import (
+    ComplaintCreate, ComplaintFilters, ComplaintBulkUpdate
+)
 
 
 @pytest.mark.asyncio
@@ -96,3 +102,114 @@ async def test_repository_error_handling(repo, mock_session):
 
     with pytest.raises(RepositoryError):
         await repo.get_complaints_list(ComplaintFilters())
+
+
+@pytest.mark.asyncio
+async def test_get_complaints_rows_success(repo, mock_session):
+    """Rows are returned without ORM entities."""
+    mock_result = MagicMock()
+    mock_result.all.return_value = [(1, "Text"), (2, "Text")]
+
+    mock_session.execute.return_value = mock_result
+
+    result = await repo.get_complaints_rows(ComplaintFilters())
+
+    assert len(result) == 2
+    query = mock_session.execute.call_args.args[0]
+    assert [column.name for column in query.selected_columns] == [
+        "id", "text", "status", "sentiment", "category"
+    ]
+
+
+@pytest.mark.asyncio
+async def test_bulk_update_complaints_success(repo, mock_session):
+    """Set-based update returns updated ids."""
+    mock_result = MagicMock()
+    mock_result.scalars.return_value.all.return_value = [1, 2]
+
+    mock_session.execute.return_value = mock_result
+
+    result = await repo.bulk_update_complaints(
+        ComplaintBulkUpdate(
+            ids=[1, 2], values={"status": ComplaintStatus.CLOSED}
+        )
+    )
+
+    assert result == [1, 2]
+    mock_session.execute.assert_awaited_once()
+    mock_session.commit.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_bulk_update_complaints_strict_conflict(repo, mock_session):
+    """Strict mode rolls back when some ids were not updated."""
+    mock_result = MagicMock()
+    mock_result.scalars.return_value.all.return_value = [1]
+
+    mock_session.execute.return_value = mock_result
+
+    with pytest.raises(ConflictException):
+        await repo.bulk_update_complaints(
+            ComplaintBulkUpdate(
+                ids=[1, 2],
+                values={"status": ComplaintStatus.CLOSED},
+                expected_status=ComplaintStatus.OPEN,
+                strict=True
+            )
+        )
+
+    mock_session.rollback.assert_awaited_once()
+    mock_session.commit.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_archive_closed_complaints_batches(repo, mock_session):
+    """Every batch is committed separately."""
+    first_batch, last_batch = MagicMock(), MagicMock()
+    first_batch.scalars.return_value.all.return_value = [1, 2]
+    last_batch.scalars.return_value.all.return_value = [3]
+
+    mock_session.execute.side_effect = [
+        first_batch, MagicMock(), MagicMock(),
+        last_batch, MagicMock(), MagicMock(),
+    ]
+
+    result = await repo.archive_closed_complaints(
+        datetime(2025, 7, 1), batch_size=2
+    )
+
+    assert result == 3
+    assert mock_session.commit.await_count == 2
+
+
+def test_list_query_reads_through_archive(repo):
+    """Open complaints are never archived, others read the archive too."""
+    open_query = repo._list_query(
+        ComplaintFilters(status=ComplaintStatus.OPEN), LIST_COLUMNS
+    )
+    closed_query = repo._list_query(
+        ComplaintFilters(status=ComplaintStatus.CLOSED), LIST_COLUMNS
+    )
+
+    assert "complaint_archive" not in str(open_query)
+    assert "complaint_archive" in str(closed_query)
+
+
+def test_list_query_skips_archive_for_recent_range(repo):
+    """A range starting after the archive cutoff reads only hot rows."""
+    now = datetime.now(timezone.utc)
+    recent_query = repo._list_query(
+        ComplaintFilters(timestamp={
+            "start_date": now - timedelta(days=1), "end_date": now
+        }),
+        LIST_COLUMNS
+    )
+    old_query = repo._list_query(
+        ComplaintFilters(timestamp={
+            "start_date": now - timedelta(days=60), "end_date": now
+        }),
+        LIST_COLUMNS
+    )
+
+    assert "UNION" not in str(recent_query)
+    assert "UNION" in str(old_query)
@@ -4,7 +4,7 @@ from pydantic import ValidationError
 
 from src.models.schemas import (
     ComplaintCreate, ComplaintUpdate, ComplaintFilters,
-    ComplaintResponse, ComplaintListResponse,
+    ComplaintResponse, ComplaintListResponse, ComplaintBulkUpdate,
 )
 
 from src.models.enums import (
@@ -128,3 +128,37 @@ def test_complaint_update_invalid():
     """No ID provided."""
     with pytest.raises(ValidationError):
         ComplaintUpdate(text="There is no ID!")
+
+
+def test_complaint_bulk_update_valid():
+    """Ids target with values."""
+    data = ComplaintBulkUpdate(
+        ids=[1, 2], values={"status": ComplaintStatus.CLOSED}
+    )
+    assert data.values.status == ComplaintStatus.CLOSED
+
+    data = ComplaintBulkUpdate(
+        filters={"category": ComplaintCategory.PAYMENT},
+        values={"status": ComplaintStatus.CLOSED}
+    )
+    assert data.ids is None
+
+
+def test_complaint_bulk_update_invalid():
+    """Targets and values must be set."""
+    with pytest.raises(ValidationError):
+        ComplaintBulkUpdate(values={"status": ComplaintStatus.CLOSED})
+
+    with pytest.raises(ValidationError):
+        ComplaintBulkUpdate(
+            ids=[1], filters={"category": ComplaintCategory.PAYMENT},
+            values={"status": ComplaintStatus.CLOSED}
+        )
+
+    with pytest.raises(ValidationError):
+        ComplaintBulkUpdate(
+            filters={}, values={"status": ComplaintStatus.CLOSED}
+        )
+
+    with pytest.raises(ValidationError):
+        ComplaintBulkUpdate(ids=[1], values={})
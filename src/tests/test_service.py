@@ -1,7 +1,9 @@
 from datetime import datetime
+from unittest.mock import MagicMock
 
 import pytest
 
+from src.core.cache import QueryCache
 from src.models.schemas import (
     ComplaintCreate, ComplaintUpdate,
     ComplaintFilters
@@ -10,6 +12,7 @@ from src.models.models import Complaint
 from src.core.exceptions import (
     RepositoryError, ServiceError, ComplaintNotFound
 )
+from src.services import ComplaintService
 
 
 @pytest.mark.asyncio
@@ -73,3 +76,82 @@ async def test_get_complaints_with_filters(service, mock_repo):
 
     assert len(result) == 2
     mock_repo.get_complaints_list.assert_awaited_once_with(filters)
+
+
+@pytest.mark.asyncio
+async def test_get_complaints_cached(mock_repo):
+    """Repeated filtered reads hit the cache until a write."""
+    service = ComplaintService(mock_repo, QueryCache())
+    filters = ComplaintFilters(
+        timestamp={
+            "start_date": datetime(2025, 7, 13),
+            "end_date": datetime(2025, 7, 15)
+        }
+    )
+    mock_repo.get_complaints_list.return_value = [Complaint(id=1)]
+    mock_repo.create_complaint.return_value = Complaint(id=2)
+
+    await service.get_complaints_by_time_range(filters)
+    await service.get_complaints_by_time_range(filters)
+    assert mock_repo.get_complaints_list.await_count == 1
+
+    await service.add_complaint(ComplaintCreate(text="Test"))
+    await service.get_complaints_by_time_range(filters)
+    assert mock_repo.get_complaints_list.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_cached_reads_stay_within_requested_range(mock_repo):
+    """Close ranges share a cache entry, rows outside the requested
+    range are never returned."""
+    service = ComplaintService(mock_repo, QueryCache())
+
+    def filters(second: int) -> ComplaintFilters:
+        return ComplaintFilters(timestamp={
+            "start_date": datetime(2025, 7, 13, 10, 0, second),
+            "end_date": datetime(2025, 7, 13, 11, 0, second)
+        })
+
+    timestamps = [
+        datetime(2025, 7, 13, 10, 0, 2),
+        datetime(2025, 7, 13, 10, 30),
+        datetime(2025, 7, 13, 11, 0, 4),
+    ]
+    mock_repo.get_complaints_list.return_value = [
+        Complaint(id=index, timestamp=timestamp)
+        for index, timestamp in enumerate(timestamps)
+    ]
+    rows = []
+    for index, timestamp in enumerate(timestamps):
+        row = MagicMock()
+        row._asdict.return_value = {"id": index, "timestamp": timestamp}
+        rows.append(row)
+    mock_repo.get_complaints_rows.return_value = rows
+
+    complaints = await service.get_complaints_by_time_range(filters(3))
+    later = await service.get_complaints_by_time_range(filters(4))
+    assert [complaint.id for complaint in complaints] == [1]
+    assert [complaint.id for complaint in later] == [1, 2]
+    assert mock_repo.get_complaints_list.await_count == 1
+
+    assert await service.get_complaint_rows_by_time_range(filters(3)) == [
+        {"id": 1}
+    ]
+    assert await service.get_complaint_rows_by_time_range(filters(2)) == [
+        {"id": 0}, {"id": 1}
+    ]
+    assert mock_repo.get_complaints_rows.await_count == 1
+
+
+@pytest.mark.asyncio
+async def test_get_complaint_rows_as_dicts(service, mock_repo):
+    """Rows are converted to plain dicts."""
+    row = MagicMock()
+    row._asdict.return_value = {"id": 1, "text": "Test"}
+    mock_repo.get_complaints_rows.return_value = [row]
+
+    result = await service.get_complaint_rows_by_time_range(
+        ComplaintFilters()
+    )
+
+    assert result == [{"id": 1, "text": "Test"}]
@@ -0,0 +1,85 @@
+import pytest
+import pytest_asyncio
+from httpx import ASGITransport, AsyncClient
+
+from src.core import dependencies
+from src.core.config import DbSettings
+from src.core.database import Base, create_engine, create_session_maker
+from src.core.idempotency import IdempotencyStore
+from src.models.enums import ComplaintStatus
+from src.models.schemas import ComplaintFilters
+from src.repositories import ComplaintRepository
+
+
+@pytest_asyncio.fixture
+async def engine(tmp_path):
+    database = tmp_path / "database.sqlite"
+    engine = create_engine(DbSettings(
+        DB_URL=f"sqlite+aiosqlite:///{database}",
+        DB_URL_SYNC=f"sqlite:///{database}"
+    ))
+    async with engine.begin() as connection:
+        await connection.run_sync(Base.metadata.create_all)
+    yield engine
+    await engine.dispose()
+
+
+class RecordingClient:
+    """Upstream client that records checked out DB connections."""
+    def __init__(self, engine, response):
+        self.engine = engine
+        self.response = response
+        self.checked_out: list[int] = []
+
+    async def post(self, *args, **kwargs):
+        self.checked_out.append(self.engine.pool.checkedout())
+        return self.response
+
+    async def stream_lines(self, *args, **kwargs):
+        self.checked_out.append(self.engine.pool.checkedout())
+        yield 'data: {"choices": [{"text": "payment\\n"}]}'
+
+
+@pytest.mark.asyncio
+async def test_no_connection_is_held_during_enrichment(
+        engine, create_complaints_app
+):
+    """Upstream calls of /add run without a checked out DB connection."""
+    sentiment_client = RecordingClient(engine, {"sentiment": "negative"})
+    category_client = RecordingClient(engine, None)
+
+    app = create_complaints_app(
+        {
+            dependencies.get_complaint_service: None,
+            dependencies.get_api_layer_client: lambda: sentiment_client,
+            dependencies.get_hugging_face_client: lambda: category_client,
+            dependencies.get_idempotency_store: lambda: IdempotencyStore(),
+        },
+        session_maker=create_session_maker(engine),
+        query_cache=None,
+        similarity_index=None,
+        shards=None,
+    )
+    async with AsyncClient(
+            transport=ASGITransport(app=app), base_url="http://test"
+    ) as client:
+        response = await client.post("/add", json={"text": "Refund"})
+
+    assert response.status_code == 201
+    assert response.json()["category"] == "payment"
+    assert sentiment_client.checked_out == [0]
+    assert category_client.checked_out == [0]
+    assert engine.pool.checkedout() == 0
+
+
+@pytest.mark.asyncio
+async def test_reads_release_connection(engine):
+    """Read methods return the connection before the session is closed."""
+    async with create_session_maker(engine)() as session:
+        repository = ComplaintRepository(session)
+        await repository.get_complaints_rows(
+            ComplaintFilters(status=ComplaintStatus.OPEN)
+        )
+        assert engine.pool.checkedout() == 0
+        await repository.get_complaints_list(ComplaintFilters())
+        assert engine.pool.checkedout() == 0
@@ -0,0 +1,156 @@
+import sqlite3
+from datetime import datetime
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import update
+
+from src.core.config import DbSettings
+from src.core.database import Base, create_engine, create_session_maker
+from src.core.exceptions import ConflictException, ValidationException
+from src.core.sharding import ShardSet
+from src.models.enums import ComplaintStatus
+from src.models.models import Complaint
+from src.models.schemas import (
+    ComplaintCreate, ComplaintUpdate, ComplaintFilters, ComplaintBulkUpdate
+)
+from src.repositories import ComplaintRepository, ShardedComplaintRepository
+
+JANUARY, FEBRUARY = datetime(2025, 1, 15), datetime(2025, 2, 15)
+
+
+@pytest_asyncio.fixture
+async def shards(tmp_path):
+    database = tmp_path / "database.sqlite"
+    engine = create_engine(DbSettings(
+        DB_URL=f"sqlite+aiosqlite:///{database}",
+        DB_URL_SYNC=f"sqlite:///{database}"
+    ))
+    async with engine.begin() as connection:
+        await connection.run_sync(Base.metadata.create_all)
+    # A complaint created before sharding was enabled.
+    async with create_session_maker(engine)() as session:
+        await ComplaintRepository(session).create_complaint(
+            ComplaintCreate(text="legacy")
+        )
+
+    shards = ShardSet(tmp_path / "shards", legacy_engine=engine)
+    await shards.open()
+    yield shards
+    await shards.close()
+    await engine.dispose()
+
+
+async def create_at(
+        repository: ShardedComplaintRepository,
+        monkeypatch,
+        now: datetime,
+        text: str
+) -> Complaint:
+    """Creates a complaint as if it was `now`."""
+    monkeypatch.setattr("src.core.sharding.utcnow", lambda: now)
+    complaint = await repository.create_complaint(ComplaintCreate(text=text))
+    shard = repository.shards.for_id(complaint.id)
+    async with shard.session_maker() as session:
+        await session.execute(
+            update(Complaint)
+            .where(Complaint.id == complaint.id)
+            .values(timestamp=now)
+        )
+        await session.commit()
+    return complaint
+
+
+@pytest.mark.asyncio
+async def test_writes_are_routed_by_period(shards, monkeypatch, tmp_path):
+    """Each period gets its own file, ids carry the shard key."""
+    repository = ShardedComplaintRepository(shards)
+
+    january = await create_at(repository, monkeypatch, JANUARY, "first")
+    february = await create_at(repository, monkeypatch, FEBRUARY, "second")
+
+    assert january.id == 202501 << 32 | 1
+    assert february.id == 202502 << 32 | 1
+    assert sorted(path.name for path in (tmp_path / "shards").iterdir()) == [
+        "complaints_2025-01.sqlite", "complaints_2025-02.sqlite"
+    ]
+
+    updated = await repository.update_complaint(
+        ComplaintUpdate(id=january.id, status=ComplaintStatus.CLOSED)
+    )
+    assert updated.status == ComplaintStatus.CLOSED
+
+    # Shards are found again on restart.
+    reopened = ShardSet(shards.directory)
+    await reopened.open()
+    assert [shard.key for shard in reopened.shards()] == [202501, 202502]
+    await reopened.close()
+
+
+@pytest.mark.asyncio
+async def test_range_reads_prune_shards(shards, monkeypatch):
+    """Reads query only the shards of the filtered periods."""
+    repository = ShardedComplaintRepository(shards)
+    await create_at(repository, monkeypatch, JANUARY, "first")
+    february = await create_at(repository, monkeypatch, FEBRUARY, "second")
+
+    assert [shard.key for shard in shards.in_range(
+        datetime(2025, 2, 1), datetime(2025, 2, 28)
+    )] == [0, 202502]
+
+    rows = await repository.get_complaints_rows(ComplaintFilters(timestamp={
+        "start_date": datetime(2025, 2, 1),
+        "end_date": datetime(2025, 2, 28)
+    }))
+    assert [row.id for row in rows] == [february.id]
+
+    # Without a time filter every shard is read, the oldest first.
+    rows = await repository.get_complaints_rows(ComplaintFilters())
+    assert [row.text for row in rows] == ["legacy", "first", "second"]
+
+    texts = await repository.get_complaint_texts(1, 10)
+    assert [text for _, text in texts] == ["first", "second"]
+
+
+@pytest.mark.asyncio
+async def test_bulk_update_spans_shards(shards, monkeypatch):
+    """Non-strict updates go shard by shard, strict ones need one shard."""
+    repository = ShardedComplaintRepository(shards)
+    january = await create_at(repository, monkeypatch, JANUARY, "first")
+    february = await create_at(repository, monkeypatch, FEBRUARY, "second")
+
+    updated = await repository.bulk_update_complaints(ComplaintBulkUpdate(
+        ids=[1, january.id, february.id],
+        values={"status": ComplaintStatus.CLOSED}
+    ))
+    assert sorted(updated) == [1, january.id, february.id]
+
+    with pytest.raises(ValidationException):
+        await repository.bulk_update_complaints(ComplaintBulkUpdate(
+            ids=[january.id, february.id],
+            values={"status": ComplaintStatus.OPEN},
+            strict=True
+        ))
+
+
+@pytest.mark.asyncio
+async def test_sealed_shard_is_read_only(shards, monkeypatch):
+    """Past shards are vacuumed and reopened read-only."""
+    repository = ShardedComplaintRepository(shards)
+    january = await create_at(repository, monkeypatch, JANUARY, "first")
+    await create_at(repository, monkeypatch, FEBRUARY, "second")
+
+    with pytest.raises(ConflictException):
+        await shards.seal(202502)
+
+    sealed = await shards.seal(202501)
+
+    assert sealed.read_only
+    with sqlite3.connect(sealed.path) as connection:
+        assert connection.execute("PRAGMA user_version").fetchone() == (1,)
+    with pytest.raises(ConflictException):
+        await repository.update_complaint(
+            ComplaintUpdate(id=january.id, status=ComplaintStatus.CLOSED)
+        )
+    rows = await repository.get_complaints_by_ids([january.id])
+    assert [row.text for row in rows] == ["first"]
@@ -0,0 +1,158 @@
+import asyncio
+from contextlib import asynccontextmanager
+from unittest.mock import MagicMock
+
+import pytest
+from sqlalchemy import Row
+
+from src.core.exceptions import ComplaintNotFound, ServiceUnavailable
+from src.core.similarity import SimilarityIndex
+from src.services import ComplaintService
+
+TEXTS = {
+    1: "The courier lost my parcel and delivery took three weeks",
+    2: "Refund for the double card payment never arrived",
+    3: "My parcel was lost by the courier, delivery is three weeks late",
+    4: "The app crashes on login after the last update",
+    5: "Card payment was charged twice and no refund yet",
+}
+
+
+@pytest.fixture
+def index() -> SimilarityIndex:
+    index = SimilarityIndex(features=2 ** 12)
+    for complaint_id, text in TEXTS.items():
+        index.add(complaint_id, text)
+    return index
+
+
+def test_search_ranks_similar_texts_first(index):
+    """A near-duplicate wording is the nearest neighbour."""
+    results = index.search(index.signature_of(1), k=2, exclude=1)
+
+    assert results[0][0] == 3
+    assert 1 not in [complaint_id for complaint_id, _ in results]
+    assert results[0][1] > results[1][1]
+
+    signature = index.text_signature("refund of a card payment charged twice")
+    assert index.search(signature, k=1)[0][0] in (2, 5)
+
+
+def test_hash_tables_find_near_duplicates(index):
+    """Indexes larger than max_candidates are searched via hash tables."""
+    index.max_candidates = 3
+    index.add(6, TEXTS[4].replace("last", "latest"))
+
+    assert index.search(index.signature_of(4), k=1, exclude=4)[0][0] == 6
+    assert index.stats()["avg_candidates"] <= 3
+
+
+def test_changed_text_is_reindexed(index):
+    """Updating a text replaces its signature."""
+    index.add(4, TEXTS[2])
+
+    assert index.signature_of(4) == index.text_signature(TEXTS[2])
+    assert len(index.ids) == len(TEXTS)
+
+
+def test_out_of_order_ids_are_appended(index, monkeypatch):
+    """An id below the last one is appended, the tables are not rebuilt."""
+    monkeypatch.setattr(
+        index, "_rebuild_tables",
+        MagicMock(side_effect=AssertionError("tables rebuilt"))
+    )
+    index.add(9, TEXTS[4].replace("last", "latest"))
+    index.add(7, TEXTS[1].replace("three", "four"))
+
+    assert list(index.ids) == [1, 2, 3, 4, 5, 9, 7]
+    assert index.last_id == 9
+    assert index.signature_of(7) == index.signatures[-1]
+    index.max_candidates = 3
+    assert index.search(index.signature_of(1), k=1, exclude=1)[0][0] in (
+        3, 7
+    )
+    assert 7 not in dict(index.search(index.signature_of(7), k=8, exclude=7))
+
+
+@pytest.mark.asyncio
+async def test_save_and_load_round_trip(index, tmp_path):
+    """The file restores ids, signatures and document frequencies."""
+    path = tmp_path / "similarity.idx"
+    await index.save(path)
+    loaded = SimilarityIndex.load(path, features=2 ** 12)
+
+    assert list(loaded.ids) == list(index.ids)
+    assert list(loaded.signatures) == list(index.signatures)
+    assert loaded.documents == index.documents
+    assert loaded.last_id == index.last_id
+    assert loaded.search(loaded.signature_of(1), k=1, exclude=1)[0][0] == 3
+
+    # Another feature count makes the file unusable.
+    assert len(SimilarityIndex.load(path, features=2 ** 10).ids) == 0
+
+
+@pytest.mark.asyncio
+async def test_save_keeps_unsaved_changes_dirty(index, tmp_path):
+    """A failed save or a change during the write keeps it dirty."""
+    (tmp_path / "file").write_text("")
+    with pytest.raises(OSError):
+        await index.save(tmp_path / "file" / "similarity.idx")
+    assert index.dirty
+
+    path = tmp_path / "similarity.idx"
+    save = asyncio.create_task(index.save(path))
+    await asyncio.sleep(0)
+    index.add(6, TEXTS[4].replace("last", "latest"))
+    await save
+    assert index.dirty
+    assert len(SimilarityIndex.load(path, features=2 ** 12).ids) == 5
+
+    await index.save(path)
+    assert not index.dirty
+
+
+@pytest.mark.asyncio
+async def test_catch_up_indexes_rows_in_order():
+    """Rows are read after the last id, adds meanwhile are queued."""
+    index = SimilarityIndex(features=2 ** 12)
+    batches = [[(1, TEXTS[1]), (2, TEXTS[2])], [(3, TEXTS[3])]]
+    cursors = []
+
+    class Repository:
+        async def get_complaint_texts(self, after_id, limit):
+            cursors.append(after_id)
+            # A complaint is created while the index catches up.
+            index.add(9, TEXTS[4])
+            return batches.pop(0)
+
+    @asynccontextmanager
+    async def repository_scope():
+        yield Repository()
+
+    assert await index.catch_up(repository_scope, batch_size=2) == 3
+    assert cursors == [0, 2]
+    assert list(index.ids) == [1, 2, 3, 9]
+
+
+@pytest.mark.asyncio
+async def test_service_similar_complaints(index, mock_repo):
+    """Matches are loaded from the repository in score order."""
+    service = ComplaintService(mock_repo, similarity_index=index)
+    mock_repo.get_complaints_by_ids.return_value = [
+        MagicMock(spec=Row, id=complaint_id, _asdict=lambda i=complaint_id: {
+            "id": i, "text": TEXTS[i]
+        })
+        for complaint_id in (3, 5)
+    ]
+
+    results = await service.get_similar_complaints(1, k=2)
+
+    assert results[0]["id"] == 3
+    assert all("score" in result for result in results)
+
+    mock_repo.get_complaints_by_ids.return_value = []
+    with pytest.raises(ComplaintNotFound):
+        await service.get_similar_complaints(42, k=2)
+
+    with pytest.raises(ServiceUnavailable):
+        await ComplaintService(mock_repo).find_similar_complaints("x", k=1)
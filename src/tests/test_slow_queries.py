@@ -0,0 +1,58 @@
+import asyncio
+
+import pytest
+from sqlalchemy import bindparam, text
+
+from src.core import database
+from src.core.config import DbSettings
+from src.core.slow_queries import (
+    SlowQueryLog, normalize_sql, parameter_shape
+)
+
+
+def test_statements_are_normalized():
+    """Literals and IN lists of any length share one fingerprint."""
+    assert normalize_sql(
+        "SELECT *\n  FROM complaint WHERE id IN (?, ?, ?) AND text = 'a''b'"
+    ) == "SELECT * FROM complaint WHERE id IN (?+) AND text = ?"
+    assert normalize_sql("SELECT 1 FROM t2 LIMIT 10") == (
+        "SELECT ? FROM t2 LIMIT ?"
+    )
+    assert parameter_shape((1, "a", None)) == "(int, str, NoneType)"
+    assert parameter_shape([(1,), (2,)], executemany=True) == "2 x (int)"
+
+
+@pytest.mark.asyncio
+async def test_slow_statements_are_aggregated_and_explained(
+        monkeypatch, tmp_path
+):
+    """Slow statements are grouped by fingerprint and get a plan."""
+    log = SlowQueryLog()
+    monkeypatch.setattr(database, "slow_query_log", log)
+    path = tmp_path / "database.sqlite"
+    engine = database.create_engine(DbSettings(
+        DB_URL=f"sqlite+aiosqlite:///{path}",
+        DB_URL_SYNC=f"sqlite:///{path}",
+        DB_SLOW_QUERY_MS=0
+    ))
+    select = text("SELECT x FROM item WHERE x IN :values").bindparams(
+        bindparam("values", expanding=True)
+    )
+    try:
+        async with engine.begin() as connection:
+            await connection.execute(text("CREATE TABLE item (x INTEGER)"))
+            await connection.execute(select, {"values": [1, 2]})
+            await connection.execute(select, {"values": [1, 2, 3]})
+        await asyncio.gather(*log._tasks)
+    finally:
+        await engine.dispose()
+
+    assert log.threshold_ms == 0
+    entry = next(
+        query for query in log.top()
+        if query["statement"] == "SELECT x FROM item WHERE x IN (?+)"
+    )
+    assert entry["calls"] == entry["slow_calls"] == 2
+    assert entry["parameter_shapes"] == ["(int, int)", "(int, int, int)"]
+    assert any("SCAN" in step for step in entry["plan"])
+    assert log.stats()["slow"] == log.stats()["statements"]
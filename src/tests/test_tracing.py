@@ -0,0 +1,116 @@
+import asyncio
+
+import httpx
+import pytest
+from fastapi import FastAPI
+from sqlalchemy import text
+
+from src.core import tracing
+from src.core.config import DbSettings, TracingSettings
+from src.core.database import create_engine
+from src.core.tracing import (
+    NOOP_SPAN, Trace, Tracer, TracingMiddleware, traced
+)
+
+TRACEPARENT = "00-4bf92f3577b34da6a3ce929d0e0e4736-00f067aa0ba902b7-01"
+
+
+@traced
+async def lookup(value: int) -> int:
+    with tracing.span("inner", value=value):
+        await asyncio.sleep(0)
+    return value
+
+
+@pytest.mark.asyncio
+async def test_spans_nest_only_in_sampled_requests():
+    """Spans are children of the current span, nothing is recorded
+    outside a sampled request."""
+    assert tracing.start_span("unsampled") is NOOP_SPAN
+    assert await lookup(1) == 1
+
+    trace = Trace("trace", max_spans=2)
+    token = tracing._trace.set(trace)
+    try:
+        await lookup(2)
+        with tracing.span("dropped"):
+            pass
+    finally:
+        tracing._trace.reset(token)
+
+    inner, outer = trace.spans
+    assert outer.name == "lookup" and outer.parent_id is None
+    assert inner.parent_id == outer.span_id
+    assert inner.attributes == {"value": 2}
+    assert trace.dropped == 1
+
+
+def test_sampling_honours_traceparent_and_rate_cap():
+    """Sampled traceparent keeps its trace id, sampling is capped."""
+    tracer = Tracer()
+    tracer.configure(TracingSettings(
+        TRACING_SAMPLE_RATE=0.0, TRACING_MAX_PER_SECOND=2
+    ))
+
+    assert tracer.sample(None) is None
+    assert tracer.sample(TRACEPARENT[:-2].encode() + b"00") is None
+    assert tracer.sample(TRACEPARENT.encode()) == TRACEPARENT[3:35]
+    assert tracer.sample(TRACEPARENT.encode()) is not None
+    assert tracer.sample(TRACEPARENT.encode()) is None
+    assert tracer.stats()["capped"] == 1
+
+
+@pytest.mark.asyncio
+async def test_request_trace_with_sql_and_service_spans(
+        monkeypatch, tmp_path
+):
+    """A sampled request records route, service and SQL spans."""
+    monkeypatch.setattr(
+        tracing, "get_tracing_settings",
+        lambda: TracingSettings(
+            TRACING_SAMPLE_RATE=1.0, TRACING_FILE=str(tmp_path / "t.jsonl")
+        )
+    )
+    engine = create_engine(DbSettings(
+        DB_URL="sqlite+aiosqlite://", DB_URL_SYNC="sqlite://"
+    ))
+
+    @traced
+    async def query() -> int:
+        async with engine.connect() as connection:
+            return (await connection.execute(text("SELECT 1"))).scalar()
+
+    app = FastAPI()
+    app.add_middleware(TracingMiddleware)
+
+    @app.get("/items/{item_id}")
+    async def item(item_id: int):
+        return {"value": await query()}
+
+    transport = httpx.ASGITransport(app=app)
+    try:
+        async with httpx.AsyncClient(
+                transport=transport, base_url="http://test"
+        ) as client:
+            response = await client.get("/items/1")
+    finally:
+        await engine.dispose()
+
+    trace_id = response.headers["X-Trace-Id"]
+    trace = tracing.tracer.buffer.get(trace_id)
+    assert trace["name"] == "GET /items/{item_id}"
+    spans = {span["name"]: span for span in trace["spans"]}
+    root = spans["GET /items/{item_id}"]
+    assert root["attributes"]["status"] == 200
+    service = spans[query.__qualname__]
+    assert service["parent_id"] == root["span_id"]
+    assert any(
+        span["name"] == "sql" and span["parent_id"] == service["span_id"]
+        and span["attributes"]["statement"] == "SELECT 1"
+        for span in trace["spans"]
+    )
+    assert tracing.tracer.buffer.query(name="/items")[0]["trace_id"] == (
+        trace_id
+    )
+    tracing.tracer.exporters[-1]._writer.shutdown(wait=True)
+    assert trace_id in (tmp_path / "t.jsonl").read_text()